@@ -0,0 +1,91 @@
+"""
+Benchmark do índice de candidatos (planilhas/indice_candidatos.py).
+
+Compara, para uma amostra de consultas, a varredura completa da planilha 1
+(comportamento antigo do CompararWorker) com a busca via IndiceCandidatos,
+conferindo que os pares encontrados são os mesmos.
+
+Uso:
+    python benchmarks/bench_indice_candidatos.py --linhas 10000 100000 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rapidfuzz import fuzz  # noqa: E402
+
+from planilhas.indice_candidatos import IndiceCandidatos  # noqa: E402
+from tests.util import varredura_completa  # noqa: E402
+
+PRENOMES = [
+    "JOAO", "MARIA", "JOSE", "ANA", "ANTONIO", "FRANCISCO", "CARLOS", "PAULO", "PEDRO", "LUCAS",
+    "LUIZ", "LUIS", "MARCOS", "GABRIEL", "RAFAEL", "DANIEL", "MARCELO", "BRUNO", "EDUARDO", "FELIPE",
+    "JULIANA", "MARCIA", "FERNANDA", "PATRICIA", "ALINE", "THIAGO", "TIAGO", "SANDRA", "CAMILA", "AMANDA",
+]
+SOBRENOMES = [
+    "SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "SOUSA", "RODRIGUES", "FERREIRA", "ALVES", "PEREIRA", "LIMA",
+    "GOMES", "COSTA", "RIBEIRO", "MARTINS", "CARVALHO", "ALMEIDA", "LOPES", "SOARES", "FERNANDES", "VIEIRA",
+    "BARBOSA", "ROCHA", "DIAS", "NASCIMENTO", "ANDRADE", "MOREIRA", "NUNES", "MARQUES", "MACHADO", "MENDES",
+]
+
+
+def gerar_nome(rng):
+    partes = [rng.choice(PRENOMES)] + [rng.choice(SOBRENOMES) for _ in range(rng.randint(1, 3))]
+    nome = " ".join(partes)
+    if rng.random() < 0.3:  # erro de digitação
+        i = rng.randrange(len(nome))
+        nome = nome[:i] + rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") + nome[i + 1 :]
+    return nome
+
+
+def via_indice(indice, base, consulta, similaridade_min):
+    return [
+        int(i)
+        for i in indice.candidatos(consulta, similaridade_min)
+        if fuzz.token_sort_ratio(base[i], consulta) >= similaridade_min
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--consultas", type=int, default=200, help="consultas da amostra (planilha 2)")
+    parser.add_argument("--similaridade", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'linhas':>9} {'índice (s)':>11} {'varredura/consulta':>19} {'índice/consulta':>16} {'speedup':>8}")
+    for n in args.linhas:
+        rng = random.Random(args.seed)
+        base = [gerar_nome(rng) for _ in range(n)]
+        consultas = [gerar_nome(rng) for _ in range(args.consultas)]
+
+        t0 = time.perf_counter()
+        indice = IndiceCandidatos(base)
+        t_indice = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        esperado = [varredura_completa(base, c, args.similaridade) for c in consultas]
+        t_varredura = (time.perf_counter() - t0) / len(consultas)
+
+        t0 = time.perf_counter()
+        obtido = [via_indice(indice, base, c, args.similaridade) for c in consultas]
+        t_via_indice = (time.perf_counter() - t0) / len(consultas)
+
+        if obtido != esperado:
+            raise SystemExit(f"Divergência entre índice e varredura completa com {n} linhas!")
+        print(
+            f"{n:>9} {t_indice:>11.2f} {t_varredura * 1000:>16.2f} ms {t_via_indice * 1000:>13.2f} ms "
+            f"{t_varredura / t_via_indice:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark de ponta a ponta do motor de comparação (planilhas/motor_comparacao.py), sem Qt.
+
+Mede separadamente o preparo da planilha 1 e a comparação completa da planilha 2
+(gravando o resultado em CSV numa pasta temporária). Com --perfil, roda a
+comparação sob o cProfile e mostra as funções mais caras.
+
+Uso:
+    python benchmarks/bench_motor_comparacao.py --linhas1 100000 --linhas2 20000
+    python benchmarks/bench_motor_comparacao.py --perfil
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import os
+import pstats
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from bench_indice_candidatos import gerar_nome  # noqa: E402
+from planilhas.motor_comparacao import ConfigComparacao, MotorComparacao, preparar_planilha1  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas1", type=int, default=50_000, help="linhas da planilha 1")
+    parser.add_argument("--linhas2", type=int, default=10_000, help="linhas da planilha 2")
+    parser.add_argument("--similaridade", type=int, default=90)
+    parser.add_argument("--limite", type=int, default=0, help="K melhores similares por linha (0 = todos)")
+    parser.add_argument("--processos", type=int, default=1)
+    parser.add_argument("--perfil", action="store_true", help="roda a comparação sob o cProfile")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    df1 = pd.DataFrame({"NOME": [gerar_nome(rng) for _ in range(args.linhas1)]})
+    df2 = pd.DataFrame({"NOME": [gerar_nome(rng) for _ in range(args.linhas2)]})
+    config = ConfigComparacao(
+        colunas1=["NOME"],
+        colunas2=["NOME"],
+        similaridade_min=args.similaridade,
+        limite_similares=args.limite or None,
+        processos=args.processos,
+    )
+
+    t0 = time.perf_counter()
+    motor = MotorComparacao(preparar_planilha1(df1, config), config)
+    t_preparo = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "resultado.csv")
+        perfil = cProfile.Profile() if args.perfil else None
+        t0 = time.perf_counter()
+        if perfil is not None:
+            perfil.enable()
+        resultado = motor.comparar(df2, caminho)
+        if perfil is not None:
+            perfil.disable()
+        t_comparacao = time.perf_counter() - t0
+
+    print(f"preparo da planilha 1 ({args.linhas1} linhas): {t_preparo:.2f} s")
+    print(
+        f"comparação ({resultado.linhas} linhas): {t_comparacao:.2f} s "
+        f"({resultado.linhas / t_comparacao:,.0f} linhas/s)"
+    )
+    if perfil is not None:
+        pstats.Stats(perfil).sort_stats("cumulative").print_stats(20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark da busca de nomes similares numa coluna (planilhas/motor_nomes_similares.py).
+
+Compara a varredura de todos os pares i < j dos nomes distintos com a busca em
+blocos pelo `cdist`, restrita à janela de tamanho, conferindo que os pares
+encontrados (e as ocorrências de cada nome) são exatamente os mesmos, na mesma
+ordem. Com --sem-conferencia, só mede a busca em blocos (colunas grandes, em que a
+varredura par a par levaria horas).
+
+Uso:
+    python benchmarks/bench_nomes_similares.py --nomes 2000 5000 --similaridade 85
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_indice_candidatos import gerar_nome  # noqa: E402
+from planilhas.motor_nomes_similares import pares_similares  # noqa: E402
+from tests.util import pares_forca_bruta  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nomes", type=int, nargs="+", default=[1_000, 3_000])
+    parser.add_argument("--similaridade", type=int, nargs="+", default=[60, 85, 95])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sem-conferencia", action="store_true", help="não roda a varredura par a par")
+    args = parser.parse_args()
+
+    print(f"{'nomes':>7} {'sim.':>5} {'pares':>7} {'varredura (s)':>14} {'blocos (s)':>11} {'speedup':>8}")
+    for n in args.nomes:
+        rng = random.Random(args.seed)
+        # Tamanhos bem variados (nomes curtos, abreviados e compostos), como numa coluna real
+        nomes = [gerar_nome(rng)[: rng.choice((4, 8, 15, 40))] for _ in range(n)]
+        for similaridade in args.similaridade:
+            t0 = time.perf_counter()
+            obtido = pares_similares(nomes, similaridade)
+            t_blocos = time.perf_counter() - t0
+            if args.sem_conferencia:
+                print(f"{n:>7} {similaridade:>5} {len(obtido):>7} {'-':>14} {t_blocos:>11.2f} {'-':>8}")
+                continue
+
+            t0 = time.perf_counter()
+            esperado = pares_forca_bruta(nomes, similaridade)
+            t_varredura = time.perf_counter() - t0
+
+            if obtido != esperado:
+                raise SystemExit(f"Divergência com a varredura completa ({n} nomes, {similaridade}%)!")
+            print(
+                f"{n:>7} {similaridade:>5} {len(obtido):>7} {t_varredura:>14.2f} {t_blocos:>11.2f} "
+                f"{t_varredura / t_blocos:>7.1f}x"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Microbenchmark da normalização de texto (planilhas/normalizacao.py).
+
+Compara o método antigo `ComparadorPlanilhasWidget.normalizar_texto` (reproduzido
+abaixo sem a leitura do combobox) com `NormalizadorTexto.normalizar` (memo frio e
+quente) e com o caminho vetorizado `normalize_series`, conferindo que todos
+produzem o mesmo resultado.
+
+Uso:
+    python benchmarks/bench_normalizacao.py --nomes 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from planilhas.normalizacao import MODO_PADRAO, NormalizadorTexto  # noqa: E402
+
+PRENOMES = ["José", "João", "Maria", "Antônio", "Luís", "Conceição", "Inês", "Thiago", "Cláudia", "Sérgio"]
+SOBRENOMES = ["Silva", "Souza", "Sousa", "Simões", "Gonçalves", "Araújo", "Magalhães", "Brandão", "Pereira"]
+SUFIXOS = ["", "", "", " LTDA", " - ME", " S/A", " (SUCESSÃO DE)"]
+
+
+def normalizar_texto_antigo(texto, modo=MODO_PADRAO):
+    """Cópia do método antigo (padrão de regex e loop por caractere a cada chamada)."""
+    if pd.isna(texto) or texto is None:
+        return ""
+    texto = str(texto).strip()
+    texto = re.sub(r"\s+", " ", texto)
+    texto_base = unicodedata.normalize("NFD", texto)
+    texto_base = "".join(c for c in texto_base if unicodedata.category(c) != "Mn")
+    if modo == "Sem normalização":
+        return texto
+    texto_base = re.sub(r"[,;:.!?'\-]", " ", texto_base)
+    if modo == "Remover stopwords (LTDA, ME, SA)":
+        stop = {"LTDA", "ME", "S/A", "SA", "EIRELI", "EPP"}
+        palavras = [p for p in texto_base.split() if p.upper() not in stop]
+        texto_base = " ".join(palavras)
+    texto_base = re.sub(r"\(\s*SUCESSAO\s+DE\s*\)", " ", texto_base, flags=re.IGNORECASE)
+    texto_base = re.sub(r"\s+", " ", texto_base).strip()
+    return texto_base.upper()
+
+
+def gerar_nome(rng):
+    partes = [rng.choice(PRENOMES)] + [rng.choice(SOBRENOMES) for _ in range(rng.randint(1, 3))]
+    return "  ".join(partes) + rng.choice(SUFIXOS)
+
+
+def cronometrar(rotulo, func, base=None):
+    t0 = time.perf_counter()
+    resultado = func()
+    tempo = time.perf_counter() - t0
+    extra = f"  ({base / tempo:.1f}x)" if base else ""
+    print(f"{rotulo:<34} {tempo:>8.2f} s{extra}")
+    return resultado, tempo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nomes", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    nomes = [gerar_nome(rng) for _ in range(args.nomes)]
+    serie = pd.Series(nomes, dtype=object)
+    print(f"{args.nomes} nomes ({len(set(nomes))} distintos), modo '{MODO_PADRAO}'")
+
+    esperado, t_antigo = cronometrar("normalizar_texto (antigo)", lambda: [normalizar_texto_antigo(n) for n in nomes])
+
+    normalizador = NormalizadorTexto(MODO_PADRAO, tamanho_cache=0)
+    sem_memo, _ = cronometrar("NormalizadorTexto sem memo", lambda: [normalizador.normalizar(n) for n in nomes], t_antigo)
+
+    normalizador = NormalizadorTexto(MODO_PADRAO)
+    frio, _ = cronometrar("NormalizadorTexto memo frio", lambda: [normalizador.normalizar(n) for n in nomes], t_antigo)
+    quente, _ = cronometrar("NormalizadorTexto memo quente", lambda: [normalizador.normalizar(n) for n in nomes], t_antigo)
+
+    vetorizado, _ = cronometrar("normalize_series", lambda: normalizador.normalize_series(serie).tolist(), t_antigo)
+
+    if not (esperado == sem_memo == frio == quente == vetorizado):
+        raise SystemExit("Divergência entre o método antigo e o NormalizadorTexto!")
+
+
+if __name__ == "__main__":
+    main()
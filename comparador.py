@@ -1,14 +1,24 @@
 ﻿from __future__ import annotations
 
+import multiprocessing
 import sys
 
-from PyQt5.QtWidgets import QApplication
-
-from app.main_window import AplicacaoPrincipal
 from shared.win_subprocess import apply_no_window_patch
 
 
 def main() -> None:
+    # Necessário no executável (PyInstaller) para o modo "vários processos" do comparador
+    multiprocessing.freeze_support()
+    # Subcomandos de linha de comando ("comparar", "lote", "refiltrar") rodam sem interface gráfica nem PyQt
+    if len(sys.argv) > 1 and sys.argv[1] in ("comparar", "lote", "refiltrar", "-h", "--help"):
+        from planilhas.cli import main as main_cli
+
+        sys.exit(main_cli(sys.argv[1:]))
+
+    from PyQt5.QtWidgets import QApplication
+
+    from app.main_window import AplicacaoPrincipal
+
     # Evita janelas CMD piscando no Windows ao usar pdftoppm (compressor/separador)
     apply_no_window_patch()
     app = QApplication(sys.argv)
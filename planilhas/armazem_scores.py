@@ -0,0 +1,155 @@
+"""
+Armazém esparso de scores para reaplicar a similaridade mínima sem recomparar.
+
+Com um piso configurado (ex.: 70%), a comparação pontua a planilha 2 contra a
+planilha 1 a partir do piso e guarda todos os pares acima dele num formato CSR
+(índices e scores em arrays contíguos por valor distinto da planilha 2). Depois,
+qualquer similaridade mínima >= piso (e qualquer limite de similares) é só um
+filtro sobre esses arrays: o resultado é idêntico ao de rodar a comparação de
+novo, sem a parte O(N×M).
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import tempfile
+from array import array
+
+import numpy as np
+
+from planilhas.multichave import exibicao
+from planilhas.pontuacao import TAMANHO_BLOCO, formatar_similares
+
+# Piso padrão sugerido na interface
+PISO_PADRAO = 70
+
+VERSAO_ARMAZEM = 1
+
+
+class ArmazemScores:
+    """
+    Scores >= `piso` de cada valor distinto da planilha 2 contra as `escolhas` (planilha 1).
+
+    Por linha: `codigos[linha]` (valor distinto da linha) e `casados_cpf[linha]`. Os pares
+    do valor `u` ficam em `indices/scores[inicio[u]:fim[u]]`, em ordem crescente de índice
+    da planilha 1.
+    """
+
+    def __init__(self, piso, escolhas, config=None):
+        self.piso = piso
+        self.escolhas = escolhas  # compostos normalizados da planilha 1 (texto dos similares)
+        self.config = config  # ConfigComparacao da comparação que gerou o armazém
+        self.unicos = []
+        self.exatos = array("b")
+        self.inicio = array("q")
+        self.fim = array("q")
+        self.indices = array("q")
+        self.scores = array("d")
+        self.codigos = array("q")
+        self.casados_cpf = array("b")
+        self._posicao = {}  # valor -> código (só durante a montagem; não vai para o disco)
+
+    def __len__(self):
+        return len(self.codigos)
+
+    @property
+    def pares(self):
+        return len(self.indices)
+
+    def _codigo(self, valor):
+        codigo = self._posicao.get(valor)
+        if codigo is None:
+            codigo = self._posicao[valor] = len(self.unicos)
+            self.unicos.append(valor)
+            self.exatos.append(False)
+            self.inicio.append(0)
+            self.fim.append(0)
+        return codigo
+
+    def definir_pares(self, valor, encontrado_exato, acertos):
+        """Registra o match exato e os pares [(índice, score), ...] >= piso de um valor; retorna o código dele."""
+        codigo = self._codigo(valor)
+        self.exatos[codigo] = bool(encontrado_exato)
+        self.inicio[codigo] = len(self.indices)
+        for idx, score in acertos:
+            self.indices.append(idx)
+            self.scores.append(score)
+        self.fim[codigo] = len(self.indices)
+        return codigo
+
+    def adicionar_linhas(self, valores, casados_cpf):
+        """Registra as linhas da planilha 2, em ordem."""
+        for valor, casou in zip(valores, casados_cpf):
+            self.codigos.append(self._codigo(valor))
+            self.casados_cpf.append(bool(casou))
+
+    def acertos(self, codigo, similaridade_min, limite=None):
+        """
+        Pares do valor com score >= similaridade_min: em ordem de índice ou, com `limite`,
+        os K melhores (maior score primeiro, empate para a linha anterior), como no `PontuadorLote`.
+        """
+        if similaridade_min < self.piso:
+            raise ValueError(f"Similaridade {similaridade_min}% abaixo do piso armazenado ({self.piso}%)")
+        ini, fim = self.inicio[codigo], self.fim[codigo]
+        if ini == fim:
+            return []
+        indices = np.frombuffer(self.indices, dtype=np.int64)[ini:fim]
+        scores = np.frombuffer(self.scores, dtype=np.float64)[ini:fim]
+        ok = scores >= similaridade_min
+        indices, scores = indices[ok], scores[ok]
+        if limite:
+            ordem = np.lexsort((indices, -scores))[:limite]
+            indices, scores = indices[ordem], scores[ordem]
+        return list(zip(indices.tolist(), scores.tolist()))
+
+    def lotes(self, similaridade_min, limite=None, cancelado=lambda: False, tamanho=TAMANHO_BLOCO):
+        """Gera (registros, linhas_concluidas) como o `MotorComparacao.lotes`, só filtrando os pares."""
+        if similaridade_min < self.piso:
+            raise ValueError(f"Similaridade {similaridade_min}% abaixo do piso armazenado ({self.piso}%)")
+        memo = {}  # código -> (encontrado_exato, similares) já formatado
+        total = len(self.codigos)
+        for inicio in range(0, total, tamanho):
+            if cancelado():
+                return
+            registros = []
+            fim = min(inicio + tamanho, total)
+            for codigo, casou in zip(self.codigos[inicio:fim], self.casados_cpf[inicio:fim]):
+                if casou:
+                    registros.append([exibicao(self.unicos[codigo]), True, ""])
+                    continue
+                resultado = memo.get(codigo)
+                if resultado is None:
+                    encontrado_exato = bool(self.exatos[codigo])
+                    similares = ""
+                    if not encontrado_exato:
+                        similares = formatar_similares(self.acertos(codigo, similaridade_min, limite), self.escolhas)
+                    resultado = memo[codigo] = (encontrado_exato, similares)
+                registros.append([exibicao(self.unicos[codigo]), *resultado])
+            yield registros, fim
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado["_posicao"] = {}
+        return estado
+
+    def salvar(self, caminho):
+        """Grava o armazém (pickle, via arquivo temporário + os.replace)."""
+        pasta = os.path.dirname(os.path.abspath(caminho))
+        fd, temporario = tempfile.mkstemp(dir=pasta, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((VERSAO_ARMAZEM, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, caminho)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+    @staticmethod
+    def carregar(caminho):
+        with open(caminho, "rb") as f:
+            versao, armazem = pickle.load(f)
+        if versao != VERSAO_ARMAZEM or not isinstance(armazem, ArmazemScores):
+            raise ValueError(f"Arquivo de scores incompatível: {caminho}")
+        return armazem
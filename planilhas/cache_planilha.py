@@ -0,0 +1,136 @@
+"""
+Cache em disco da planilha 1 já preparada para a comparação.
+
+Quando a mesma planilha mestre é comparada várias vezes, os compostos de
+exibição e normalizados, o conjunto de CPFs, o índice exato e o índice de
+q-gramas (ou o lado da planilha 1 das chaves, na pontuação por coluna) e, com a
+opção fonética, os códigos fonéticos e o seu índice são reaproveitados em vez de
+recalculados. A chave combina o hash do conteúdo do arquivo, as colunas
+selecionadas, o modo de normalização, os tipos das chaves, a opção fonética e a
+versão do formato. Qualquer mudança em um deles gera uma entrada nova.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+# Mudar sempre que o conteúdo do preparo ou o formato dos índices mudar
+VERSAO_CACHE = 5
+
+# Entradas mantidas na pasta; as usadas há mais tempo são removidas ao gravar uma nova
+MAX_ENTRADAS_CACHE = 20
+
+_TAMANHO_LEITURA = 1 << 20
+
+
+@dataclass
+class PreparoPlanilha1:
+    compostos_exibicao: List[str]
+    compostos_norm: List[str]
+    cpf_col: Optional[str] = None  # coluna de CPF detectada pelo cabeçalho (None se não houver)
+    cpfs: Set[str] = field(default_factory=set)
+    indice_exato: Dict[str, List[int]] = field(default_factory=dict)
+    indice: object = None  # IndiceCandidatos
+    multichave: object = None  # PreparoMultiChave (só na pontuação por coluna)
+    fonetico: object = None  # IndiceFonetico (só com a opção fonética)
+
+
+def pasta_cache():
+    """Pasta de cache do usuário (%LOCALAPPDATA% no Windows, $XDG_CACHE_HOME ou ~/.cache nos demais)."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ComparadorPlanilhas", "planilha1")
+
+
+def hash_arquivo(caminho):
+    """SHA-256 do conteúdo do arquivo (lido em blocos)."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(_TAMANHO_LEITURA), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def chave_cache(hash_conteudo, colunas, modo, tipos=None, fonetica=False):
+    """`tipos`: tipos das chaves na pontuação por coluna (None no modo normal)."""
+    tipos = list(tipos) if tipos is not None else None
+    dados = json.dumps(
+        [VERSAO_CACHE, hash_conteudo, [str(c) for c in colunas], modo, tipos, bool(fonetica)], ensure_ascii=False
+    )
+    return hashlib.sha256(dados.encode("utf-8")).hexdigest()
+
+
+def _caminho_entrada(chave):
+    return os.path.join(pasta_cache(), f"{chave}.pkl")
+
+
+def existe_preparo(chave):
+    return os.path.exists(_caminho_entrada(chave))
+
+
+def carregar_preparo(chave):
+    """Preparo salvo para a chave, ou None (ausente, corrompido ou de outra versão)."""
+    caminho = _caminho_entrada(chave)
+    try:
+        with open(caminho, "rb") as f:
+            versao, preparo = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Entrada ilegível: descarta para ser recriada na próxima comparação
+        _remover(caminho)
+        return None
+    if versao != VERSAO_CACHE or not isinstance(preparo, PreparoPlanilha1):
+        _remover(caminho)
+        return None
+    try:
+        os.utime(caminho)  # entradas usadas recentemente sobrevivem à limpeza
+    except OSError:
+        pass
+    return preparo
+
+
+def salvar_preparo(chave, preparo):
+    """
+    Grava o preparo (arquivo temporário + os.replace, para nunca deixar uma entrada pela metade).
+    Falhas de gravação são ignoradas: o cache é só uma otimização.
+    """
+    pasta = pasta_cache()
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=pasta, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((VERSAO_CACHE, preparo), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, _caminho_entrada(chave))
+        except BaseException:
+            _remover(temporario)
+            raise
+        _limpar_antigos(pasta)
+    except OSError:
+        pass
+
+
+def _limpar_antigos(pasta):
+    entradas = [os.path.join(pasta, nome) for nome in os.listdir(pasta) if nome.endswith(".pkl")]
+    if len(entradas) <= MAX_ENTRADAS_CACHE:
+        return
+    entradas.sort(key=os.path.getmtime, reverse=True)
+    for caminho in entradas[MAX_ENTRADAS_CACHE:]:
+        _remover(caminho)
+
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
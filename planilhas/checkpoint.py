@@ -0,0 +1,158 @@
+"""
+Checkpoints de comparações longas, para retomar depois de um cancelamento ou de uma falha.
+
+Durante a comparação, os registros já calculados são gravados periodicamente numa
+pasta local, em partes (pickle) e num `estado.json` com quantas linhas da planilha 2
+já estão cobertas. A pasta é identificada pela assinatura da comparação (conteúdo
+das duas planilhas e configurações que mudam o resultado). Na próxima comparação
+com a mesma assinatura, as partes são regravadas na saída e a comparação continua
+da linha seguinte. Ao terminar com sucesso, o checkpoint é apagado.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+from planilhas.cache_planilha import pasta_cache
+
+VERSAO_CHECKPOINT = 1
+
+# Segundos entre dois checkpoints (o que foi calculado depois do último se perde numa falha)
+INTERVALO_CHECKPOINT = 30.0
+
+# Checkpoints não retomados há mais tempo que isso são apagados
+IDADE_MAXIMA = 7 * 24 * 3600
+
+_ARQUIVO_ESTADO = "estado.json"
+
+
+def pasta_checkpoints():
+    return os.path.join(os.path.dirname(pasta_cache()), "checkpoints")
+
+
+def assinatura_comparacao(hash_planilha1, hash_planilha2, config):
+    """Identifica a comparação: mesmas planilhas e mesmas configurações que afetam o resultado."""
+    chaves = [[c.coluna1, c.coluna2, c.tipo, c.peso] for c in config.chaves] if config.chaves else None
+    dados = json.dumps(
+        [
+            VERSAO_CHECKPOINT,
+            hash_planilha1,
+            hash_planilha2,
+            [str(c) for c in config.colunas1],
+            [str(c) for c in config.colunas2],
+            config.similaridade_min,
+            config.modo_normalizacao,
+            config.limite_similares,
+            config.piso_scores,
+            chaves,
+            config.fonetica,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(dados.encode("utf-8")).hexdigest()
+
+
+class Checkpoint:
+    """Partes já calculadas de uma comparação (ver docstring do módulo)."""
+
+    def __init__(self, pasta, intervalo=INTERVALO_CHECKPOINT):
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.linhas = 0  # linhas da planilha 2 cobertas pelas partes gravadas
+        self.linhas_reaproveitadas = 0
+        self._partes = []
+        self._ler_estado()
+
+    @classmethod
+    def abrir(cls, assinatura, intervalo=INTERVALO_CHECKPOINT):
+        """Checkpoint da comparação com essa assinatura (vazio se não houver um anterior)."""
+        _limpar_antigos()
+        return cls(os.path.join(pasta_checkpoints(), assinatura), intervalo)
+
+    def _ler_estado(self):
+        try:
+            with open(os.path.join(self.pasta, _ARQUIVO_ESTADO), "r", encoding="utf-8") as f:
+                estado = json.load(f)
+        except (OSError, ValueError):
+            return
+        partes = estado.get("partes", [])
+        if estado.get("versao") != VERSAO_CHECKPOINT or not all(
+            os.path.exists(os.path.join(self.pasta, nome)) for nome, _ in partes
+        ):
+            self.descartar()
+            return
+        self.linhas = int(estado["linhas"])
+        self.linhas_reaproveitadas = int(estado.get("linhas_reaproveitadas", 0))
+        self._partes = partes
+
+    def partes(self):
+        """Gera (registros, linhas_concluidas) das partes gravadas, em ordem."""
+        for nome, linhas in self._partes:
+            with open(os.path.join(self.pasta, nome), "rb") as f:
+                registros = pickle.load(f)
+            yield registros, linhas
+
+    def salvar(self, registros, linhas, linhas_reaproveitadas=0):
+        """
+        Grava uma parte com os `registros` seguintes e passa a cobrir `linhas` linhas.
+        Falhas de gravação são ignoradas: o checkpoint é só uma proteção a mais.
+        """
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            nome = f"parte_{len(self._partes) + 1:05d}.pkl"
+            _gravar_atomico(os.path.join(self.pasta, nome), pickle.dumps(registros, pickle.HIGHEST_PROTOCOL))
+            partes = self._partes + [[nome, linhas]]
+            estado = {
+                "versao": VERSAO_CHECKPOINT,
+                "linhas": linhas,
+                "linhas_reaproveitadas": linhas_reaproveitadas,
+                "partes": partes,
+            }
+            _gravar_atomico(os.path.join(self.pasta, _ARQUIVO_ESTADO), json.dumps(estado).encode("utf-8"))
+        except OSError:
+            return
+        self._partes = partes
+        self.linhas = linhas
+        self.linhas_reaproveitadas = linhas_reaproveitadas
+
+    def descartar(self):
+        shutil.rmtree(self.pasta, ignore_errors=True)
+        self.linhas = 0
+        self.linhas_reaproveitadas = 0
+        self._partes = []
+
+
+def _gravar_atomico(caminho, dados):
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+
+
+def _limpar_antigos():
+    pasta = pasta_checkpoints()
+    try:
+        nomes = os.listdir(pasta)
+    except OSError:
+        return
+    limite = time.time() - IDADE_MAXIMA
+    for nome in nomes:
+        caminho = os.path.join(pasta, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                shutil.rmtree(caminho, ignore_errors=True)
+        except OSError:
+            pass
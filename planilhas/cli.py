@@ -0,0 +1,393 @@
+"""
+Linha de comando do comparador de planilhas (sem interface gráfica).
+
+Dois subcomandos, ambos usando o mesmo `MotorComparacao` da interface:
+
+    comparador.py comparar PLANILHA1 PLANILHA2 --colunas1 NOME --colunas2 NOME --saida resultado.csv
+    comparador.py lote manifesto.json --paralelo 4 --resumo resumo.json
+
+e um terceiro, `refiltrar`, que regrava o resultado com outra similaridade a partir
+dos scores guardados por `comparar --guardar-scores` (sem comparar de novo):
+
+    comparador.py refiltrar scores.pkl --similaridade 85 --saida resultado85.csv
+
+O manifesto do modo lote é uma lista JSON de pares; cada par aceita as mesmas
+opções do subcomando `comparar` (as omitidas usam os valores padrão):
+
+    [
+        {"planilha1": "mestre.xlsx", "planilha2": "entrada1.xlsx",
+         "colunas1": ["NOME"], "colunas2": ["RAZAO SOCIAL"], "saida": "saida/entrada1.csv",
+         "similaridade": 90, "normalizacao": "padrao", "limite": 5}
+    ]
+
+Com "chaves" (ou --chaves), cada par de colunas (colunas1[i], colunas2[i]) é pontuado
+separadamente com o seu tipo e peso, em vez do composto inteiro:
+
+    comparador.py comparar mestre.xlsx entrada.xlsx --colunas1 NOME CIDADE CEP \
+        --colunas2 NOME MUNICIPIO CEP --chaves token_sort:3 ratio:1 numerico --saida resultado.csv
+
+Tipos: token_sort, ratio, token_set (fuzzy, com peso) e exato, numerico (filtros).
+
+Com "fonetica": true (ou --fonetica), as linhas com o mesmo código fonético (LUIZ/LUIS,
+SOUZA/SOUSA) também entram nos candidatos; a similaridade e o limite continuam sendo
+os do texto (ver planilhas/fonetica.py). Não se combina com "chaves".
+
+Comparações longas gravam checkpoints periódicos (ver planilhas/checkpoint.py): se uma
+execução for interrompida, rodar de novo com as mesmas planilhas e opções continua de
+onde parou ("checkpoint": false ou --sem-checkpoint desliga).
+
+Um item com "scores" (em vez de "planilha1"/"planilha2") é um refiltro.
+Caminhos relativos no manifesto são resolvidos a partir da pasta do manifesto.
+O resumo (JSON, na saída padrão ou em --resumo) traz tempos e contagens por par.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from planilhas.armazem_scores import PISO_PADRAO, ArmazemScores
+from planilhas.cache_planilha import carregar_preparo, chave_cache, hash_arquivo, salvar_preparo
+from planilhas.checkpoint import Checkpoint, assinatura_comparacao
+from planilhas.leitura import ler_colunas, ler_previa
+from planilhas.motor_comparacao import (
+    SIMILARIDADE_PADRAO,
+    ConfigComparacao,
+    MotorComparacao,
+    detectar_coluna_cpf,
+    preparar_planilha1,
+    reexportar,
+)
+from planilhas.multichave import TIPOS_CHAVE, ChaveColuna, validar_chaves
+from planilhas.normalizacao import (
+    MODO_IGNORAR_PONTUACAO,
+    MODO_PADRAO,
+    MODO_REMOVER_STOPWORDS,
+    MODO_SEM_NORMALIZACAO,
+    MODOS_NORMALIZACAO,
+)
+
+# Nomes curtos aceitos em --normalizacao (o texto completo do combobox também é aceito)
+MODOS_CLI = {
+    "padrao": MODO_PADRAO,
+    "ignorar-pontuacao": MODO_IGNORAR_PONTUACAO,
+    "remover-stopwords": MODO_REMOVER_STOPWORDS,
+    "sem-normalizacao": MODO_SEM_NORMALIZACAO,
+}
+
+
+class ErroCli(Exception):
+    """Erro de uso (arquivo, coluna ou manifesto inválido): vira mensagem, sem traceback."""
+
+
+def _modo_normalizacao(valor):
+    if valor in MODOS_NORMALIZACAO:
+        return valor
+    try:
+        return MODOS_CLI[valor]
+    except KeyError:
+        raise ErroCli(f"Normalização desconhecida: {valor!r} (use {', '.join(MODOS_CLI)})") from None
+
+
+def _chaves(especificacoes, colunas1, colunas2):
+    """Chaves da pontuação por coluna a partir de "tipo[:peso]", uma por par de colunas (ou None)."""
+    if not especificacoes:
+        return None
+    if not len(especificacoes) == len(colunas1) == len(colunas2):
+        raise ErroCli("Com chaves, informe o mesmo número de colunas1, colunas2 e chaves (uma por par)")
+    chaves = []
+    for especificacao, coluna1, coluna2 in zip(especificacoes, colunas1, colunas2):
+        tipo, _, peso = str(especificacao).partition(":")
+        try:
+            chaves.append(ChaveColuna(coluna1, coluna2, tipo, float(peso) if peso else 1.0))
+        except ValueError:
+            raise ErroCli(f"Peso inválido na chave {especificacao!r}") from None
+    try:
+        validar_chaves(chaves)
+    except ValueError as e:
+        raise ErroCli(str(e)) from None
+    return chaves
+
+
+def _colunas_leitura(caminho, colunas):
+    """Colunas pedidas + coluna de CPF do arquivo, conferindo se existem no cabeçalho."""
+    cabecalho = list(ler_previa(caminho, linhas=0).columns)
+    faltando = [col for col in colunas if col not in cabecalho]
+    if faltando:
+        raise ErroCli(f"Coluna(s) {', '.join(faltando)} não encontrada(s) em {caminho}")
+    cpf_col = detectar_coluna_cpf(cabecalho)
+    return list(colunas) + ([cpf_col] if cpf_col is not None and cpf_col not in colunas else [])
+
+
+def _carregar_planilha1(caminho, config, hash_planilha1=None):
+    """Preparo da planilha 1 (do cache em disco quando `hash_planilha1` é informado) e se veio do cache."""
+    chave = None
+    if hash_planilha1 is not None:
+        chave = chave_cache(
+            hash_planilha1, config.colunas1, config.modo_normalizacao, config.tipos_chaves, config.fonetica
+        )
+    if chave is not None:
+        preparo = carregar_preparo(chave)
+        if preparo is not None:
+            return preparo, True
+    df1 = ler_colunas(caminho, _colunas_leitura(caminho, config.colunas1))
+    preparo = preparar_planilha1(df1, config)
+    if chave is not None:
+        salvar_preparo(chave, preparo)
+    return preparo, False
+
+
+def executar_par(par):
+    """
+    Compara um par de planilhas descrito por um dicionário (mesmas chaves do manifesto).
+    Nunca lança exceção: erros vão para o resumo do par.
+    """
+    if par.get("scores"):
+        return _refiltrar(par)
+    resumo = {"planilha1": par.get("planilha1"), "planilha2": par.get("planilha2"), "saida": par.get("saida")}
+    inicio = time.perf_counter()
+    try:
+        for chave in ("planilha1", "planilha2", "colunas1", "colunas2", "saida"):
+            if not par.get(chave):
+                raise ErroCli(f"Campo obrigatório ausente: {chave!r}")
+        config = ConfigComparacao(
+            colunas1=list(par["colunas1"]),
+            colunas2=list(par["colunas2"]),
+            similaridade_min=float(par.get("similaridade", SIMILARIDADE_PADRAO)),
+            modo_normalizacao=_modo_normalizacao(par.get("normalizacao", "padrao")),
+            limite_similares=par.get("limite") or None,
+            processos=int(par.get("processos", 1)),
+            piso_scores=float(par.get("piso_scores", PISO_PADRAO)) if par.get("guardar_scores") else None,
+            chaves=_chaves(par.get("chaves"), par["colunas1"], par["colunas2"]),
+            fonetica=bool(par.get("fonetica", False)),
+            nome_planilha1=os.path.basename(par["planilha1"]),
+            nome_planilha2=os.path.basename(par["planilha2"]),
+        )
+        if config.fonetica and config.chaves:
+            raise ErroCli("A opção fonética não se combina com a pontuação por coluna (chaves)")
+
+        # Uma comparação retomada não traz os scores das linhas anteriores: com --guardar-scores, sem checkpoint
+        usar_cache = par.get("cache", True)
+        usar_checkpoint = par.get("checkpoint", True) and not par.get("guardar_scores")
+        hash1 = hash_arquivo(par["planilha1"]) if usar_cache or usar_checkpoint else None
+        t0 = time.perf_counter()
+        preparo1, do_cache = _carregar_planilha1(par["planilha1"], config, hash1 if usar_cache else None)
+        t_preparo = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        df2 = ler_colunas(par["planilha2"], _colunas_leitura(par["planilha2"], config.colunas2))
+        t_leitura2 = time.perf_counter() - t0
+
+        pasta_saida = os.path.dirname(os.path.abspath(par["saida"]))
+        os.makedirs(pasta_saida, exist_ok=True)
+        t0 = time.perf_counter()
+        checkpoint = None
+        if usar_checkpoint:
+            checkpoint = Checkpoint.abrir(assinatura_comparacao(hash1, hash_arquivo(par["planilha2"]), config))
+        resultado = MotorComparacao(preparo1, config).comparar(df2, par["saida"], checkpoint=checkpoint)
+        t_comparacao = time.perf_counter() - t0
+        if resultado.armazem is not None:
+            resultado.armazem.salvar(par["guardar_scores"])
+            resumo.update(scores=par["guardar_scores"], pares_armazenados=resultado.armazem.pares)
+
+        resumo.update(
+            status="ok",
+            linhas=resultado.linhas,
+            encontrados=resultado.encontrados,
+            com_similares=resultado.com_similares,
+            linhas_reaproveitadas=resultado.linhas_reaproveitadas,
+            retomado_de=resultado.retomado_de,
+            sem_correspondencia=resultado.linhas - resultado.encontrados - resultado.com_similares,
+            linhas_planilha1=len(preparo1.compostos_norm),
+            cache_planilha1=do_cache,
+            tempos={
+                "preparo_planilha1": round(t_preparo, 3),
+                "leitura_planilha2": round(t_leitura2, 3),
+                "comparacao": round(t_comparacao, 3),
+            },
+        )
+    except Exception as e:
+        resumo.update(status="erro", erro=str(e) or type(e).__name__)
+    resumo["tempo_total"] = round(time.perf_counter() - inicio, 3)
+    return resumo
+
+
+def _refiltrar(par):
+    """Regrava o resultado a partir de um arquivo de scores, com outra similaridade/limite."""
+    resumo = {"scores": par.get("scores"), "saida": par.get("saida")}
+    inicio = time.perf_counter()
+    try:
+        if not par.get("saida"):
+            raise ErroCli("Campo obrigatório ausente: 'saida'")
+        armazem = ArmazemScores.carregar(par["scores"])
+        config = dataclasses.replace(
+            armazem.config,
+            similaridade_min=float(par.get("similaridade", armazem.config.similaridade_min)),
+            limite_similares=par.get("limite") or None,
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(par["saida"])), exist_ok=True)
+        resultado = reexportar(armazem, config, par["saida"])
+        resumo.update(
+            status="ok",
+            linhas=resultado.linhas,
+            encontrados=resultado.encontrados,
+            com_similares=resultado.com_similares,
+            sem_correspondencia=resultado.linhas - resultado.encontrados - resultado.com_similares,
+        )
+    except Exception as e:
+        resumo.update(status="erro", erro=str(e) or type(e).__name__)
+    resumo["tempo_total"] = round(time.perf_counter() - inicio, 3)
+    return resumo
+
+
+def _ler_manifesto(caminho):
+    try:
+        with open(caminho, "r", encoding="utf-8-sig") as f:
+            pares = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ErroCli(f"Não foi possível ler o manifesto {caminho}: {e}") from None
+    if not isinstance(pares, list) or not all(isinstance(p, dict) for p in pares):
+        raise ErroCli("O manifesto deve ser uma lista JSON de objetos (um por par de planilhas)")
+
+    # Caminhos relativos a partir da pasta do manifesto
+    base = os.path.dirname(os.path.abspath(caminho))
+    for par in pares:
+        for chave in ("planilha1", "planilha2", "saida", "scores", "guardar_scores"):
+            if isinstance(par.get(chave), str) and not os.path.isabs(par[chave]):
+                par[chave] = os.path.join(base, par[chave])
+    return pares
+
+
+def executar_lote(pares, paralelo=1):
+    """Compara os pares em ordem (ou em `paralelo` processos) e devolve o resumo de cada um."""
+    if paralelo <= 1 or len(pares) <= 1:
+        return [executar_par(par) for par in pares]
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(paralelo, len(pares)), mp_context=contexto) as pool:
+        return list(pool.map(executar_par, pares))
+
+
+def _resumo_geral(resumos, inicio):
+    return {
+        "pares": resumos,
+        "total_pares": len(resumos),
+        "pares_com_erro": sum(r["status"] != "ok" for r in resumos),
+        "linhas": sum(r.get("linhas", 0) for r in resumos),
+        "encontrados": sum(r.get("encontrados", 0) for r in resumos),
+        "com_similares": sum(r.get("com_similares", 0) for r in resumos),
+        "linhas_reaproveitadas": sum(r.get("linhas_reaproveitadas", 0) for r in resumos),
+        "tempo_total": round(time.perf_counter() - inicio, 3),
+    }
+
+
+def _criar_parser():
+    parser = argparse.ArgumentParser(
+        prog="comparador",
+        description="Comparação de planilhas em linha de comando (sem interface gráfica).",
+    )
+    sub = parser.add_subparsers(dest="subcomando", required=True)
+
+    p_comparar = sub.add_parser("comparar", help="compara um par de planilhas")
+    p_comparar.add_argument("planilha1", help="planilha de referência")
+    p_comparar.add_argument("planilha2", help="planilha procurada na planilha 1")
+    p_comparar.add_argument("--colunas1", nargs="+", required=True, metavar="COLUNA")
+    p_comparar.add_argument("--colunas2", nargs="+", required=True, metavar="COLUNA")
+    p_comparar.add_argument("--saida", required=True, help="arquivo de resultado (.xlsx, .csv ou .parquet)")
+    p_comparar.add_argument("--similaridade", type=float, default=SIMILARIDADE_PADRAO)
+    p_comparar.add_argument("--normalizacao", default="padrao", help=f"um de: {', '.join(MODOS_CLI)}")
+    p_comparar.add_argument("--limite", type=int, default=0, help="K melhores similares por linha (0 = todos)")
+    p_comparar.add_argument("--processos", type=int, default=1, help="processos para fatiar a planilha 2")
+    p_comparar.add_argument(
+        "--chaves",
+        nargs="+",
+        metavar="TIPO[:PESO]",
+        help=f"pontua cada par de colunas separadamente; tipos: {', '.join(TIPOS_CHAVE)}",
+    )
+    p_comparar.add_argument(
+        "--fonetica",
+        action="store_true",
+        help="pontua também as linhas com a mesma pronúncia (LUIZ/LUIS, SOUZA/SOUSA)",
+    )
+    p_comparar.add_argument("--guardar-scores", metavar="ARQUIVO", help="guarda os scores para o 'refiltrar'")
+    p_comparar.add_argument(
+        "--piso-scores", type=float, default=PISO_PADRAO, help="menor score guardado (padrão: %(default)s)"
+    )
+
+    p_refiltrar = sub.add_parser("refiltrar", help="regrava o resultado com outra similaridade, sem recomparar")
+    p_refiltrar.add_argument("scores", help="arquivo gerado por 'comparar --guardar-scores'")
+    p_refiltrar.add_argument("--saida", required=True, help="arquivo de resultado (.xlsx, .csv ou .parquet)")
+    p_refiltrar.add_argument("--similaridade", type=float, required=True, help="deve ser >= piso dos scores")
+    p_refiltrar.add_argument("--limite", type=int, default=0, help="K melhores similares por linha (0 = todos)")
+
+    p_lote = sub.add_parser("lote", help="compara vários pares listados num manifesto JSON")
+    p_lote.add_argument("manifesto")
+    p_lote.add_argument("--paralelo", type=int, default=1, help="pares comparados ao mesmo tempo")
+
+    for p in (p_comparar, p_lote, p_refiltrar):
+        p.add_argument("--resumo", help="grava o resumo JSON neste arquivo (padrão: saída padrão)")
+    for p in (p_comparar, p_lote):
+        p.add_argument("--sem-cache", action="store_true", help="não usa o cache da planilha 1")
+        p.add_argument("--sem-checkpoint", action="store_true", help="não grava nem retoma checkpoints")
+    return parser
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando. Retorna o código de saída (0 = todos os pares ok)."""
+    args = _criar_parser().parse_args(argv)
+    inicio = time.perf_counter()
+    try:
+        if args.subcomando == "comparar":
+            pares = [
+                {
+                    "planilha1": args.planilha1,
+                    "planilha2": args.planilha2,
+                    "colunas1": args.colunas1,
+                    "colunas2": args.colunas2,
+                    "saida": args.saida,
+                    "similaridade": args.similaridade,
+                    "normalizacao": args.normalizacao,
+                    "limite": args.limite,
+                    "processos": args.processos,
+                    "chaves": args.chaves,
+                    "fonetica": args.fonetica,
+                    "guardar_scores": args.guardar_scores,
+                    "piso_scores": args.piso_scores,
+                }
+            ]
+            paralelo = 1
+        elif args.subcomando == "refiltrar":
+            pares = [
+                {"scores": args.scores, "saida": args.saida, "similaridade": args.similaridade, "limite": args.limite}
+            ]
+            paralelo = 1
+        else:
+            pares = _ler_manifesto(args.manifesto)
+            paralelo = args.paralelo
+    except ErroCli as e:
+        print(f"erro: {e}", file=sys.stderr)
+        return 2
+
+    if getattr(args, "sem_cache", False):
+        for par in pares:
+            par["cache"] = False
+    if getattr(args, "sem_checkpoint", False):
+        for par in pares:
+            par["checkpoint"] = False
+    resumo = _resumo_geral(executar_lote(pares, paralelo), inicio)
+
+    texto = json.dumps(resumo, ensure_ascii=False, indent=2)
+    if args.resumo:
+        with open(args.resumo, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    for r in resumo["pares"]:
+        if r["status"] != "ok":
+            print(f"erro em {r.get('planilha2') or r.get('scores')}: {r['erro']}", file=sys.stderr)
+    return 1 if resumo["pares_com_erro"] else 0
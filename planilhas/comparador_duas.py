@@ -1,18 +1,17 @@
 from __future__ import annotations
 
 import os
-import re
-import unicodedata
 
 import pandas as pd
-from rapidfuzz import fuzz
 
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (
     QAbstractItemView,
     QAbstractScrollArea,
+    QCheckBox,
     QComboBox,
+    QDoubleSpinBox,
     QFileDialog,
     QHeaderView,
     QHBoxLayout,
@@ -30,6 +29,25 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
+from planilhas.cache_planilha import carregar_preparo, chave_cache, existe_preparo, hash_arquivo, salvar_preparo
+from planilhas.checkpoint import Checkpoint, assinatura_comparacao
+from planilhas.cpf import normalizar_cpf
+from planilhas.execucao_paralela import processos_disponiveis
+from planilhas.leitura import ler_colunas, ler_previa
+from planilhas.armazem_scores import PISO_PADRAO
+from planilhas.motor_comparacao import (
+    LINHAS_AMOSTRA,
+    ConfigComparacao,
+    MotorComparacao,
+    detectar_coluna_cpf,
+    preparar_planilha1,
+    reexportar,
+)
+from planilhas.multichave import NOMES_TIPOS, TIPO_TOKEN_SORT, TIPOS_CHAVE, TIPOS_FILTRO, ChaveColuna
+from planilhas.normalizacao import MODO_PADRAO, MODOS_NORMALIZACAO, obter_normalizador, remover_sucessao
+from planilhas.progresso import MedidorProgresso, texto_velocidade
+from planilhas.saida import FORMATOS_SAIDA, extensao_saida
+
 
 class ComparadorPlanilhasWidget(QWidget):
     def __init__(self):
@@ -38,6 +56,26 @@ class ComparadorPlanilhasWidget(QWidget):
         self.df2 = None
         self.nome_arquivo1 = ""
         self.nome_arquivo2 = ""
+        # Carga em duas etapas (ver planilhas/leitura.py): prévia na hora e, em segundo plano,
+        # só as colunas marcadas. df1/df2 guardam as colunas já carregadas da planilha inteira.
+        self.caminhos = {1: None, 2: None}
+        self.previas = {1: None, 2: None}
+        self._colunas_carregadas = {1: None, 2: None}
+        self._geracao = {1: 0, 2: 0}  # muda a cada arquivo novo: descarta cargas antigas
+        self._carregadores = {1: None, 2: None}
+        self._comparar_apos_carga = False
+        # Hash do conteúdo de cada arquivo e preparo da planilha 1 já obtido (ver cache_planilha.py).
+        # O hash é calculado em segundo plano depois da prévia (lê o arquivo inteiro)
+        self.hashes = {1: None, 2: None}
+        self._calculadores_hash = {1: None, 2: None}
+        self._preparo1 = (None, None)
+        # Scores guardados da última comparação com piso (sobrevive ao "Limpar tudo": ao reabrir
+        # as mesmas planilhas, outra similaridade >= piso é só um filtro sobre eles)
+        self._armazem = (None, None)
+        self._assinatura_comparacao = None
+        self._retomavel = False  # a comparação em andamento grava checkpoints
+        # Pontuação por coluna: (coluna1, coluna2) -> (tipo, peso) escolhidos em "Chaves..."
+        self._tipos_pesos = {}
 
         # Define caminho padrão de saída (Desktop)
         import os
@@ -70,6 +108,7 @@ class ComparadorPlanilhasWidget(QWidget):
         # Lista de colunas (multi-seleção) para a primeira planilha (sempre visível)
         self.lst_colunas1 = QListWidget()
         self.lst_colunas1.setMinimumWidth(220)
+        self.lst_colunas1.itemChanged.connect(lambda _item: self._carregar_colunas(1))
         layout1.addWidget(self.btn_arquivo1)
         layout1.addWidget(self.lst_colunas1)
         layout.addLayout(layout1)
@@ -93,6 +132,7 @@ class ComparadorPlanilhasWidget(QWidget):
         # Lista de colunas (multi-seleção) para a segunda planilha (sempre visível)
         self.lst_colunas2 = QListWidget()
         self.lst_colunas2.setMinimumWidth(220)
+        self.lst_colunas2.itemChanged.connect(lambda _item: self._carregar_colunas(2))
         layout2.addWidget(self.btn_arquivo2)
         layout2.addWidget(self.lst_colunas2)
         layout.addLayout(layout2)
@@ -111,18 +151,69 @@ class ComparadorPlanilhasWidget(QWidget):
         self.spin_similaridade.setValue(90)
         sim_layout.addWidget(self.spin_similaridade)
 
+        # Máximo de similares por linha (0 = todos); com limite ficam só os K melhores
+        sim_layout.addWidget(QLabel("Máx. similares:"))
+        self.spin_max_similares = QSpinBox()
+        self.spin_max_similares.setRange(0, 1000)
+        self.spin_max_similares.setValue(0)
+        self.spin_max_similares.setSpecialValueText("Todos")
+        self.spin_max_similares.setToolTip(
+            "Quantidade máxima de nomes similares por linha (os de maior similaridade).\n"
+            "Evita células enormes quando a similaridade mínima é baixa."
+        )
+        sim_layout.addWidget(self.spin_max_similares)
+
+        # Piso dos scores guardados (0 = não guarda)
+        sim_layout.addWidget(QLabel("Guardar scores a partir de:"))
+        self.spin_piso_scores = QSpinBox()
+        self.spin_piso_scores.setRange(0, 100)
+        self.spin_piso_scores.setValue(0)
+        self.spin_piso_scores.setSuffix("%")
+        self.spin_piso_scores.setSpecialValueText("Não guardar")
+        self.spin_piso_scores.setToolTip(
+            f"Guarda todos os pares a partir deste percentual (sugestão: {PISO_PADRAO}%).\n"
+            "Depois, comparar as mesmas planilhas com outra similaridade acima do piso\n"
+            "só refiltra os scores guardados, em segundos. A primeira comparação fica mais lenta."
+        )
+        sim_layout.addWidget(self.spin_piso_scores)
+
         # Regras de normalização
         self.cmb_normalizacao = QComboBox()
-        self.cmb_normalizacao.addItems(
-            [
-                "Padrão (acentos+maiusc+espaços)",
-                "Ignorar pontuação",
-                "Remover stopwords (LTDA, ME, SA)",
-                "Sem normalização",
-            ]
-        )
+        self.cmb_normalizacao.addItems(list(MODOS_NORMALIZACAO))
         sim_layout.addWidget(QLabel("Normalização:"))
         sim_layout.addWidget(self.cmb_normalizacao)
+
+        # Execução em vários processos (planilha 2 dividida em fatias)
+        self.chk_processos = QCheckBox(f"Vários processos ({processos_disponiveis()} núcleos)")
+        self.chk_processos.setToolTip(
+            "Divide a planilha 2 entre vários processos. Indicado para planilhas grandes;\n"
+            "em planilhas pequenas o custo de iniciar os processos não compensa."
+        )
+        sim_layout.addWidget(self.chk_processos)
+
+        # Pontuação por coluna: cada par de colunas marcadas com o seu tipo e peso
+        self.chk_por_coluna = QCheckBox("Pontuar por coluna")
+        self.chk_por_coluna.setToolTip(
+            "Compara a 1ª coluna marcada da planilha 1 com a 1ª da planilha 2, a 2ª com a 2ª etc.,\n"
+            "cada par com o seu tipo e peso, em vez de juntar tudo num texto só.\n"
+            "Colunas exatas/numéricas filtram os pares antes da parte fuzzy (bem mais rápido)."
+        )
+        self.btn_chaves = QPushButton("⚖️ Chaves...")
+        self.btn_chaves.setEnabled(False)
+        self.btn_chaves.clicked.connect(self._editar_chaves)
+        self.chk_por_coluna.toggled.connect(self.btn_chaves.setEnabled)
+        sim_layout.addWidget(self.chk_por_coluna)
+        sim_layout.addWidget(self.btn_chaves)
+
+        # Grafias diferentes do mesmo som (LUIZ/LUIS, SOUZA/SOUSA, THIAGO/TIAGO)
+        self.chk_fonetica = QCheckBox("Fonética")
+        self.chk_fonetica.setToolTip(
+            "Pontua também as linhas com a mesma pronúncia (LUIZ/LUIS, SOUZA/SOUSA, THIAGO/TIAGO).\n"
+            "A similaridade e o limite continuam sendo os do texto.\n"
+            "Não se aplica à pontuação por coluna."
+        )
+        self.chk_por_coluna.toggled.connect(lambda marcado: self.chk_fonetica.setEnabled(not marcado))
+        sim_layout.addWidget(self.chk_fonetica)
         layout.addLayout(sim_layout)
 
         # --- Botões de ação ---
@@ -171,8 +262,12 @@ class ComparadorPlanilhasWidget(QWidget):
             }
         """
         )
+        # Velocidade (linhas/s) e tempo restante estimado da comparação em andamento
+        self.lbl_velocidade = QLabel("")
+        self.lbl_velocidade.setMinimumWidth(220)
         compare_layout.addWidget(self.btn_comparar)
         compare_layout.addWidget(self.progress)
+        compare_layout.addWidget(self.lbl_velocidade)
         compare_layout.addWidget(self.btn_cancelar)
         layout.addLayout(compare_layout)
 
@@ -199,19 +294,19 @@ class ComparadorPlanilhasWidget(QWidget):
             return
         # Se vier 1 arquivo, coloca na próxima planilha vazia; se vierem 2, preenche ambas
         try:
-            if self.df1 is None and len(excel_files) >= 1:
+            if self.caminhos[1] is None and len(excel_files) >= 1:
                 self._carregar_arquivo_em_planilha(1, excel_files[0])
-            elif self.df2 is None and len(excel_files) >= 1:
+            elif self.caminhos[2] is None and len(excel_files) >= 1:
                 self._carregar_arquivo_em_planilha(2, excel_files[0])
             elif len(excel_files) >= 2:
                 # Se ambas estão vazias, preenche ambas
-                if self.df1 is None and self.df2 is None:
+                if self.caminhos[1] is None and self.caminhos[2] is None:
                     self._carregar_arquivo_em_planilha(1, excel_files[0])
                     self._carregar_arquivo_em_planilha(2, excel_files[1])
                 # Se apenas uma está vazia, preenche a vazia
-                elif self.df1 is None:
+                elif self.caminhos[1] is None:
                     self._carregar_arquivo_em_planilha(1, excel_files[0])
-                elif self.df2 is None:
+                elif self.caminhos[2] is None:
                     self._carregar_arquivo_em_planilha(2, excel_files[0])
                 # Se ambas estão preenchidas, substitui a segunda
                 else:
@@ -220,38 +315,281 @@ class ComparadorPlanilhasWidget(QWidget):
             self._mostrar_erro("Falha no arrastar e soltar", "Não foi possível carregar os arquivos arrastados.")
 
     def _carregar_arquivo_em_planilha(self, num, path):
-        try:
-            df = pd.read_excel(path)
-        except Exception:
-            raise
-        if df is None or len(df) == 0:
-            QMessageBox.warning(self, "Aviso", "A planilha arrastada está vazia.")
-        preview = df.head(25)
+        """Lê cabeçalho e prévia fora da thread da interface; o restante vem depois, por coluna."""
+        self._geracao[num] += 1
+        # O caminho já ocupa a planilha (o arrastar e soltar não deve sobrescrevê-la durante a carga)
+        self.caminhos[num] = path
+        self.previas[num] = None
+        self.hashes[num] = None
+        self._calculadores_hash[num] = None
+        self._colunas_carregadas[num] = None
+        lbl = self.lbl_arquivo1 if num == 1 else self.lbl_arquivo2
+        lbl.setText(f"⏳ Carregando {path}...")
+        worker = CarregarPlanilhaWorker(num, path, self._geracao[num])
+        worker.finished.connect(self._previa_carregada)
+        worker.error.connect(self._erro_carregamento)
+        self._carregadores[num] = worker
+        worker.start()
+
+    def _previa_carregada(self, payload):
+        num = payload["num"]
+        if payload["geracao"] != self._geracao[num]:
+            return
+        self._carregadores[num] = None
+        path = payload["caminho"]
+        preview = payload["df"]
+        if len(preview) == 0:
+            QMessageBox.warning(self, "Aviso", "A planilha selecionada está vazia.")
         nome_arquivo = path.split("/")[-1].split("\\")[-1]
+        self.previas[num] = preview
+        lista = self.lst_colunas1 if num == 1 else self.lst_colunas2
         if num == 1:
-            self.df1 = df
+            self.df1 = None
             self.nome_arquivo1 = nome_arquivo
             self.lbl_arquivo1.setText(f"📁 {path}")
-            self.lst_colunas1.clear()
-            for col in df.columns:
-                item = QListWidgetItem(str(col))
-                item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-                item.setCheckState(Qt.Unchecked)
-                self.lst_colunas1.addItem(item)
-            self.mostrar_preview(self.tabela_preview1, preview)
         else:
-            self.df2 = df
+            self.df2 = None
             self.nome_arquivo2 = nome_arquivo
             self.lbl_arquivo2.setText(f"📁 {path}")
-            self.lst_colunas2.clear()
-            for col in df.columns:
-                item = QListWidgetItem(str(col))
-                item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-                item.setCheckState(Qt.Unchecked)
-                self.lst_colunas2.addItem(item)
-            self.mostrar_preview(self.tabela_preview2, preview)
+        lista.blockSignals(True)
+        lista.clear()
+        for col in preview.columns:
+            item = QListWidgetItem(str(col))
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            lista.addItem(item)
+        lista.blockSignals(False)
+        self.mostrar_preview(self.tabela_preview1 if num == 1 else self.tabela_preview2, preview)
+        self._calcular_hash(num)
+
+    def _calcular_hash(self, num):
+        """Hash do arquivo em segundo plano, depois da prévia: só a comparação precisa dele."""
+        worker = HashArquivoWorker(num, self.caminhos[num], self._geracao[num])
+        worker.finished.connect(self._hash_calculado)
+        self._calculadores_hash[num] = worker
+        worker.start()
+
+    def _hash_calculado(self, payload):
+        num = payload["num"]
+        if payload["geracao"] != self._geracao[num]:
+            return
+        self._calculadores_hash[num] = None
+        self.hashes[num] = payload["hash"]
+        if num == 1:
+            # Com o hash, a planilha 1 pode vir do cache em vez de ser lida (ver _carregar_colunas)
+            self._carregar_colunas(1)
+        self._comparar_se_aguardando()
+
+    def _colunas_necessarias(self, num):
+        """Colunas marcadas + coluna de CPF (se houver): as únicas lidas da planilha inteira."""
+        lista = self.lst_colunas1 if num == 1 else self.lst_colunas2
+        colunas = self._obter_colunas_selecionadas(lista)
+        cpf_col = self._get_cpf_column(self.previas[num]) if self.previas[num] is not None else None
+        if cpf_col is not None and cpf_col not in colunas:
+            colunas.append(cpf_col)
+        return colunas
+
+    def _colunas_prontas(self, num):
+        carregadas = self._colunas_carregadas[num]
+        return carregadas is not None and set(self._colunas_necessarias(num)) <= set(carregadas)
+
+    def _carregar_colunas(self, num):
+        """Carrega em segundo plano as colunas marcadas (se ainda não carregadas)."""
+        if self.caminhos[num] is None or self._carregadores[num] is not None:
+            return  # ao terminar a carga em andamento, confere de novo
+        if num == 1 and self._calculadores_hash[1] is not None:
+            return  # ao terminar o hash, confere de novo (o preparo pode estar em cache)
+        colunas = self._colunas_necessarias(num)
+        if not colunas or self._colunas_prontas(num):
+            return
+        if num == 1:
+            chave = self._chave_preparo1(self._obter_colunas_selecionadas(self.lst_colunas1))
+            if chave is not None and existe_preparo(chave):
+                return  # planilha 1 já preparada em cache: não precisa ser lida
+        worker = CarregarPlanilhaWorker(num, self.caminhos[num], self._geracao[num], colunas)
+        worker.finished.connect(self._colunas_carregadas_ok)
+        worker.error.connect(self._erro_carregamento)
+        self._carregadores[num] = worker
+        worker.start()
+
+    def _colunas_carregadas_ok(self, payload):
+        num = payload["num"]
+        if payload["geracao"] != self._geracao[num]:
+            return
+        self._carregadores[num] = None
+        if num == 1:
+            self.df1 = payload["df"]
+        else:
+            self.df2 = payload["df"]
+        self._colunas_carregadas[num] = payload["colunas"]
+        if not self._colunas_prontas(num):
+            # As colunas marcadas mudaram durante a carga
+            self._carregar_colunas(num)
+        else:
+            self._comparar_se_aguardando()
+
+    def _comparar_se_aguardando(self):
+        """Comparação pedida durante a carga (colunas ou hash): roda quando tudo ficar pronto."""
+        if self._comparar_apos_carga and self._pronto_para_comparar():
+            self._comparar_apos_carga = False
+            self.progress.setRange(0, 100)
+            self.btn_comparar.setEnabled(True)
+            self.comparar()
+
+    def _assinatura_armazem(self, colunas1, colunas2):
+        """Identifica os dados de entrada de uma comparação (arquivos, colunas, normalização, chaves, fonética)."""
+        return (
+            self.hashes[1],
+            self.hashes[2],
+            tuple(colunas1),
+            tuple(colunas2),
+            self.cmb_normalizacao.currentText(),
+            tuple(self._chaves_selecionadas(colunas1, colunas2) or ()),
+            self._fonetica(),
+        )
 
-        # (ajuda já adicionada no layout principal)
+    def _armazem_reaproveitavel(self, colunas1, colunas2, similaridade_min):
+        assinatura, armazem = self._armazem
+        if armazem is None or None in assinatura[:2] or assinatura != self._assinatura_armazem(colunas1, colunas2):
+            return None
+        return armazem if similaridade_min >= armazem.piso else None
+
+    def _config_comparacao(self, colunas1, colunas2):
+        return ConfigComparacao(
+            colunas1=colunas1,
+            colunas2=colunas2,
+            similaridade_min=self.spin_similaridade.value(),
+            modo_normalizacao=self.cmb_normalizacao.currentText(),
+            limite_similares=self.spin_max_similares.value() or None,
+            processos=processos_disponiveis() if self.chk_processos.isChecked() else 1,
+            piso_scores=self.spin_piso_scores.value() or None,
+            chaves=self._chaves_selecionadas(colunas1, colunas2),
+            fonetica=self._fonetica(),
+            nome_planilha1=self.nome_arquivo1 or "PLANILHA 1",
+            nome_planilha2=self.nome_arquivo2 or "PLANILHA 2",
+        )
+
+    def _chaves_selecionadas(self, colunas1=None, colunas2=None):
+        """Chaves da pontuação por coluna (pares na ordem das listas) ou None fora desse modo."""
+        if not self.chk_por_coluna.isChecked():
+            return None
+        if colunas1 is None:
+            colunas1 = self._obter_colunas_selecionadas(self.lst_colunas1)
+        if colunas2 is None:
+            colunas2 = self._obter_colunas_selecionadas(self.lst_colunas2)
+        if not colunas1 or len(colunas1) != len(colunas2):
+            return None
+        padrao = (TIPO_TOKEN_SORT, 1.0)
+        return [ChaveColuna(c1, c2, *self._tipos_pesos.get((c1, c2), padrao)) for c1, c2 in zip(colunas1, colunas2)]
+
+    def _editar_chaves(self):
+        """Diálogo com o tipo e o peso de cada par de colunas marcadas."""
+        from PyQt5.QtWidgets import QDialog, QDialogButtonBox
+
+        colunas1 = self._obter_colunas_selecionadas(self.lst_colunas1)
+        colunas2 = self._obter_colunas_selecionadas(self.lst_colunas2)
+        if not colunas1 or len(colunas1) != len(colunas2):
+            QMessageBox.warning(
+                self,
+                "Chaves",
+                "Marque o mesmo número de colunas nas duas planilhas (a 1ª com a 1ª, a 2ª com a 2ª...).",
+            )
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Pontuação por coluna")
+        dialog.setMinimumWidth(700)
+        v = QVBoxLayout(dialog)
+        v.addWidget(
+            QLabel(
+                "O score de cada par de linhas é a média ponderada das colunas fuzzy.\n"
+                "Colunas exatas/numéricas não têm peso: o par só é pontuado se elas forem iguais."
+            )
+        )
+        tabela = QTableWidget(len(colunas1), 4)
+        tabela.setHorizontalHeaderLabels(["Planilha 1", "Planilha 2", "Tipo", "Peso"])
+        editores = []
+        for i, (c1, c2) in enumerate(zip(colunas1, colunas2)):
+            tipo, peso = self._tipos_pesos.get((c1, c2), (TIPO_TOKEN_SORT, 1.0))
+            tabela.setItem(i, 0, QTableWidgetItem(c1))
+            tabela.setItem(i, 1, QTableWidgetItem(c2))
+            cmb_tipo = QComboBox()
+            for t in TIPOS_CHAVE:
+                cmb_tipo.addItem(NOMES_TIPOS[t], t)
+            cmb_tipo.setCurrentIndex(TIPOS_CHAVE.index(tipo))
+            spin_peso = QDoubleSpinBox()
+            spin_peso.setRange(0.1, 100.0)
+            spin_peso.setSingleStep(0.5)
+            spin_peso.setValue(peso)
+            spin_peso.setEnabled(tipo not in TIPOS_FILTRO)
+            cmb_tipo.currentIndexChanged.connect(
+                lambda _i, cmb=cmb_tipo, spin=spin_peso: spin.setEnabled(cmb.currentData() not in TIPOS_FILTRO)
+            )
+            tabela.setCellWidget(i, 2, cmb_tipo)
+            tabela.setCellWidget(i, 3, spin_peso)
+            editores.append((c1, c2, cmb_tipo, spin_peso))
+        tabela.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        tabela.horizontalHeader().setStretchLastSection(True)
+        v.addWidget(tabela)
+        botoes = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        botoes.accepted.connect(dialog.accept)
+        botoes.rejected.connect(dialog.reject)
+        v.addWidget(botoes)
+        if dialog.exec() != 1:
+            return
+        for c1, c2, cmb_tipo, spin_peso in editores:
+            self._tipos_pesos[(c1, c2)] = (cmb_tipo.currentData(), spin_peso.value())
+        if all(cmb.currentData() in TIPOS_FILTRO for _, _, cmb, _ in editores):
+            QMessageBox.information(
+                self, "Chaves", "Nenhuma coluna fuzzy: os pares que passarem pelos filtros terão score 100%."
+            )
+
+    def _chave_preparo1(self, colunas1):
+        if self.hashes[1] is None:
+            return None
+        chaves = self._chaves_selecionadas(colunas1)
+        tipos = tuple(chave.tipo for chave in chaves) if chaves else None
+        return chave_cache(self.hashes[1], colunas1, self.cmb_normalizacao.currentText(), tipos, self._fonetica())
+
+    def _fonetica(self):
+        return self.chk_fonetica.isChecked() and not self.chk_por_coluna.isChecked()
+
+    def _preparo1_em_memoria(self, chave):
+        """Preparo da planilha 1 já em memória para a chave (o do cache em disco é lido pela tarefa)."""
+        chave_memoria, preparo = self._preparo1
+        return preparo if chave is not None and chave_memoria == chave else None
+
+    def _preparo1_disponivel(self, colunas1):
+        """Há preparo da planilha 1 em memória ou no cache: as colunas dela não precisam ser lidas."""
+        chave = self._chave_preparo1(colunas1)
+        # Só confere a existência: carregar (unpickle do índice inteiro) travaria a interface
+        return self._preparo1_em_memoria(chave) is not None or (chave is not None and existe_preparo(chave))
+
+    def _pronto_para_comparar(self):
+        if any(worker is not None for worker in self._calculadores_hash.values()):
+            return False  # o hash entra na chave do cache, no armazém de scores e no checkpoint
+        colunas1 = self._obter_colunas_selecionadas(self.lst_colunas1)
+        planilha1_pronta = self._colunas_prontas(1) or self._preparo1_disponivel(colunas1)
+        return planilha1_pronta and self._colunas_prontas(2)
+
+    def _erro_carregamento(self, payload):
+        num = payload["num"]
+        if payload["geracao"] != self._geracao[num]:
+            return
+        self._carregadores[num] = None
+        if payload["colunas"] is None:
+            # A prévia falhou: a planilha volta a ficar vazia
+            self.caminhos[num] = None
+        if self._comparar_apos_carga:
+            self._comparar_apos_carga = False
+            self.progress.setRange(0, 100)
+            self.btn_comparar.setEnabled(True)
+        lbl = self.lbl_arquivo1 if num == 1 else self.lbl_arquivo2
+        lbl.setText(f"📁 {self.caminhos[num]}" if self.caminhos[num] else "Nenhum arquivo selecionado")
+        self._mostrar_erro(
+            "Falha ao abrir arquivo",
+            "Não foi possível ler a planilha.\nVerifique se o arquivo está corrompido ou protegido por senha.",
+        )
 
     def _obter_colunas_selecionadas(self, lista_widget):
         colunas = []
@@ -266,92 +604,49 @@ class ComparadorPlanilhasWidget(QWidget):
 
     def remover_sucessao(self, texto):
         """Remove ocorrências de '( SUCESSÃO DE )' ou '( SUCESSAO DE )' do texto original (case-insensitive)."""
-        if texto is None:
-            return texto
-        s = str(texto)
-        # Remoções com e sem acento, tolerando espaços extras
-        s = re.sub(r"\(\s*SUCESSÃO\s+DE\s*\)", " ", s, flags=re.IGNORECASE)
-        s = re.sub(r"\(\s*SUCESSAO\s+DE\s*\)", " ", s, flags=re.IGNORECASE)
-        # Normaliza espaços
-        s = re.sub(r"\s+", " ", s).strip()
-        return s
+        return remover_sucessao(texto)
 
     def _normalize_cpf(self, valor):
-        if valor is None or pd.isna(valor):
-            return ""
-        return re.sub(r"\D", "", str(valor))
+        return normalizar_cpf(valor)
 
     def _get_cpf_column(self, df):
-        for col in df.columns:
-            header = str(col)
-            header_norm = unicodedata.normalize("NFD", header)
-            header_norm = "".join(c for c in header_norm if unicodedata.category(c) != "Mn")
-            header_norm = re.sub(r"[^A-Z0-9]", "", header_norm.upper())
-            if header_norm == "CPF":
-                return col
-        return None
-
-    def _build_cpf_set_df1(self, cpf_col_df1):
-        cpfs = set()
-        if cpf_col_df1 is None or cpf_col_df1 not in self.df1.columns:
-            return cpfs
-        for _, row in self.df1.iterrows():
-            cpf_val = self._normalize_cpf(row[cpf_col_df1]) if cpf_col_df1 in self.df1.columns else ""
-            if cpf_val:
-                cpfs.add(cpf_val)
-        return cpfs
-
-    def _preparar_compostos_df1(self, colunas1):
-        df1_compostos_norm = []
-        df1_compostos_exibicao = []
-        for _, row in self.df1.iterrows():
-            partes_exibicao = [str(row[col]) if col in self.df1.columns else "" for col in colunas1]
-            composto_exibicao = " | ".join(partes_exibicao)
-            composto_exibicao = self.remover_sucessao(composto_exibicao)
-            composto_normalizado = self.normalizar_texto(composto_exibicao)
-            df1_compostos_exibicao.append(composto_exibicao)
-            df1_compostos_norm.append(composto_normalizado)
-        return df1_compostos_exibicao, df1_compostos_norm
-
-    def _calcular_resultado_linha(
-        self,
-        row,
-        colunas2,
-        similaridade_min,
-        df1_compostos_exibicao,
-        df1_compostos_norm,
-        cpf_col_df1,
-        cpf_col_df2,
-        df1_cpfs_set,
-    ):
-        partes2_exibicao = [str(row[col]) if col in self.df2.columns else "" for col in colunas2]
-        valor = " | ".join(partes2_exibicao)
-        valor = self.remover_sucessao(valor)
-        valor_normalizado = self.normalizar_texto(valor)
-        valor_exibicao = valor_normalizado
-        encontrado_exato = False
-        nomes_similares = []
-
-        # 1) Se ambas possuem coluna CPF, prioriza match exato por CPF
-        if cpf_col_df1 and cpf_col_df2 and cpf_col_df2 in self.df2.columns:
-            cpf_val = self._normalize_cpf(row[cpf_col_df2]) if not pd.isna(row[cpf_col_df2]) else ""
-            if cpf_val and cpf_val in df1_cpfs_set:
-                encontrado_exato = True
-                return valor_exibicao, encontrado_exato, ""
-
-        for nome_sistema_normalizado in df1_compostos_norm:
-            if nome_sistema_normalizado == valor_normalizado:
-                encontrado_exato = True
-                break
-
-        if not encontrado_exato:
-            for composto_exibicao, composto_norm in zip(df1_compostos_exibicao, df1_compostos_norm):
-                score = fuzz.token_sort_ratio(composto_norm, valor_normalizado)
-                if score >= similaridade_min:
-                    score_formatado = f"{score:.1f}".replace(".", ",")
-                    nomes_similares.append(f"{self.normalizar_texto(composto_exibicao)} ({score_formatado}%)")
-
-        return valor_exibicao, encontrado_exato, ", ".join(nomes_similares) if nomes_similares else ""
+        return detectar_coluna_cpf(df.columns)
+
+    def _tarefa_amostra(self, config):
+        """
+        Tarefa do `AmostraWorker`: prepara a planilha 1 (ou reaproveita o preparo em memória/cache)
+        e calcula a pré-visualização. O que depende dos widgets é lido aqui, na thread da interface;
+        o preparo em cache é carregado já dentro da tarefa (com uma planilha mestre grande, o
+        unpickle leva segundos).
+        """
+        chave = self._chave_preparo1(config.colunas1)
+        preparo = self._preparo1_em_memoria(chave)
+        df1 = self.df1 if self._colunas_prontas(1) else None
+        df2 = self.df2.copy()
+        # Se o cache sumir (ou estiver corrompido) entre a conferência e a tarefa, as colunas
+        # da planilha 1 são lidas por ela mesma
+        caminho1, colunas_necessarias1 = self.caminhos[1], self._colunas_necessarias(1)
+
+        def tarefa(cancelado):
+            preparo1 = preparo
+            if preparo1 is None and chave is not None:
+                preparo1 = carregar_preparo(chave)
+            if preparo1 is None:
+                planilha1 = df1 if df1 is not None else ler_colunas(caminho1, colunas_necessarias1)
+                if cancelado():
+                    return None
+                preparo1 = preparar_planilha1(planilha1, config)
+                if chave is not None:
+                    salvar_preparo(chave, preparo1)
+            if cancelado():
+                return None
+            motor = MotorComparacao(preparo1, config)
+            amostra = motor.amostra(df2, cancelado=cancelado)
+            if cancelado():
+                return None
+            return {"chave": chave, "preparo": preparo1, "motor": motor, "amostra": amostra, "df2": df2}
+
+        return tarefa
 
     def _mostrar_preview_dialog(self, df_preview, titulo="Pré-visualização (até 20 linhas)"):
         from PyQt5.QtWidgets import QDialog, QDialogButtonBox
@@ -444,52 +739,16 @@ class ComparadorPlanilhasWidget(QWidget):
         self.btn_saida.setStyleSheet("background-color: #3498db; color: white;")  # Azul - Selecionar
         self.btn_cancelar.setStyleSheet("background-color: #e74c3c; color: white;")  # Vermelho - Cancelar
 
+    def _normalizador(self):
+        modo = self.cmb_normalizacao.currentText() if hasattr(self, "cmb_normalizacao") else MODO_PADRAO
+        return obter_normalizador(modo)
+
     def normalizar_texto(self, texto):
         """
         Normaliza texto removendo acentos, espaços extras e convertendo para maiúsculas,
         com variações baseadas na seleção do usuário.
         """
-        if pd.isna(texto) or texto is None:
-            return ""
-
-        # Converte para string e remove espaços no início e fim
-        texto = str(texto).strip()
-
-        # Remove espaços duplos, triplos, etc. e substitui por espaço simples
-        texto = re.sub(r"\s+", " ", texto)
-
-        modo = (
-            self.cmb_normalizacao.currentText()
-            if hasattr(self, "cmb_normalizacao")
-            else "Padrão (acentos+maiusc+espaços)"
-        )
-
-        # Base: remove acentos
-        texto_base = unicodedata.normalize("NFD", texto)
-        texto_base = "".join(c for c in texto_base if unicodedata.category(c) != "Mn")
-
-        if modo == "Sem normalização":
-            return texto
-
-        if modo == "Ignorar pontuação":
-            texto_base = re.sub(r"[\p{P}\p{S}]", " ", texto_base)
-        else:
-            # Remove apenas alguns sinais comuns
-            texto_base = re.sub(r"[,;:.!?'\-]", " ", texto_base)
-
-        if modo == "Remover stopwords (LTDA, ME, SA)":
-            stop = {"LTDA", "ME", "S/A", "SA", "EIRELI", "EPP"}
-            palavras = [p for p in texto_base.split() if p.upper() not in stop]
-            texto_base = " ".join(palavras)
-
-        # Regra específica: remover ocorrências de "( SUCESSÃO DE )"
-        # Como já removemos acentos acima, procuramos por "SUCESSAO".
-        # Aceita variações de espaço e caixa.
-        texto_base = re.sub(r"\(\s*SUCESSAO\s+DE\s*\)", " ", texto_base, flags=re.IGNORECASE)
-        # Normaliza espaços novamente após remoção
-        texto_base = re.sub(r"\s+", " ", texto_base).strip()
-
-        return texto_base.upper()
+        return self._normalizador().normalizar(texto)
 
     def limpar_campos(self):
         """Limpa todos os campos da interface"""
@@ -497,6 +756,16 @@ class ComparadorPlanilhasWidget(QWidget):
         self.df2 = None
         self.nome_arquivo1 = ""
         self.nome_arquivo2 = ""
+        for num in (1, 2):
+            self._geracao[num] += 1  # cargas ainda em andamento são descartadas
+            self.caminhos[num] = None
+            self.previas[num] = None
+            self.hashes[num] = None
+            self._calculadores_hash[num] = None
+            self._colunas_carregadas[num] = None
+            self._carregadores[num] = None
+        self._comparar_apos_carga = False
+        self._preparo1 = (None, None)
         # Corrige: limpar listas de colunas reais
         if hasattr(self, "lst_colunas1"):
             self.lst_colunas1.clear()
@@ -516,48 +785,13 @@ class ComparadorPlanilhasWidget(QWidget):
 
         self.progress.setValue(0)
         self.spin_similaridade.setValue(90)
+        self.spin_max_similares.setValue(0)
 
     # --- Seleção de arquivos ---
     def selecionar_planilha(self, num):
         path, _ = QFileDialog.getOpenFileName(self, "Selecionar Planilha", "", "Excel Files (*.xlsx *.xls)")
         if path:
-            try:
-                df = pd.read_excel(path)
-            except Exception as e:
-                self._mostrar_erro(
-                    "Falha ao abrir arquivo",
-                    "Não foi possível ler a planilha.\nVerifique se o arquivo está corrompido ou protegido por senha.",
-                )
-                return
-
-            if df is None or len(df) == 0:
-                QMessageBox.warning(self, "Aviso", "A planilha selecionada está vazia.")
-            preview = df.head(25)
-
-            nome_arquivo = path.split("/")[-1].split("\\")[-1]
-
-            if num == 1:
-                self.df1 = df
-                self.nome_arquivo1 = nome_arquivo
-                self.lbl_arquivo1.setText(f"📁 {path}")
-                self.lst_colunas1.clear()
-                for col in df.columns:
-                    item = QListWidgetItem(str(col))
-                    item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-                    item.setCheckState(Qt.Unchecked)
-                    self.lst_colunas1.addItem(item)
-                self.mostrar_preview(self.tabela_preview1, preview)
-            else:
-                self.df2 = df
-                self.nome_arquivo2 = nome_arquivo
-                self.lbl_arquivo2.setText(f"📁 {path}")
-                self.lst_colunas2.clear()
-                for col in df.columns:
-                    item = QListWidgetItem(str(col))
-                    item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-                    item.setCheckState(Qt.Unchecked)
-                    self.lst_colunas2.addItem(item)
-                self.mostrar_preview(self.tabela_preview2, preview)
+            self._carregar_arquivo_em_planilha(num, path)
 
     def mostrar_preview(self, tabela, df_preview):
         tabela.clear()
@@ -571,21 +805,32 @@ class ComparadorPlanilhasWidget(QWidget):
 
     # --- Saída ---
     def selecionar_saida(self):
-        path = QFileDialog.getSaveFileName(self, "Salvar Planilha", "", "Excel Files (*.xlsx)")[0]
+        filtros = ";;".join(FORMATOS_SAIDA.values())
+        path, filtro = QFileDialog.getSaveFileName(self, "Salvar Planilha", "", filtros)
         if path:
-            if not path.lower().endswith(".xlsx"):
-                path = path + ".xlsx"
+            extensoes = {f: ext for ext, f in FORMATOS_SAIDA.items()}
+            if not path.lower().endswith(tuple(FORMATOS_SAIDA)):
+                path = path + extensoes.get(filtro, ".xlsx")
             self.txt_saida.setText(f"📁 {path}")
 
+    def _caminho_saida(self):
+        """Caminho de saída digitado/selecionado, sem o prefixo "📁 " usado na exibição."""
+        caminho = self.txt_saida.text().strip()
+        if caminho.startswith("📁"):
+            caminho = caminho[len("📁") :].strip()
+        if caminho and not caminho.lower().endswith(tuple(FORMATOS_SAIDA)):
+            caminho += extensao_saida(caminho)
+        return caminho
+
     # --- Comparação ---
     def comparar(self):
-        if self.df1 is None or self.df2 is None:
+        if self.previas[1] is None or self.previas[2] is None:
             QMessageBox.warning(self, "Erro", "Selecione as duas planilhas primeiro!")
             return
-        if not self.txt_saida.text():
+        if not self._caminho_saida():
             QMessageBox.warning(self, "Erro", "Selecione o local de saída!")
             return
-        if len(self.df1) == 0 or len(self.df2) == 0:
+        if len(self.previas[1]) == 0 or len(self.previas[2]) == 0:
             QMessageBox.warning(self, "Erro", "Uma das planilhas está vazia. Importe arquivos com dados.")
             return
 
@@ -596,72 +841,125 @@ class ComparadorPlanilhasWidget(QWidget):
         if not colunas1 or not colunas2:
             QMessageBox.warning(self, "Erro", "Selecione ao menos uma coluna em cada planilha!")
             return
-        similaridade_min = self.spin_similaridade.value()
+        if self.chk_por_coluna.isChecked() and len(colunas1) != len(colunas2):
+            QMessageBox.warning(
+                self, "Erro", "Na pontuação por coluna, marque o mesmo número de colunas nas duas planilhas!"
+            )
+            return
 
-        resultados = []
-        total = len(self.df2)
+        # Mesmas planilhas, colunas e normalização de uma comparação com scores guardados e
+        # similaridade >= piso: o resultado sai do armazém, sem recomparar (nem esperar a carga)
+        config = self._config_comparacao(colunas1, colunas2)
+        armazem = self._armazem_reaproveitavel(colunas1, colunas2, config.similaridade_min)
+
+        # As colunas marcadas ainda estão sendo lidas em segundo plano: compara quando terminar
+        if armazem is None and not self._pronto_para_comparar():
+            self._comparar_apos_carga = True
+            self.btn_comparar.setEnabled(False)
+            self.progress.setRange(0, 0)  # indicador "ocupado" enquanto carrega
+            self._carregar_colunas(1)
+            self._carregar_colunas(2)
+            return
         self.progress.setValue(0)
+        caminho_saida = self._caminho_saida()
 
-        # Pré-calcula compostos normalizados da planilha 1 para acelerar buscas
-        df1_compostos_exibicao, df1_compostos_norm = self._preparar_compostos_df1(colunas1)
-        cpf_col_df1 = self._get_cpf_column(self.df1)
-        cpf_col_df2 = self._get_cpf_column(self.df2)
-        df1_cpfs_set = self._build_cpf_set_df1(cpf_col_df1)
+        if armazem is not None:
+            lotes = armazem.lotes(config.similaridade_min, config.limite_similares, tamanho=LINHAS_AMOSTRA)
+            amostra = next(lotes, ([], 0))[0]
 
-        # Pré-visualização (até 20 linhas)
-        nome_planilha2 = self.nome_arquivo2 if self.nome_arquivo2 else "PLANILHA 2"
-        nome_planilha1 = self.nome_arquivo1 if self.nome_arquivo1 else "PLANILHA 1"
-        nome_coluna_planilha2 = f"{' + '.join(colunas2)} NA PLANILHA {nome_planilha2}"
-        nome_coluna_esta_na_planilha1 = f"ESTÁ NA PLANILHA {nome_planilha1}"
-        nome_coluna_similares = f"{' + '.join(colunas1)} SIMILARES NA PLANILHA {nome_planilha1}"
-
-        amostra = self.df2.head(20)
-        prev_regs = []
-        for _, r in amostra.iterrows():
-            valor, ok, similares = self._calcular_resultado_linha(
-                r,
-                colunas2,
-                similaridade_min,
-                df1_compostos_exibicao,
-                df1_compostos_norm,
-                cpf_col_df1,
-                cpf_col_df2,
-                df1_cpfs_set,
-            )
-            prev_regs.append(
-                {
-                    nome_coluna_planilha2: valor,
-                    nome_coluna_esta_na_planilha1: "Sim" if ok else "Não",
-                    nome_coluna_similares: similares,
-                }
+            def tarefa(cancelado, progresso):
+                return reexportar(armazem, config, caminho_saida, cancelado, progresso)
+
+            self._confirmar_e_comparar(config, amostra, tarefa)
+            return
+
+        # Preparo da planilha 1 (compostos normalizados e índices, ou o cache da mesma planilha
+        # mestre) e amostra em segundo plano: com uma planilha mestre grande levam minutos
+        self._worker = AmostraWorker(self._tarefa_amostra(config))
+        self._worker.finished.connect(lambda payload: self._amostra_pronta(payload, config, caminho_saida))
+        self._worker.error.connect(self._erro_comparacao)
+        self.btn_comparar.setEnabled(False)
+        self.btn_cancelar.setEnabled(True)
+        self.progress.setRange(0, 0)  # indicador "ocupado" enquanto calcula
+        self.lbl_velocidade.setText("⏳ Calculando a pré-visualização...")
+        self._worker.start()
+
+    def _amostra_pronta(self, payload, config, caminho_saida):
+        # O sinal sai do fim do run(): espera a thread terminar antes de trocar o self._worker
+        self._worker.wait()
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
+        self.btn_comparar.setEnabled(True)
+        self.btn_cancelar.setEnabled(False)
+        self.lbl_velocidade.setText("")
+        if payload is None:
+            return  # cancelada pelo usuário
+        if payload["chave"] is not None:
+            self._preparo1 = (payload["chave"], payload["preparo"])
+        motor, df2 = payload["motor"], payload["df2"]
+        checkpoint = self._checkpoint(config, len(df2))
+
+        def tarefa(cancelado, progresso):
+            # As linhas da amostra já comparadas não são pontuadas de novo (ver MotorComparacao.amostra)
+            return motor.comparar(df2, caminho_saida, cancelado, progresso, checkpoint)
+
+        retomado_de = checkpoint.linhas if checkpoint is not None else 0
+        self._confirmar_e_comparar(
+            config, payload["amostra"], tarefa, retomavel=checkpoint is not None, retomado_de=retomado_de
+        )
+
+    def _checkpoint(self, config, total):
+        """Checkpoint desta comparação; se uma execução anterior parou no meio, pergunta se retoma."""
+        if self.hashes[1] is None or self.hashes[2] is None:
+            return None
+        checkpoint = Checkpoint.abrir(assinatura_comparacao(self.hashes[1], self.hashes[2], config))
+        if checkpoint.linhas:
+            resposta = QMessageBox.question(
+                self,
+                "Retomar comparação",
+                f"Uma comparação destas planilhas com as mesmas configurações parou em "
+                f"{checkpoint.linhas} de {total} linha(s).\n\nContinuar de onde parou?",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.Yes,
             )
+            if resposta != QMessageBox.Yes:
+                checkpoint.descartar()
+        return checkpoint
+
+    def _confirmar_e_comparar(self, config, amostra, tarefa, retomavel=False, retomado_de=0):
+        """
+        Mostra a pré-visualização e, se confirmada, roda a `tarefa` completa no `CompararWorker`.
+        `retomavel`: a tarefa grava checkpoints (um cancelamento pode ser retomado depois).
+        `retomado_de`: linhas que a tarefa só regrava de um checkpoint (fora da velocidade medida).
+        """
+        # Pré-visualização (até 20 linhas)
+        nome_coluna_planilha2, nome_coluna_esta_na_planilha1, nome_coluna_similares = config.colunas_saida()
+        prev_regs = [
+            {
+                nome_coluna_planilha2: valor,
+                nome_coluna_esta_na_planilha1: "Sim" if ok else "Não",
+                nome_coluna_similares: similares,
+            }
+            for valor, ok, similares in amostra
+        ]
         df_preview = pd.DataFrame(prev_regs)
         if not self._mostrar_preview_dialog(df_preview):
             return
 
         # Processamento completo em thread
-        self._worker = CompararWorker(
-            df1_compostos_exibicao,
-            df1_compostos_norm,
-            self.df2.copy(),
-            colunas2,
-            similaridade_min,
-            nome_coluna_planilha2,
-            nome_coluna_esta_na_planilha1,
-            nome_coluna_similares,
-            self.normalizar_texto,
-            cpf_col_df1,
-            cpf_col_df2,
-            df1_cpfs_set,
-        )
+        self._assinatura_comparacao = self._assinatura_armazem(config.colunas1, config.colunas2)
+        self._retomavel = retomavel
+        self._worker = CompararWorker(tarefa, retomado_de)
         self._worker.progress.connect(self.progress.setValue)
+        self._worker.velocidade.connect(self.lbl_velocidade.setText)
         self._worker.finished.connect(self._comparacao_finalizada)
-        self._worker.error.connect(lambda msg: self._mostrar_erro("Erro durante a comparação", msg))
+        self._worker.error.connect(self._erro_comparacao)
 
         # UI state
         self.btn_comparar.setEnabled(False)
         self.btn_cancelar.setEnabled(True)
         self.progress.setValue(0)
+        self.lbl_velocidade.setText("")
         self._worker.start()
 
     def cancelar_comparacao(self):
@@ -669,66 +967,120 @@ class ComparadorPlanilhasWidget(QWidget):
             self._worker.cancel()
 
     def _comparacao_finalizada(self, payload):
-        # payload: dict com 'cancelado' bool e 'resultados' list
+        # payload: dict com 'cancelado' bool, 'caminho' e 'linhas' (o worker já gravou o arquivo)
         self.btn_comparar.setEnabled(True)
         self.btn_cancelar.setEnabled(False)
+        self.lbl_velocidade.setText("")
         if payload.get("cancelado"):
-            QMessageBox.information(self, "Cancelado", "A comparação foi cancelada pelo usuário.")
+            mensagem = "A comparação foi cancelada pelo usuário."
+            if self._retomavel:
+                mensagem += "\nO que já foi comparado ficou guardado: comparando de novo, ela continua de onde parou."
+            QMessageBox.information(self, "Cancelado", mensagem)
             return
+        if payload.get("armazem") is not None:
+            self._armazem = (self._assinatura_comparacao, payload["armazem"])
+        mensagem = (
+            f"Comparação finalizada e arquivo salvo!\n{payload.get('linhas', 0)} linha(s) em:\n{payload.get('caminho')}"
+        )
+        if payload.get("retomado_de"):
+            mensagem += f"\n\nRetomada de uma comparação anterior a partir da linha {payload['retomado_de'] + 1}."
+        if payload.get("linhas_reaproveitadas"):
+            mensagem += (
+                f"\n\n{payload['linhas_reaproveitadas']} linha(s) repetida(s) reaproveitaram a comparação de outra."
+            )
+        QMessageBox.information(self, "Concluído", mensagem)
+        self.limpar_campos()
+
+    def _erro_comparacao(self, msg):
+        self.btn_comparar.setEnabled(True)
+        self.btn_cancelar.setEnabled(False)
+        self.progress.setRange(0, 100)
+        self.lbl_velocidade.setText("")
+        self._mostrar_erro("Erro durante a comparação", msg)
+
 
-        resultados = payload.get("resultados", [])
-        df_result = pd.DataFrame(resultados)
+class CarregarPlanilhaWorker(QThread):
+    """Lê uma planilha fora da thread da interface: a prévia ou, com `colunas`, a planilha inteira."""
+
+    finished = pyqtSignal(object)
+    error = pyqtSignal(object)
+
+    def __init__(self, num, caminho, geracao, colunas=None):
+        super().__init__()
+        self.num = num
+        self.caminho = caminho
+        self.geracao = geracao
+        self.colunas = colunas
+
+    def run(self):
+        payload = {"num": self.num, "caminho": self.caminho, "geracao": self.geracao, "colunas": self.colunas}
         try:
-            df_result.to_excel(self.txt_saida.text(), index=False)
-        except PermissionError:
-            self._mostrar_erro(
-                "Não foi possível salvar",
-                "O arquivo de saída está aberto em outro programa. Feche-o e tente novamente.",
-            )
-            return
+            if self.colunas is None:
+                payload["df"] = ler_previa(self.caminho)
+            else:
+                payload["df"] = ler_colunas(self.caminho, self.colunas)
+            self.finished.emit(payload)
         except Exception:
-            self._mostrar_erro(
-                "Erro ao salvar",
-                "Não foi possível salvar o arquivo. Verifique permissões e espaço em disco.",
-            )
-            return
-        QMessageBox.information(self, "Concluído", "Comparação finalizada e arquivo salvo!")
-        self.limpar_campos()
+            self.error.emit(payload)
+
+
+class HashArquivoWorker(QThread):
+    """Hash do conteúdo de um arquivo fora da thread da interface (None se não der para ler)."""
+
+    finished = pyqtSignal(object)
+
+    def __init__(self, num, caminho, geracao):
+        super().__init__()
+        self.num = num
+        self.caminho = caminho
+        self.geracao = geracao
+
+    def run(self):
+        try:
+            hash_conteudo = hash_arquivo(self.caminho)
+        except Exception:
+            hash_conteudo = None  # sem hash: sem cache, armazém e checkpoint para este arquivo
+        self.finished.emit({"num": self.num, "geracao": self.geracao, "hash": hash_conteudo})
+
+
+class AmostraWorker(QThread):
+    """Roda fora da thread da interface a `tarefa(cancelado)` do preparo + pré-visualização."""
+
+    finished = pyqtSignal(object)  # retorno da tarefa (None se cancelada)
+    error = pyqtSignal(str)
+
+    def __init__(self, tarefa, retomado_de=0):
+        super().__init__()
+        self.tarefa = tarefa
+        self.retomado_de = retomado_de  # linhas vindas de um checkpoint (ver `MedidorProgresso`)
+        self._cancel = False
+
+    def cancel(self):
+        self._cancel = True
+
+    def run(self):
+        try:
+            self.finished.emit(self.tarefa(lambda: self._cancel))
+        except Exception as e:
+            self.error.emit(str(e))
 
 
 class CompararWorker(QThread):
+    """
+    Roda fora da thread da interface uma `tarefa(cancelado, progresso)` que devolve um
+    `ResultadoComparacao` (comparação completa pelo motor ou reexportação do armazém de scores).
+    O progresso passa por um `MedidorProgresso`: poucos sinais por segundo, não um por lote.
+    """
+
     progress = pyqtSignal(int)
+    velocidade = pyqtSignal(str)  # "12.345 linhas/s · faltam ~3 min 05 s"
     finished = pyqtSignal(object)
     error = pyqtSignal(str)
 
-    def __init__(
-        self,
-        df1_compostos_exibicao,
-        df1_compostos_norm,
-        df2,
-        colunas2,
-        similaridade_min,
-        nome_coluna_planilha2,
-        nome_coluna_esta_na_planilha1,
-        nome_coluna_similares,
-        normalize_func,
-        cpf_col_df1,
-        cpf_col_df2,
-        df1_cpfs_set,
-    ):
+    def __init__(self, tarefa, retomado_de=0):
         super().__init__()
-        self.df1_compostos_exibicao = df1_compostos_exibicao
-        self.df1_compostos_norm = df1_compostos_norm
-        self.df2 = df2
-        self.colunas2 = colunas2
-        self.similaridade_min = similaridade_min
-        self.nome_coluna_planilha2 = nome_coluna_planilha2
-        self.nome_coluna_esta_na_planilha1 = nome_coluna_esta_na_planilha1
-        self.nome_coluna_similares = nome_coluna_similares
-        self.normalize_func = normalize_func
-        self.cpf_col_df1 = cpf_col_df1
-        self.cpf_col_df2 = cpf_col_df2
-        self.df1_cpfs_set = df1_cpfs_set
+        self.tarefa = tarefa
+        self.retomado_de = retomado_de  # linhas vindas de um checkpoint (ver `MedidorProgresso`)
         self._cancel = False
 
     def cancel(self):
@@ -736,73 +1088,30 @@ class CompararWorker(QThread):
 
     def run(self):
         try:
-            resultados = []
-            total = len(self.df2)
-            for i, row in self.df2.iterrows():
-                if self._cancel:
-                    self.finished.emit({"cancelado": True})
-                    return
-                partes2_exibicao = [str(row[col]) if col in self.df2.columns else "" for col in self.colunas2]
-                valor = " | ".join(partes2_exibicao)
-                # Remover '( SUCESSÃO DE )' e normalizar para exibição/saída
-                valor = re.sub(r"\(\s*SUCESS[ÃA]O\s+DE\s*\)", " ", valor, flags=re.IGNORECASE)
-                valor = re.sub(r"\s+", " ", valor).strip()
-                valor_normalizado = self.normalize_func(valor)
-                valor_exibicao = valor_normalizado
-
-                encontrado_exato = False
-                nomes_similares = []
-
-                # 1) Match por CPF (se ambas possuem CPF)
-                if self.cpf_col_df1 and self.cpf_col_df2 and self.cpf_col_df2 in self.df2.columns:
-                    cpf_val = (
-                        str(row[self.cpf_col_df2])
-                        if self.cpf_col_df2 in self.df2.columns and not pd.isna(row[self.cpf_col_df2])
-                        else ""
-                    )
-                    cpf_val = re.sub(r"\D", "", cpf_val)
-                    if cpf_val and cpf_val in self.df1_cpfs_set:
-                        encontrado_exato = True
-                        resultados.append(
-                            {
-                                self.nome_coluna_planilha2: valor_exibicao,
-                                self.nome_coluna_esta_na_planilha1: "Sim",
-                                self.nome_coluna_similares: "",
-                            }
-                        )
-                        progress_value = int((i + 1) / total * 100) if total else 0
-                        self.progress.emit(progress_value)
-                        continue
-
-                for nome_sistema_normalizado in self.df1_compostos_norm:
-                    if nome_sistema_normalizado == valor_normalizado:
-                        encontrado_exato = True
-                        break
-
-                if not encontrado_exato:
-                    for composto_exibicao, composto_norm in zip(
-                        self.df1_compostos_exibicao, self.df1_compostos_norm
-                    ):
-                        score = fuzz.token_sort_ratio(composto_norm, valor_normalizado)
-                        if score >= self.similaridade_min:
-                            score_formatado = f"{score:.1f}".replace(".", ",")
-                            nomes_similares.append(f"{self.normalize_func(composto_exibicao)} ({score_formatado}%)")
-
-                resultados.append(
-                    {
-                        self.nome_coluna_planilha2: valor_exibicao,
-                        self.nome_coluna_esta_na_planilha1: "Sim" if encontrado_exato else "Não",
-                        self.nome_coluna_similares: ", ".join(nomes_similares) if nomes_similares else "",
-                    }
-                )
-
-                progress_value = int((i + 1) / total * 100) if total else 0
-                self.progress.emit(progress_value)
-
-            self.finished.emit({"cancelado": False, "resultados": resultados})
+            medidor = MedidorProgresso(self._emitir_progresso, inicio=self.retomado_de)
+            resultado = self.tarefa(lambda: self._cancel, medidor)
+            if resultado.cancelado:
+                self.finished.emit({"cancelado": True})
+                return
+            self.finished.emit(
+                {
+                    "cancelado": False,
+                    "caminho": resultado.caminho,
+                    "linhas": resultado.linhas,
+                    "linhas_reaproveitadas": resultado.linhas_reaproveitadas,
+                    "armazem": resultado.armazem,
+                    "retomado_de": resultado.retomado_de,
+                }
+            )
+        except PermissionError:
+            self.error.emit("O arquivo de saída está aberto em outro programa. Feche-o e tente novamente.")
         except Exception as e:
             self.error.emit(str(e))
 
+    def _emitir_progresso(self, percentual, linhas_por_segundo, segundos_restantes):
+        self.progress.emit(percentual)
+        self.velocidade.emit(texto_velocidade(linhas_por_segundo, segundos_restantes))
+
     def _toggle_lista(self, lista, botao, checked):
         lista.setVisible(checked)
         botao.setText("▼ Colunas" if checked else "▶ Colunas")
@@ -0,0 +1,53 @@
+"""
+Tratamento de CPF na comparação de planilhas, feito por coluna (pandas) em vez de linha a linha.
+
+CPFs lidos do Excel como número chegam como float (12345678901.0) ou perdem os
+zeros à esquerda (01234567890 -> 1234567890); ambos os casos são corrigidos aqui.
+"""
+
+from __future__ import annotations
+
+import re
+
+import pandas as pd
+
+TAMANHO_CPF = 11
+
+_RE_NAO_DIGITO = re.compile(r"\D")
+# Número inteiro que veio como float do Excel: "12345678901.0" -> "12345678901"
+_RE_FLOAT_INTEIRO = re.compile(r"^\s*(\d+)\.0+\s*$")
+
+
+def normalizar_cpf(valor):
+    """Apenas os dígitos do CPF, com zeros à esquerda até 11 dígitos ("" se vazio)."""
+    if valor is None or pd.isna(valor):
+        return ""
+    digitos = _RE_NAO_DIGITO.sub("", _RE_FLOAT_INTEIRO.sub(r"\1", str(valor)))
+    return digitos.zfill(TAMANHO_CPF) if digitos else ""
+
+
+def digitos_series(serie):
+    """Só os dígitos de cada valor de uma coluna ("12345678901.0" do Excel vira "12345678901"; "" se vazio)."""
+    texto = serie.map(str).where(~serie.isna(), "")
+    return texto.str.replace(_RE_FLOAT_INTEIRO, r"\1", regex=True).str.replace(_RE_NAO_DIGITO, "", regex=True)
+
+
+def extrair_cpfs(serie):
+    """Versão vetorizada de `normalizar_cpf` para uma coluna inteira."""
+    digitos = digitos_series(serie)
+    return digitos.where(digitos == "", digitos.str.zfill(TAMANHO_CPF))
+
+
+def conjunto_cpfs(serie):
+    """Conjunto (hash) dos CPFs não vazios de uma coluna."""
+    cpfs = extrair_cpfs(serie)
+    return set(cpfs[cpfs != ""])
+
+
+def casados_por_cpf(serie, cpfs_referencia):
+    """
+    Junção por hash entre uma coluna de CPFs e o conjunto de CPFs da outra planilha.
+    Retorna um array booleano: True onde o CPF da linha existe na referência.
+    """
+    cpfs = extrair_cpfs(serie)
+    return ((cpfs != "") & cpfs.isin(cpfs_referencia)).to_numpy(dtype=bool)
@@ -0,0 +1,151 @@
+"""
+Execução da comparação em vários processos (fatias da planilha 2 num pool).
+
+O `CompararWorker` roda numa QThread; o laço Python fica preso a um núcleo pelo
+GIL. Aqui a planilha 2 é dividida em fatias processadas por um
+`ProcessPoolExecutor`. O comparador, com os dados da planilha 1 (compostos
+normalizados e índices), vai uma única vez para cada processo, no initializer, e
+não a cada tarefa.
+
+O cancelamento é um evento compartilhado: o comparador o consulta entre as
+matrizes do cdist (não só entre blocos), que nos processos são limitadas a
+`MAX_CELULAS_PROCESSO` células para cada uma levar bem menos de 1 s num núcleo. O
+pool é encerrado sem esperar as tarefas em andamento, e os processos que não saírem
+sozinhos em `PRAZO_ENCERRAMENTO` segundos são terminados.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from planilhas.pontuacao import TAMANHO_BLOCO
+
+# Linhas da planilha 2 por tarefa enviada ao pool
+TAMANHO_FATIA = TAMANHO_BLOCO * 4
+
+# Intervalo máximo (s) entre verificações de cancelamento no processo principal
+INTERVALO_CANCELAMENTO = 0.2
+
+# Células por matriz do cdist dentro dos processos (~0,4 s num núcleo com compostos de ~80
+# caracteres): o evento de cancelamento é consultado entre elas
+MAX_CELULAS_PROCESSO = 200_000
+
+# Segundos que um processo tem para sair sozinho depois do cancelamento antes de ser terminado
+PRAZO_ENCERRAMENTO = 2.0
+
+# Estado de cada processo do pool (preenchido por _inicializar_processo)
+_estado = {}
+
+
+def _inicializar_processo(comparador, evento_cancelamento):
+    # Cada processo usa um único núcleo no cdist: o paralelismo já vem do pool
+    comparador.usar_um_nucleo()
+    comparador.limitar_celulas(MAX_CELULAS_PROCESSO)
+    comparador.cancelado = evento_cancelamento.is_set
+    _estado["comparador"] = comparador
+    _estado["cancelado"] = evento_cancelamento
+
+
+def _processar_fatia(valores_normalizados, casados_cpf):
+    registros = []
+    for inicio in range(0, len(valores_normalizados), TAMANHO_BLOCO):
+        registros.extend(
+            _estado["comparador"].comparar(
+                valores_normalizados[inicio : inicio + TAMANHO_BLOCO],
+                casados_cpf[inicio : inicio + TAMANHO_BLOCO],
+            )
+        )
+        # O comparador também para no meio do bloco (entre matrizes do cdist): o que ele
+        # devolveu depois do cancelamento está incompleto e é descartado
+        if _estado["cancelado"].is_set():
+            return None
+    return registros
+
+
+def processos_disponiveis():
+    return os.cpu_count() or 1
+
+
+def _encerrar_processos(processos, prazo):
+    """Espera os processos saírem sozinhos por até `prazo` segundos; os que sobrarem são terminados."""
+    limite = time.monotonic() + prazo
+    for processo in processos:
+        processo.join(max(0.0, limite - time.monotonic()))
+    for processo in processos:
+        if processo.is_alive():
+            processo.terminate()
+
+
+def comparar_em_processos(fatias, comparador, cancelado, processos=None):
+    """
+    Processa `fatias` (iterável de (valores_normalizados, casados_cpf), em ordem) no pool.
+
+    Gera (registros, linhas_concluidas) na mesma ordem das fatias, à medida que ficam
+    prontas; `linhas_concluidas` soma todas as fatias já terminadas (inclusive as que
+    chegaram fora de ordem), para alimentar a barra de progresso.
+    `cancelado` é um callable consultado periodicamente; ao retornar True, os processos
+    param na próxima matriz do cdist, o gerador termina sem gerar mais nada e o pool é
+    encerrado sem esperar por eles (os que passarem de `PRAZO_ENCERRAMENTO` são terminados).
+    `comparador` (ex.: `ComparadorBloco`) tem os dados da planilha 1 e os parâmetros da
+    comparação; cada bloco da fatia passa pelo `comparador.comparar` dentro do processo.
+    """
+    processos = processos or processos_disponiveis()
+    contexto = multiprocessing.get_context("spawn")
+    evento_cancelamento = contexto.Event()
+    fatias = iter(fatias)
+    pendentes = deque()  # (futuro, quantidade de linhas)
+    concluidas = 0
+
+    executor = ProcessPoolExecutor(
+        max_workers=processos,
+        mp_context=contexto,
+        initializer=_inicializar_processo,
+        initargs=(comparador, evento_cancelamento),
+    )
+    terminou = False
+
+    def submeter():
+        try:
+            valores_normalizados, casados_cpf = next(fatias)
+        except StopIteration:
+            return False
+        futuro = executor.submit(_processar_fatia, valores_normalizados, casados_cpf)
+        pendentes.append((futuro, len(valores_normalizados)))
+        return True
+
+    try:
+        # Mantém no máximo 2 fatias por processo em voo (memória limitada)
+        while len(pendentes) < processos * 2 and submeter():
+            pass
+
+        while pendentes:
+            futuro, quantidade = pendentes[0]
+            while not wait([futuro], timeout=INTERVALO_CANCELAMENTO).done:
+                if cancelado():
+                    return
+            registros = futuro.result()
+            if registros is None:
+                return
+            pendentes.popleft()
+            concluidas += quantidade
+            submeter()
+            em_andamento = sum(q for f, q in pendentes if f.done())
+            yield registros, concluidas + em_andamento
+        terminou = True
+    finally:
+        # Cancelado, com erro ou com o gerador fechado antes do fim: os processos param na
+        # próxima matriz do cdist e o pool fecha sem esperar o bloco que estão pontuando;
+        # numa thread à parte, os que não saírem no prazo são terminados
+        processos_pool = list((executor._processes or {}).values())
+        if not terminou:
+            evento_cancelamento.set()
+        executor.shutdown(wait=terminou, cancel_futures=True)
+        if not terminou:
+            threading.Thread(
+                target=_encerrar_processos, args=(processos_pool, PRAZO_ENCERRAMENTO), daemon=True
+            ).start()
@@ -0,0 +1,96 @@
+"""
+Código fonético de nomes em português, usado como chave extra de candidatos.
+
+Variações como LUIZ/LUIS, SOUZA/SOUSA, THIAGO/TIAGO e RAPHAEL/RAFAEL têm o mesmo
+código: com a opção fonética, cada composto normalizado da planilha 1 ganha um
+código (uma vez por texto distinto) e as linhas ficam agrupadas por ele. As linhas
+com o mesmo código da consulta entram nos candidatos ao lado das do índice de
+q-gramas, por uma busca no dicionário (nada é comparado com todas as linhas); a
+pontuação e o limite continuam sendo os do texto.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+
+# Tamanho do memo LRU de códigos por palavra
+TAMANHO_CACHE = 200_000
+
+_VOGAIS = "AEIOU"
+_RE_NAO_ALFANUMERICO = re.compile(r"[^A-Z0-9]")
+# Aplicadas em ordem sobre cada palavra (maiúscula, sem acentos)
+_REGRAS = [
+    (re.compile(r"SCH|SH|CH"), "X"),
+    (re.compile(r"PH"), "F"),
+    (re.compile(r"TH"), "T"),
+    (re.compile(r"LH"), "LI"),
+    (re.compile(r"NH"), "NI"),
+    (re.compile(r"CK"), "K"),
+    (re.compile(r"[SX]C(?=[EIY])"), "S"),
+    (re.compile(r"QU(?=[EIY])"), "K"),
+    (re.compile(r"GU(?=[EIY])"), "G"),
+    (re.compile(r"Q"), "K"),
+    (re.compile(r"C(?=[EIY])"), "S"),
+    (re.compile(r"C"), "K"),
+    (re.compile(r"G(?=[EIY])"), "J"),
+    (re.compile(r"Y"), "I"),
+    (re.compile(r"W"), "V"),
+    (re.compile(r"Z"), "S"),
+    (re.compile(r"H"), ""),
+    # Letras dobradas (SS, RR, LL, TT...) contam uma vez
+    (re.compile(r"([A-Z])\1+"), r"\1"),
+    # M antes de consoante ou no fim soa como N; L antes de consoante ou no fim, como U
+    (re.compile(rf"M(?=[^{_VOGAIS}]|$)"), "N"),
+    (re.compile(rf"(?<=[{_VOGAIS}])L(?=[^{_VOGAIS}]|$)"), "U"),
+]
+
+
+@lru_cache(maxsize=TAMANHO_CACHE)
+def codigo_palavra(palavra):
+    """Código fonético de uma palavra ("THIAGO" -> "TIAGO", "SOUZA" -> "SOUSA")."""
+    if not palavra.isascii():
+        palavra = "".join(c for c in unicodedata.normalize("NFD", palavra) if unicodedata.category(c) != "Mn")
+    palavra = _RE_NAO_ALFANUMERICO.sub("", palavra.upper())
+    for regra, substituto in _REGRAS:
+        palavra = regra.sub(substituto, palavra)
+    return palavra
+
+
+def codigo_fonetico(texto):
+    """Código fonético de um texto, palavra por palavra ("LUIZ SOUZA" -> "LUIS SOUSA")."""
+    return " ".join(c for c in (codigo_palavra(p) for p in str(texto).split()) if c)
+
+
+def codigos_foneticos(textos):
+    """`codigo_fonetico` de cada texto, calculado uma única vez por texto distinto."""
+    memo = {}
+    codigos = []
+    for texto in textos:
+        codigo = memo.get(texto)
+        if codigo is None:
+            codigo = memo[texto] = codigo_fonetico(texto)
+        codigos.append(codigo)
+    return codigos
+
+
+class IndiceFonetico:
+    """Lado da planilha 1: código fonético de cada composto e as linhas de cada código."""
+
+    def __init__(self, textos):
+        self.codigos = codigos_foneticos(textos)
+        linhas_por_codigo = {}
+        for linha, codigo in enumerate(self.codigos):
+            # Texto sem nenhuma letra/dígito tem código vazio: não casa foneticamente com nada
+            if codigo:
+                linhas_por_codigo.setdefault(codigo, []).append(linha)
+        self.linhas = {codigo: np.asarray(linhas, dtype=np.int64) for codigo, linhas in linhas_por_codigo.items()}
+
+    def candidatos(self, consulta):
+        """Linhas da planilha 1 com o mesmo código fonético da consulta (ordenadas)."""
+        codigo = codigo_fonetico(consulta)
+        linhas = self.linhas.get(codigo) if codigo else None
+        return linhas if linhas is not None else np.empty(0, dtype=np.int64)
@@ -0,0 +1,177 @@
+"""
+Índice de candidatos para a comparação fuzzy entre planilhas.
+
+Em vez de pontuar cada valor da planilha 2 contra todas as linhas da planilha 1,
+o índice invertido de q-gramas (n-gramas de caracteres) devolve apenas as linhas
+que ainda podem atingir a similaridade mínima.
+
+O filtro é exato (não perde pares): para `fuzz.ratio`/`fuzz.token_sort_ratio`
+a pontuação é 100 * (1 - d / (la + lb)), onde d é a distância Indel. Com isso
+a similaridade mínima limita d, e pelo lema de contagem de q-gramas duas
+strings a distância <= d compartilham pelo menos max(la, lb) - q + 1 - q*d
+q-gramas. Linhas que não atingem essa contagem não podem passar do limite.
+
+Antes da contagem, as linhas são restritas pela janela de tamanho: como d >= |la - lb|,
+a pontuação nunca passa de 200 * min(la, lb) / (la + lb). As linhas ficam agrupadas
+em ordem de tamanho, então cada consulta só visita os tamanhos da janela.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+
+import numpy as np
+
+# Folga para erros de ponto flutuante no limite (o filtro deve ser conservador)
+_EPS = 1e-9
+
+
+def janela_tamanhos(tamanho, similaridade_min):
+    """
+    Menor e maior tamanho de texto que ainda podem atingir `similaridade_min` (`fuzz.ratio` ou
+    `token_sort_ratio`) contra um texto de `tamanho` caracteres: 200 * min / (la + lb) >= limite.
+    """
+    if similaridade_min <= 0:
+        return 0, math.inf
+    if similaridade_min > 100:
+        return 1, 0  # janela vazia
+    minimo = math.ceil(tamanho * similaridade_min / (200.0 - similaridade_min) - _EPS)
+    maximo = math.floor(tamanho * (200.0 - similaridade_min) / similaridade_min + _EPS)
+    return minimo, maximo
+
+
+def chave_token_sort(texto):
+    """Mesma transformação aplicada por `fuzz.token_sort_ratio` antes do `ratio`."""
+    return " ".join(sorted(str(texto).split()))
+
+
+class IndiceCandidatos:
+    """
+    Índice invertido de q-gramas sobre os textos (já normalizados) da planilha 1.
+
+    Cada ocorrência de um q-grama é indexada separadamente ("AB" 1ª vez, "AB" 2ª vez...)
+    para que a contagem de q-gramas em comum respeite multiplicidade.
+    """
+
+    def __init__(self, textos, q=3, ordenar_tokens=True):
+        self.q = q
+        self.ordenar_tokens = ordenar_tokens
+        self.chaves = [self._chave(t) for t in textos]
+        self.total = len(self.chaves)
+
+        # Dicionário q-grama/ocorrência -> id e pares (id, linha) para montar as listas invertidas
+        self._ids = {}
+        tokens = array("l")
+        linhas = array("l")
+        for linha, chave in enumerate(self.chaves):
+            vistos = {}
+            for i in range(len(chave) - q + 1):
+                grama = chave[i : i + q]
+                ocorrencia = vistos.get(grama, 0) + 1
+                vistos[grama] = ocorrencia
+                token = self._ids.setdefault((grama, ocorrencia), len(self._ids))
+                tokens.append(token)
+                linhas.append(linha)
+
+        # Linhas agrupadas por tamanho da chave, em ordem crescente: a janela de tamanhos de uma
+        # consulta é um intervalo contíguo de posições nessa ordem
+        self.tamanhos = np.fromiter((len(c) for c in self.chaves), dtype=np.int64, count=self.total)
+        self._ordem_tamanho = np.argsort(self.tamanhos, kind="stable")  # posição -> linha
+        tamanhos_ordenados = self.tamanhos[self._ordem_tamanho]
+        self._tamanhos_unicos = np.unique(tamanhos_ordenados)
+        self._inicio_tamanho = np.searchsorted(tamanhos_ordenados, self._tamanhos_unicos)
+        self._fim_tamanho = np.searchsorted(tamanhos_ordenados, self._tamanhos_unicos, side="right")
+        self._grupo_posicao = np.searchsorted(self._tamanhos_unicos, tamanhos_ordenados)
+
+        # Listas invertidas com a posição na ordem de tamanho (crescente em cada lista): a parte
+        # de uma lista dentro da janela sai com duas buscas binárias
+        posicao_linha = np.empty(self.total, dtype=np.int64)
+        posicao_linha[self._ordem_tamanho] = np.arange(self.total)
+        tokens_np = np.asarray(tokens, dtype=np.int64)
+        posicoes = posicao_linha[np.asarray(linhas, dtype=np.int64)]
+        ordem = np.lexsort((posicoes, tokens_np))
+        self._postings = posicoes[ordem]
+        self._inicio = np.searchsorted(tokens_np[ordem], np.arange(len(self._ids) + 1))
+
+    def _chave(self, texto):
+        if self.ordenar_tokens:
+            return chave_token_sort(texto)
+        return str(texto)
+
+    def _tokens_consulta(self, chave):
+        q = self.q
+        vistos = {}
+        tokens = []
+        for i in range(len(chave) - q + 1):
+            grama = chave[i : i + q]
+            ocorrencia = vistos.get(grama, 0) + 1
+            vistos[grama] = ocorrencia
+            tokens.append(self._ids.get((grama, ocorrencia), -1))
+        return tokens
+
+    def candidatos(self, texto, similaridade_min):
+        """
+        Retorna os índices (ordenados) das linhas que podem ter pontuação >= similaridade_min.
+        Qualquer linha fora do retorno tem pontuação garantidamente abaixo do limite.
+        """
+        if self.total == 0:
+            return np.empty(0, dtype=np.int64)
+        if similaridade_min <= 0:
+            return np.arange(self.total, dtype=np.int64)
+
+        chave = self._chave(texto)
+        la = len(chave)
+        q = self.q
+
+        # Só os grupos de tamanho dentro da janela: os de fora não alcançam o limite
+        minimo, maximo = janela_tamanhos(la, similaridade_min)
+        k_ini = int(np.searchsorted(self._tamanhos_unicos, minimo))
+        k_fim = int(np.searchsorted(self._tamanhos_unicos, maximo, side="right"))
+        if k_ini >= k_fim:
+            return np.empty(0, dtype=np.int64)
+        pos_ini, pos_fim = self._inicio_tamanho[k_ini], self._fim_tamanho[k_fim - 1]
+
+        # Contagem mínima de q-gramas em comum exigida para cada tamanho de chave da planilha 1
+        lb = self._tamanhos_unicos
+        dist_max = np.floor((la + lb) * (100.0 - similaridade_min) / 100.0 + _EPS)
+        exigido = np.maximum(la, lb) - q + 1 - q * dist_max
+        na_janela = np.zeros(len(lb), dtype=bool)
+        na_janela[k_ini:k_fim] = True
+
+        partes = []
+        # Tamanhos sem exigência: o filtro não descarta nenhuma linha deles
+        for k in np.flatnonzero(na_janela & (exigido <= 0)):
+            partes.append(self._ordem_tamanho[self._inicio_tamanho[k] : self._fim_tamanho[k]])
+
+        positivos = na_janela & (exigido > 0)
+        if positivos.any():
+            tokens = self._tokens_consulta(chave)
+            t_min = int(exigido[positivos].min())
+            # Filtro de prefixo: os f q-gramas mais frequentes podem ser ignorados, bastando
+            # exigir (exigido - f) ocorrências entre os mais raros. Evita varrer listas enormes.
+            f = min(t_min - 1, len(tokens))
+            frequencia = [self._inicio[t + 1] - self._inicio[t] if t >= 0 else 0 for t in tokens]
+            raros = [t for _, t in sorted(zip(frequencia, tokens))[: len(tokens) - f] if t >= 0]
+            if raros:
+                listas = []
+                for t in raros:
+                    lista = self._postings[self._inicio[t] : self._inicio[t + 1]]
+                    ini, fim = np.searchsorted(lista, (pos_ini, pos_fim))
+                    listas.append(lista[ini:fim])
+                posicoes, comuns = np.unique(np.concatenate(listas), return_counts=True)
+                grupos = self._grupo_posicao[posicoes]
+                ok = positivos[grupos] & (comuns >= exigido[grupos] - f)
+                partes.append(self._ordem_tamanho[posicoes[ok]])
+
+        if not partes:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(partes))
+
+
+def construir_indice_exato(textos):
+    """Mapa texto normalizado -> índices das linhas com esse texto (match exato em O(1))."""
+    indice = {}
+    for linha, texto in enumerate(textos):
+        indice.setdefault(texto, []).append(linha)
+    return indice
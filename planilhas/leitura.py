@@ -0,0 +1,31 @@
+"""
+Leitura de planilhas para o comparador em duas etapas.
+
+1. `ler_previa`: só o cabeçalho e as primeiras linhas (preenche a interface na hora).
+2. `ler_colunas`: a planilha inteira, mas apenas as colunas usadas na comparação e
+   tudo como texto (CPFs não viram float e não perdem zeros à esquerda).
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+
+LINHAS_PREVIA = 25
+
+
+def _colunas_como_texto(df):
+    # A interface trabalha com o nome da coluna como texto (QListWidgetItem)
+    df.columns = [str(col) for col in df.columns]
+    return df
+
+
+def ler_previa(caminho, linhas=LINHAS_PREVIA):
+    """Cabeçalho + primeiras `linhas` linhas da primeira aba."""
+    return _colunas_como_texto(pd.read_excel(caminho, nrows=linhas))
+
+
+def ler_colunas(caminho, colunas):
+    """Planilha inteira restrita a `colunas` (nomes como exibidos na interface), com dtype str."""
+    selecionadas = {str(col) for col in colunas}
+    df = pd.read_excel(caminho, usecols=lambda col: str(col) in selecionadas, dtype=str)
+    return _colunas_como_texto(df)
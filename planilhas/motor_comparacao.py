@@ -0,0 +1,408 @@
+"""
+Motor da comparação entre duas planilhas, sem dependência de Qt.
+
+Reúne o que antes ficava espalhado pelo `ComparadorPlanilhasWidget` e pelo
+`CompararWorker`: preparo da planilha 1 (compostos, CPFs e índices), amostra de
+pré-visualização e comparação completa gravada em streaming. A interface só
+monta um `ConfigComparacao` e chama o motor, e o mesmo código roda em jobs
+em lote e em benchmarks.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+import unicodedata
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from planilhas.armazem_scores import ArmazemScores
+from planilhas.cache_planilha import PreparoPlanilha1
+from planilhas.cpf import casados_por_cpf, conjunto_cpfs
+from planilhas.execucao_paralela import TAMANHO_FATIA, comparar_em_processos
+from planilhas.fonetica import IndiceFonetico
+from planilhas.indice_candidatos import IndiceCandidatos, construir_indice_exato
+from planilhas.multichave import ChaveColuna, ComparadorMultiChave, exibicao, preparar_multichave, valores_chaves
+from planilhas.normalizacao import MODO_PADRAO, compor_series, obter_normalizador, remover_sucessao_series
+from planilhas.pontuacao import TAMANHO_BLOCO, ComparadorBloco, PontuadorLote, formatar_similares
+from planilhas.saida import abrir_escritor
+
+SIMILARIDADE_PADRAO = 90
+
+# Linhas da planilha 2 mostradas na pré-visualização
+LINHAS_AMOSTRA = 20
+
+
+@dataclass
+class ConfigComparacao:
+    colunas1: List[str]
+    colunas2: List[str]
+    similaridade_min: float = SIMILARIDADE_PADRAO
+    modo_normalizacao: str = MODO_PADRAO
+    limite_similares: Optional[int] = None  # K melhores similares por linha (None = todos)
+    processos: int = 1  # > 1: fatias da planilha 2 num pool de processos
+    # Guarda os pares >= piso num ArmazemScores para reaplicar outra similaridade sem recomparar
+    piso_scores: Optional[float] = None
+    # Pontuação por coluna (scorer e peso por par de colunas) em vez do composto inteiro
+    chaves: Optional[List[ChaveColuna]] = None
+    # Linhas com o mesmo código fonético (LUIZ/LUIS, SOUZA/SOUSA) também são candidatas; não vale com `chaves`
+    fonetica: bool = False
+    nome_planilha1: str = "PLANILHA 1"
+    nome_planilha2: str = "PLANILHA 2"
+
+    @property
+    def normalizador(self):
+        return obter_normalizador(self.modo_normalizacao)
+
+    @property
+    def tipos_chaves(self):
+        return tuple(chave.tipo for chave in self.chaves) if self.chaves else None
+
+    def colunas_saida(self):
+        """Cabeçalhos do resultado: valor da planilha 2, "está na planilha 1" e similares."""
+        return [
+            f"{' + '.join(self.colunas2)} NA PLANILHA {self.nome_planilha2}",
+            f"ESTÁ NA PLANILHA {self.nome_planilha1}",
+            f"{' + '.join(self.colunas1)} SIMILARES NA PLANILHA {self.nome_planilha1}",
+        ]
+
+
+@dataclass
+class ResultadoComparacao:
+    cancelado: bool
+    caminho: Optional[str] = None
+    linhas: int = 0
+    encontrados: int = 0  # linhas com "Sim" (CPF ou texto exato)
+    com_similares: int = 0  # linhas sem match exato, mas com ao menos um similar
+    linhas_reaproveitadas: int = 0  # linhas repetidas (sem match exato) que reaproveitaram a pontuação de outra
+    armazem: Optional[ArmazemScores] = None  # com `piso_scores` configurado
+    retomado_de: int = 0  # linhas reaproveitadas de um checkpoint anterior
+
+
+def detectar_coluna_cpf(colunas):
+    """Primeira coluna cujo cabeçalho, sem acentos/pontuação, é "CPF" (ou None)."""
+    for col in colunas:
+        header_norm = unicodedata.normalize("NFD", str(col))
+        header_norm = "".join(c for c in header_norm if unicodedata.category(c) != "Mn")
+        header_norm = re.sub(r"[^A-Z0-9]", "", header_norm.upper())
+        if header_norm == "CPF":
+            return col
+    return None
+
+
+def preparar_planilha1(df1, config):
+    """Compostos de exibição e normalizados, CPFs e índices da planilha 1 (ou das chaves, com `config.chaves`)."""
+    # Coluna inteira de uma vez (operações vetorizadas do pandas) em vez de iterrows
+    compostos = remover_sucessao_series(compor_series(df1, config.colunas1))
+    compostos_norm = config.normalizador.normalize_series(compostos).tolist()
+    cpf_col = detectar_coluna_cpf(df1.columns)
+    preparo = PreparoPlanilha1(
+        compostos.tolist(),
+        compostos_norm,
+        cpf_col,
+        conjunto_cpfs(df1[cpf_col]) if cpf_col is not None else set(),
+        construir_indice_exato(compostos_norm),
+    )
+    if config.chaves:
+        # Os candidatos vêm dos filtros e dos índices de cada chave, não do composto
+        preparo.multichave = preparar_multichave(df1, config.chaves, config.normalizador)
+    else:
+        # Índice de q-gramas: gera só os candidatos plausíveis para cada linha da planilha 2
+        preparo.indice = IndiceCandidatos(compostos_norm)
+        if config.fonetica:
+            preparo.fonetico = IndiceFonetico(compostos_norm)
+    return preparo
+
+
+class MotorComparacao:
+    """Compara linhas da planilha 2 com uma planilha 1 já preparada."""
+
+    def __init__(self, preparo1, config):
+        self.preparo1 = preparo1
+        self.config = config
+        self.pontuador = None if config.chaves else PontuadorLote(preparo1.compostos_norm)
+        self.fonetica = None
+        if config.fonetica and not config.chaves:
+            if preparo1.fonetico is None:
+                preparo1.fonetico = IndiceFonetico(preparo1.compostos_norm)
+            self.fonetica = preparo1.fonetico
+        self.linhas_reaproveitadas = 0  # da última chamada a `lotes` (ver docstring)
+        self._da_amostra = {}  # valor -> registro já comparado pela última `amostra`
+
+    def _casados_cpf(self, df2):
+        # Match por CPF (se ambas possuem CPF): uma única junção por hash entre as planilhas
+        # antes da fase fuzzy; só o restante segue para o match exato e a pontuação
+        cpf_col_df2 = detectar_coluna_cpf(df2.columns)
+        if self.preparo1.cpf_col and cpf_col_df2 is not None:
+            return casados_por_cpf(df2[cpf_col_df2], self.preparo1.cpfs)
+        return np.zeros(len(df2), dtype=bool)
+
+    def normalizar_planilha2(self, df2):
+        """Valores compostos e normalizados de todas as linhas da planilha 2 (vetorizado)."""
+        # Remover '( SUCESSÃO DE )' e normalizar para exibição/saída
+        valores = remover_sucessao_series(compor_series(df2, self.config.colunas2))
+        return self.config.normalizador.normalize_series(valores).tolist()
+
+    def itens_planilha2(self, df2):
+        """
+        O que vai para o comparador por linha: o composto normalizado ou, com `config.chaves`,
+        a tupla (composto, valor da chave 1, valor da chave 2, ...).
+        """
+        valores = self.normalizar_planilha2(df2)
+        chaves = self.config.chaves
+        if not chaves:
+            return valores
+        colunas = [chave.coluna2 for chave in chaves]
+        por_chave = valores_chaves(df2, colunas, self.config.tipos_chaves, self.config.normalizador)
+        return list(zip(valores, *por_chave))
+
+    def _comparador(self, similaridade_min, limite, formatar):
+        if self.config.chaves:
+            return ComparadorMultiChave(
+                self.config.chaves,
+                self.preparo1.multichave,
+                self.preparo1.indice_exato,
+                self.preparo1.compostos_norm,
+                similaridade_min,
+                limite,
+                formatar,
+            )
+        return ComparadorBloco(
+            self.preparo1.indice_exato,
+            self.preparo1.indice,
+            self.pontuador,
+            similaridade_min,
+            limite,
+            formatar,
+            self.fonetica,
+        )
+
+    def _novo_armazem(self):
+        if self.config.piso_scores is None:
+            return None
+        piso = min(self.config.piso_scores, self.config.similaridade_min)
+        return ArmazemScores(piso, self.preparo1.compostos_norm, self.config)
+
+    def amostra(self, df2, linhas=LINHAS_AMOSTRA, cancelado=lambda: False):
+        """
+        Registros [valor, encontrado_exato, similares] das primeiras `linhas` da planilha 2.
+        Os valores comparados aqui ficam guardados e o `comparar` seguinte não os pontua de novo.
+        """
+        # Mesmo modo da comparação completa (pares brutos desde o piso, se houver), para o
+        # resultado de cada valor poder ser reaproveitado por ela
+        self._da_amostra = {}
+        registros = []
+        armazem = self._novo_armazem()
+        for lote, _ in self.lotes(df2.head(linhas), cancelado, 1, armazem, guardar=self._da_amostra):
+            registros.extend(lote)
+        return registros
+
+    def lotes(self, df2, cancelado=lambda: False, processos=None, armazem=None, prontos=None, guardar=None):
+        """
+        Gera (registros, linhas_concluidas) para a planilha 2 inteira, em ordem.
+        Para de gerar assim que `cancelado()` retornar True.
+
+        Valores repetidos (mesmo composto normalizado) são comparados uma única vez: só a
+        primeira ocorrência vai para o match exato/pontuação e as demais reaproveitam o
+        resultado. `linhas_reaproveitadas` conta essas linhas (as repetidas sem match exato).
+
+        Com `armazem`, a pontuação vai até o piso dele e todos os pares >= piso são
+        guardados; a saída continua filtrada pela similaridade/limite da configuração.
+
+        `prontos` (valor -> registro vindo do comparador) são reaproveitados sem comparar de
+        novo; em `guardar`, se informado, ficam os registros comparados nesta chamada.
+        """
+        prontos = {} if prontos is None else prontos
+        processos = self.config.processos if processos is None else processos
+        valores = self.itens_planilha2(df2)
+        casados_cpf = self._casados_cpf(df2).tolist()
+        total = len(valores)
+        tamanho = TAMANHO_FATIA if processos > 1 else TAMANHO_BLOCO
+
+        # Ocorrências ainda por emitir de cada valor: o resultado sai do memo na última delas
+        restantes = Counter(v for v, casou in zip(valores, casados_cpf) if not casou)
+        enviados = set()
+        memo = {}
+        # (início, fim, registros reaproveitados) das fatias enviadas, na ordem em que os resultados voltam
+        pendentes = deque()
+        self.linhas_reaproveitadas = 0
+
+        def envios():
+            # Cada fatia leva só os valores ainda não enviados (e não casados por CPF)
+            for inicio in range(0, total, tamanho):
+                fim = min(inicio + tamanho, total)
+                envio = []
+                reaproveitados = []
+                for valor, casou in zip(valores[inicio:fim], casados_cpf[inicio:fim]):
+                    if not casou and valor not in enviados:
+                        enviados.add(valor)
+                        if valor in prontos:
+                            reaproveitados.append(prontos[valor])
+                        else:
+                            envio.append(valor)
+                pendentes.append((inicio, fim, reaproveitados))
+                yield envio, np.zeros(len(envio), dtype=bool)
+
+        for registros_envio, _ in self._lotes_unicos(envios(), cancelado, processos, armazem):
+            inicio, fim, reaproveitados = pendentes.popleft()
+            if guardar is not None:
+                guardar.update((registro[0], registro) for registro in registros_envio)
+            registros_envio = reaproveitados + registros_envio
+            for valor, encontrado_exato, similares in registros_envio:
+                if armazem is not None:
+                    # `similares` veio como pares >= piso: guarda todos e formata só os da configuração
+                    codigo = armazem.definir_pares(valor, encontrado_exato, similares)
+                    acertos = armazem.acertos(codigo, self.config.similaridade_min, self.config.limite_similares)
+                    similares = formatar_similares(acertos, self.preparo1.compostos_norm)
+                memo[valor] = (encontrado_exato, similares)
+            if armazem is not None:
+                armazem.adicionar_linhas(valores[inicio:fim], casados_cpf[inicio:fim])
+            primeiros = {registro[0] for registro in registros_envio}
+
+            registros = []
+            for valor, casou in zip(valores[inicio:fim], casados_cpf[inicio:fim]):
+                if casou:
+                    registros.append([exibicao(valor), True, ""])
+                    continue
+                encontrado_exato, similares = memo[valor]
+                if valor in primeiros:
+                    primeiros.discard(valor)
+                elif not encontrado_exato:
+                    self.linhas_reaproveitadas += 1
+                restantes[valor] -= 1
+                if not restantes[valor]:
+                    del memo[valor]
+                registros.append([exibicao(valor), encontrado_exato, similares])
+            yield registros, fim
+
+    def _lotes_unicos(self, envios, cancelado, processos, armazem):
+        """Compara as fatias de `envios` na thread atual ou num pool de processos, em ordem."""
+        if armazem is not None:
+            # Pares brutos desde o piso (sem limite): o filtro final é feito em `lotes`
+            similaridade_min, limite, formatar = armazem.piso, None, False
+        else:
+            similaridade_min, limite, formatar = self.config.similaridade_min, self.config.limite_similares, True
+        comparador = self._comparador(similaridade_min, limite, formatar)
+        if processos > 1:
+            yield from comparar_em_processos(envios, comparador, cancelado, processos)
+            return
+
+        # Match exato linha a linha e a parte fuzzy da fatia inteira numa única chamada
+        # ao pontuador (C++, todos os núcleos). O comparador também para entre as matrizes
+        # do cdist: um bloco interrompido assim fica incompleto e não é gerado
+        comparador.cancelado = cancelado
+        concluidas = 0
+        for valores_normalizados, casados_cpf in envios:
+            if cancelado():
+                return
+            registros = comparador.comparar(valores_normalizados, casados_cpf)
+            if cancelado():
+                return
+            concluidas += len(registros)
+            yield registros, concluidas
+
+    def comparar(self, df2, caminho_saida, cancelado=lambda: False, progresso=None, checkpoint=None):
+        """
+        Compara a planilha 2 inteira gravando o resultado em `caminho_saida` (xlsx, csv ou parquet).
+        `progresso(linhas_concluidas, total)` é chamado a cada lote (ver `MedidorProgresso` para
+        limitar a frequência). Se cancelada, o arquivo parcial é removido.
+        Com `piso_scores` configurado, o resultado traz também o `armazem` de scores.
+        Os valores já comparados pela `amostra` não são pontuados de novo.
+
+        Com `checkpoint` (ver `planilhas.checkpoint`), o que já foi calculado é gravado
+        periodicamente e, se o checkpoint já cobre linhas de uma execução anterior, elas são
+        regravadas na saída e a comparação continua da linha seguinte. Uma comparação retomada
+        não traz o `armazem` (os pares das linhas anteriores não ficam no checkpoint).
+        """
+        armazem = self._novo_armazem()
+        if checkpoint is None:
+            lotes = self.lotes(df2, cancelado, armazem=armazem, prontos=self._da_amostra)
+        else:
+            lotes = self._lotes_com_checkpoint(df2, checkpoint, cancelado, armazem)
+        retomado_de = checkpoint.linhas if checkpoint is not None else 0
+        resultado = gravar_resultado(lotes, len(df2), caminho_saida, self.config, cancelado, progresso)
+        if not resultado.cancelado:
+            resultado.linhas_reaproveitadas = self.linhas_reaproveitadas
+            # Retomada: o armazém só viu as linhas depois do checkpoint
+            resultado.armazem = armazem if not retomado_de else None
+            resultado.retomado_de = retomado_de
+            if checkpoint is not None:
+                checkpoint.descartar()
+        return resultado
+
+    def _lotes_com_checkpoint(self, df2, checkpoint, cancelado, armazem):
+        """`lotes` a partir da linha seguinte ao checkpoint, gravando checkpoints pelo caminho."""
+        inicio = checkpoint.linhas
+        reaproveitadas_antes = checkpoint.linhas_reaproveitadas
+        yield from checkpoint.partes()
+
+        pendentes = []  # registros ainda fora do checkpoint
+        cobertas = inicio
+        ultimo = time.monotonic()
+        lotes = self.lotes(df2.iloc[inicio:], cancelado, armazem=armazem, prontos=self._da_amostra)
+        try:
+            for registros, concluidas in lotes:
+                pendentes.extend(registros)
+                cobertas = inicio + concluidas
+                yield registros, cobertas
+                if time.monotonic() - ultimo >= checkpoint.intervalo:
+                    checkpoint.salvar(pendentes, cobertas, reaproveitadas_antes + self.linhas_reaproveitadas)
+                    pendentes = []
+                    ultimo = time.monotonic()
+        finally:
+            # Cancelada (ou com erro): guarda o que falta para a próxima execução continuar daqui
+            if pendentes:
+                checkpoint.salvar(pendentes, cobertas, reaproveitadas_antes + self.linhas_reaproveitadas)
+            self.linhas_reaproveitadas += reaproveitadas_antes
+
+
+def reexportar(armazem, config, caminho_saida, cancelado=lambda: False, progresso=None):
+    """
+    Grava de novo o resultado a partir de um `ArmazemScores`, com a similaridade e o limite
+    de `config` (similaridade >= piso do armazém). Nada é pontuado de novo.
+    """
+    lotes = armazem.lotes(config.similaridade_min, config.limite_similares, cancelado)
+    return gravar_resultado(lotes, len(armazem), caminho_saida, config, cancelado, progresso)
+
+
+def gravar_resultado(lotes, total, caminho_saida, config, cancelado=lambda: False, progresso=None):
+    """Grava os (registros, linhas_concluidas) de `lotes` em `caminho_saida`, em streaming."""
+    escritor = None
+    encontrados = com_similares = 0
+    try:
+        # Cada lote vai direto para o disco: o resultado completo nunca fica em memória
+        escritor = abrir_escritor(caminho_saida, config.colunas_saida())
+        for registros, concluidas in lotes:
+            escritor.escrever([(valor, "Sim" if ok else "Não", similares) for valor, ok, similares in registros])
+            for _, ok, similares in registros:
+                encontrados += bool(ok)
+                com_similares += bool(similares)
+            if progresso is not None:
+                progresso(concluidas, total)
+
+        if cancelado():
+            escritor.descartar()
+            return ResultadoComparacao(cancelado=True)
+        escritor.fechar()
+        return ResultadoComparacao(
+            cancelado=False,
+            caminho=caminho_saida,
+            linhas=escritor.linhas_escritas,
+            encontrados=encontrados,
+            com_similares=com_similares,
+        )
+    except BaseException:
+        _descartar_saida(escritor)
+        raise
+
+
+def _descartar_saida(escritor):
+    if escritor is None:
+        return
+    try:
+        escritor.descartar()
+    except Exception:
+        pass
@@ -0,0 +1,359 @@
+"""
+Busca de nomes similares dentro de uma única coluna, sem dependência de Qt.
+
+O `NomesSimilaresWorker` comparava todos os pares i < j com `fuzz.ratio`, um por
+chamada, num só núcleo. Aqui os nomes repetidos viram um só (com a quantidade de
+ocorrências) antes de tudo, e os distintos ficam em ordem de tamanho e são pontuados em
+blocos quadrados com `process.cdist` (C++, `workers` núcleos, com `score_cutoff`):
+cada bloco de linhas contra as colunas a partir dele, fatiadas para que nenhuma
+matriz passe de `MAX_CELULAS` células. A memória depende do bloco, não de n².
+
+Para o ratio, a distância Indel é pelo menos |la - lb|, então a pontuação de um par
+nunca passa de 200 * min(la, lb) / (la + lb): as colunas de cada bloco vão só até o
+maior tamanho da janela do seu nome mais longo (`janela_tamanhos`); o resto da lista
+não alcança o limite e nem é visitado. Os acertos de cada matriz saem com NumPy
+(`np.nonzero`), e o resultado é o mesmo da varredura par a par sobre os nomes distintos.
+
+Os pares saem em lotes (`lotes_pares`), cada par uma única vez. `tabela_pares` junta
+os lotes numa `TabelaPares` (colunas NumPy, para a tabela da interface com um milhão
+de linhas); `agrupar_similares` junta os nomes ligados por algum par em grupos
+(union-find), à medida que os lotes chegam, sem guardar a lista de pares.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+from planilhas.indice_candidatos import janela_tamanhos
+from planilhas.pontuacao import MAX_CELULAS, WORKERS_PADRAO
+
+# Nomes (linhas da matriz) por bloco
+TAMANHO_BLOCO = 1024
+
+# Folga no score_cutoff do cdist: o filtro final é feito aqui com `>=` (ver pontuacao.py)
+_FOLGA_CUTOFF = 1e-6
+
+# Critérios de `TabelaPares.ordem` (os mesmos textos do combo "Ordenar por:")
+ORDENACOES_PARES = (
+    "Similaridade (maior primeiro)",
+    "Similaridade (menor primeiro)",
+    "Nome 1 (A-Z)",
+    "Nome 1 (Z-A)",
+    "Nome 2 (A-Z)",
+    "Nome 2 (Z-A)",
+)
+
+
+def limpar_nome(valor):
+    """Texto do nome sem espaços nas pontas ("" para vazio/NaN)."""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        return ""
+    return str(valor).strip()
+
+
+def contar_nomes(nomes):
+    """Nomes distintos (sem vazios), na ordem da primeira ocorrência, e quantas vezes cada um aparece."""
+    contagem = Counter(nome for nome in map(limpar_nome, nomes) if nome)
+    return list(contagem), list(contagem.values())
+
+
+def lotes_pares(
+    unicos,
+    limite_similaridade,
+    cancelado=lambda: False,
+    progresso=None,
+    workers=WORKERS_PADRAO,
+    tamanho_bloco=TAMANHO_BLOCO,
+    max_celulas=MAX_CELULAS,
+):
+    """
+    Gera lotes (i, j, similaridade) de arrays NumPy com os pares i < j de `unicos` (nomes
+    distintos, não vazios) com `fuzz.ratio` >= limite. Cada par aparece uma única vez.
+    `progresso(percentual)` é chamado quando o percentual muda; para de gerar se `cancelado()`.
+    """
+    varredura = _Varredura(unicos, limite_similaridade, workers, tamanho_bloco, max_celulas)
+    yield from varredura.executar(cancelado, _Percentual(progresso))
+
+
+def tabela_pares(nomes, limite_similaridade, cancelado=lambda: False, progresso=None, **opcoes):
+    """
+    `TabelaPares` com os pares de nomes distintos com `fuzz.ratio` >= limite (ver `lotes_pares`).
+    Nomes vazios são ignorados. Se `cancelado()` retornar True, traz os pares achados até ali.
+    `opcoes`: workers, tamanho_bloco e max_celulas.
+    """
+    tabela = TabelaPares(*contar_nomes(nomes))
+    for lote in lotes_pares(tabela.nomes, limite_similaridade, cancelado, progresso, **opcoes):
+        tabela.adicionar(*lote)
+    return tabela
+
+
+def pares_similares(nomes, limite_similaridade, cancelado=lambda: False, progresso=None, **opcoes):
+    """
+    Pares (nome_a, nome_b, similaridade, ocorrencias_a, ocorrencias_b) de nomes distintos com
+    `fuzz.ratio` >= limite, nome_a aparecendo antes na lista; as ocorrências contam as repetições
+    de cada nome. Mesmos parâmetros de `tabela_pares`, na ordem da varredura par a par.
+    """
+    tabela = tabela_pares(nomes, limite_similaridade, cancelado, progresso, **opcoes)
+    return [tabela.linha(k) for k in tabela.ordem().tolist()]
+
+
+class TabelaPares:
+    """
+    Pares encontrados em colunas NumPy: índices dos dois nomes na lista de distintos e a
+    similaridade. Uma linha só vira texto quando é pedida (`linha`), e cada ordenação é uma
+    permutação calculada de uma vez com `np.lexsort` (guardada até chegarem pares novos).
+    """
+
+    colunas = ("Nome 1", "Nome 2", "Similaridade (%)", "Ocorrências 1", "Ocorrências 2")
+
+    def __init__(self, nomes, contagens):
+        self.nomes = nomes
+        self.contagens = contagens
+        self._i = np.empty(0, dtype=np.int64)
+        self._j = np.empty(0, dtype=np.int64)
+        self._scores = np.empty(0, dtype=np.float64)
+        self._novos = []  # lotes ainda não concatenados
+        self._ordens = {}
+        self._postos = None
+        self._exibidos = None
+
+    def adicionar(self, i, j, scores):
+        self._novos.append((i, j, scores))
+        self._ordens.clear()
+
+    def _colunas(self):
+        if self._novos:
+            self._i, self._j, self._scores = (
+                np.concatenate([atual, *partes])
+                for atual, partes in zip((self._i, self._j, self._scores), zip(*self._novos))
+            )
+            self._novos = []
+        return self._i, self._j, self._scores
+
+    def __len__(self):
+        return len(self._i) + sum(len(lote[0]) for lote in self._novos)
+
+    def linha(self, k):
+        """(nome_1, nome_2, similaridade, ocorrências_1, ocorrências_2) da linha k (ordem de chegada)."""
+        i, j, scores = self._colunas()
+        a, b = int(i[k]), int(j[k])
+        return self.nomes[a], self.nomes[b], round(float(scores[k]), 1), self.contagens[a], self.contagens[b]
+
+    def ordem(self, criterio=None):
+        """
+        Permutação das linhas pelo `criterio` (índice em ORDENACOES_PARES) ou, com None, na ordem
+        da varredura par a par (nome 1 e depois nome 2 pela primeira ocorrência).
+        """
+        ordem = self._ordens.get(criterio)
+        if ordem is not None:
+            return ordem
+        i, j, _ = self._colunas()
+        if criterio is None:
+            ordem = np.lexsort((j, i))
+        else:
+            scores = self._scores_exibidos()
+            postos = self._postos_alfabeticos()
+            a, b = postos[i], postos[j]
+            if criterio == 0:
+                ordem = np.lexsort((b, a, -scores))
+            elif criterio == 1:
+                ordem = np.lexsort((b, a, scores))
+            elif criterio in (2, 3):
+                ordem = np.lexsort((scores, b, a))
+            else:
+                ordem = np.lexsort((scores, a, b))
+            if criterio in (3, 5):  # Z-A: a ordem A-Z de trás para frente
+                ordem = ordem[::-1]
+        self._ordens[criterio] = ordem
+        return ordem
+
+    def _scores_exibidos(self):
+        """Similaridades arredondadas como aparecem na tabela (empates de exibição desempatam pelos nomes)."""
+        _, _, scores = self._colunas()
+        if self._exibidos is None or len(self._exibidos) != len(scores):
+            self._exibidos = np.array([round(s, 1) for s in scores.tolist()], dtype=np.float64)
+        return self._exibidos
+
+    def _postos_alfabeticos(self):
+        """Posição de cada nome distinto na ordem alfabética (sem diferenciar maiúsculas: LUIZ e Luiz empatam)."""
+        if self._postos is None:
+            minusculos = [nome.lower() for nome in self.nomes]
+            _, self._postos = np.unique(np.array(minusculos, dtype=object), return_inverse=True)
+        return self._postos
+
+    def para_dataframe(self):
+        i, j, _ = self._colunas()
+        nomes = np.asarray(self.nomes, dtype=object)
+        contagens = np.asarray(self.contagens, dtype=np.int64)
+        valores = (nomes[i], nomes[j], self._scores_exibidos(), contagens[i], contagens[j])
+        return pd.DataFrame(dict(zip(self.colunas, valores)))
+
+
+@dataclass
+class GrupoSimilares:
+    representante: str  # o nome com mais ocorrências no grupo (empate: o que aparece primeiro)
+    membros: List[Tuple[str, int]]  # (nome, ocorrências), na ordem da primeira ocorrência
+    ocorrencias: int  # soma das ocorrências dos membros
+
+
+def agrupar_similares(nomes, limite_similaridade, cancelado=lambda: False, progresso=None, **opcoes):
+    """
+    Grupos de nomes ligados por pares com similaridade >= limite (direta ou indiretamente:
+    A~B e B~C põem A, B e C no mesmo grupo), na ordem da primeira ocorrência de cada grupo.
+    Os pares vão direto para o union-find, lote a lote: a lista de pares nunca fica em memória.
+    Se `cancelado()` retornar True, devolve os grupos formados pelos pares achados até ali.
+    """
+    unicos, contagens = contar_nomes(nomes)
+    uniao = UniaoBusca(len(unicos))
+    for i, j, _ in lotes_pares(unicos, limite_similaridade, cancelado, progresso, **opcoes):
+        for a, b in zip(i.tolist(), j.tolist()):
+            uniao.unir(a, b)
+
+    membros_por_raiz = {}
+    for indice in range(len(unicos)):
+        if uniao.tamanho_do_grupo(indice) > 1:
+            membros_por_raiz.setdefault(uniao.raiz(indice), []).append(indice)
+    grupos = []
+    for membros in membros_por_raiz.values():
+        # max devolve o primeiro em caso de empate: membros estão na ordem da primeira ocorrência
+        representante = max(membros, key=lambda indice: contagens[indice])
+        grupos.append(
+            GrupoSimilares(
+                unicos[representante],
+                [(unicos[indice], contagens[indice]) for indice in membros],
+                sum(contagens[indice] for indice in membros),
+            )
+        )
+    return grupos
+
+
+class TabelaGrupos:
+    """Os grupos de `agrupar_similares` como linhas de tabela: representante, variações e quantidades."""
+
+    colunas = ("Representante", "Variações", "Nomes no grupo", "Ocorrências")
+
+    def __init__(self, grupos):
+        self.linhas = [
+            (
+                grupo.representante,
+                ", ".join(f"{nome} ({ocorrencias})" for nome, ocorrencias in grupo.membros),
+                len(grupo.membros),
+                grupo.ocorrencias,
+            )
+            for grupo in grupos
+        ]
+
+    def __len__(self):
+        return len(self.linhas)
+
+    def linha(self, k):
+        return self.linhas[k]
+
+    def ordem(self, criterio=None):
+        """Os maiores grupos primeiro (os critérios de ORDENACOES_PARES são de pares)."""
+        return np.array(
+            sorted(range(len(self.linhas)), key=lambda k: (-self.linhas[k][2], self.linhas[k][0].lower())),
+            dtype=np.int64,
+        )
+
+    def para_dataframe(self):
+        return pd.DataFrame(self.linhas, columns=list(self.colunas))
+
+
+class UniaoBusca:
+    """Union-find (com compressão de caminho e união por tamanho) sobre os índices 0..n-1."""
+
+    def __init__(self, n):
+        self._pai = list(range(n))
+        self._tamanho = [1] * n
+
+    def raiz(self, indice):
+        pai = self._pai
+        while pai[indice] != indice:
+            pai[indice] = pai[pai[indice]]
+            indice = pai[indice]
+        return indice
+
+    def unir(self, a, b):
+        a, b = self.raiz(a), self.raiz(b)
+        if a == b:
+            return
+        if self._tamanho[a] < self._tamanho[b]:
+            a, b = b, a
+        self._pai[b] = a
+        self._tamanho[a] += self._tamanho[b]
+
+    def tamanho_do_grupo(self, indice):
+        return self._tamanho[self.raiz(indice)]
+
+
+class _Varredura:
+    """Todos os pares de `textos` (distintos) com ratio >= limite, em blocos (ver docstring do módulo)."""
+
+    def __init__(self, textos, limite_similaridade, workers, tamanho_bloco, max_celulas):
+        ordem = sorted((i for i, texto in enumerate(textos) if texto), key=lambda i: len(textos[i]))
+        self.ordem = np.array(ordem, dtype=np.int64)
+        self.textos = [textos[i] for i in self.ordem]
+        self.tamanhos = [len(t) for t in self.textos]
+        self.limite = limite_similaridade
+        self.workers = workers
+        self.tamanho_bloco = tamanho_bloco
+        self.max_celulas = max_celulas
+
+    def executar(self, cancelado, progresso):
+        """Gera (i, j, similaridade) com i < j (posições em `textos`) de cada matriz com acertos."""
+        total = len(self.ordem)
+        for inicio in range(0, total, self.tamanho_bloco):
+            if cancelado():
+                return
+            fim = min(inicio + self.tamanho_bloco, total)
+            # Em ordem de tamanho: o último nome do bloco é o mais longo e tem a maior janela
+            _, maximo = janela_tamanhos(self.tamanhos[fim - 1], self.limite)
+            fim_colunas = bisect_right(self.tamanhos, maximo)
+            # Colunas a partir do início do bloco: os pares com as linhas anteriores já saíram
+            passo = max(1, self.max_celulas // (fim - inicio))
+            for coluna in range(inicio, fim_colunas, passo):
+                if cancelado():
+                    return
+                acertos = self._bloco(inicio, fim, coluna, min(coluna + passo, fim_colunas))
+                if acertos is not None:
+                    yield acertos
+            progresso(int(100 * fim / total))
+
+    def _bloco(self, inicio, fim, coluna_ini, coluna_fim):
+        matriz = process.cdist(
+            self.textos[inicio:fim],
+            self.textos[coluna_ini:coluna_fim],
+            scorer=fuzz.ratio,
+            score_cutoff=max(0.0, self.limite - _FOLGA_CUTOFF),
+            dtype=np.float64,
+            workers=self.workers,
+        )
+        linhas, colunas = np.nonzero(matriz >= self.limite)
+        # Cada par uma vez: só acima da diagonal
+        ok = colunas + coluna_ini > linhas + inicio
+        if not ok.any():
+            return None
+        linhas, colunas = linhas[ok], colunas[ok]
+        a, b = self.ordem[linhas + inicio], self.ordem[colunas + coluna_ini]
+        return np.minimum(a, b), np.maximum(a, b), matriz[linhas, colunas]
+
+
+class _Percentual:
+    """Repassa o progresso só quando o percentual muda (e nada, sem `progresso`)."""
+
+    def __init__(self, progresso):
+        self.progresso = progresso
+        self._ultimo = -1
+
+    def __call__(self, percentual):
+        if self.progresso is not None and percentual != self._ultimo:
+            self._ultimo = percentual
+            self.progresso(percentual)
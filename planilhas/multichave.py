@@ -0,0 +1,317 @@
+"""
+Pontuação multichave: cada par de colunas com o seu próprio scorer e peso.
+
+No modo normal as colunas selecionadas viram um composto "A | B | C" pontuado
+inteiro pelo `token_sort_ratio`: todo candidato paga a tokenização e a ordenação
+da concatenação, e nenhuma coluna consegue descartar um par sozinha. Aqui cada
+`ChaveColuna` liga uma coluna da planilha 1 a uma da planilha 2:
+
+- chaves exatas e numéricas são filtros: o par só existe se os valores forem iguais
+  e não vazios (as numéricas comparam só os dígitos). Viram uma junção por hash, antes
+  de qualquer pontuação fuzzy;
+- chaves fuzzy (token sort, ratio, token set) entram na média ponderada pelos pesos.
+  São pontuadas da mais pesada para a mais leve e, depois de cada uma, os pares que
+  não alcançam a similaridade mínima nem com 100% nas restantes são descartados.
+
+O score do par é a média ponderada das chaves fuzzy (100 quando só há filtros).
+"""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from planilhas.cpf import digitos_series
+from planilhas.indice_candidatos import IndiceCandidatos
+from planilhas.pontuacao import MAX_CELULAS, WORKERS_PADRAO, formatar_similares
+
+TIPO_TOKEN_SORT = "token_sort"
+TIPO_RATIO = "ratio"
+TIPO_TOKEN_SET = "token_set"
+TIPO_EXATO = "exato"
+TIPO_NUMERICO = "numerico"
+
+# Tipo -> texto mostrado na interface
+NOMES_TIPOS = {
+    TIPO_TOKEN_SORT: "Fuzzy (ordem das palavras livre)",
+    TIPO_RATIO: "Fuzzy (texto corrido)",
+    TIPO_TOKEN_SET: "Fuzzy (conjunto de palavras)",
+    TIPO_EXATO: "Exato (filtro)",
+    TIPO_NUMERICO: "Numérico (filtro, só dígitos)",
+}
+TIPOS_CHAVE = tuple(NOMES_TIPOS)
+
+SCORERS = {
+    TIPO_TOKEN_SORT: fuzz.token_sort_ratio,
+    TIPO_RATIO: fuzz.ratio,
+    TIPO_TOKEN_SET: fuzz.token_set_ratio,
+}
+TIPOS_FILTRO = (TIPO_EXATO, TIPO_NUMERICO)
+
+# Tipos cujo score é 100 * (1 - d / (la + lb)): aceitam o filtro do IndiceCandidatos
+_TIPOS_INDEXAVEIS = (TIPO_TOKEN_SORT, TIPO_RATIO)
+
+# Com menos candidatos que isso depois dos filtros, pontuar sai mais barato que consultar o índice
+_MIN_CANDIDATOS_INDICE = 256
+
+# Mesma folga do PontuadorLote: os cortes intermediários nunca descartam um par no limite
+_FOLGA = 1e-6
+
+
+@dataclass(frozen=True)
+class ChaveColuna:
+    coluna1: str
+    coluna2: str
+    tipo: str = TIPO_TOKEN_SORT
+    peso: float = 1.0  # ignorado nas chaves de filtro
+
+    @property
+    def filtro(self):
+        return self.tipo in TIPOS_FILTRO
+
+
+def validar_chaves(chaves):
+    """Levanta ValueError se a lista de chaves não puder ser usada numa comparação."""
+    if not chaves:
+        raise ValueError("Informe ao menos uma chave de comparação")
+    for chave in chaves:
+        if chave.tipo not in NOMES_TIPOS:
+            raise ValueError(f"Tipo de chave desconhecido: {chave.tipo!r} (use {', '.join(TIPOS_CHAVE)})")
+        if not chave.filtro and not chave.peso > 0:
+            raise ValueError(f"Peso da coluna {chave.coluna1!r} deve ser maior que zero")
+
+
+def exibicao(item):
+    """Texto de exibição de um item da planilha 2 (no modo multichave, o 1º elemento da tupla)."""
+    return item[0] if isinstance(item, tuple) else item
+
+
+def normalizar_numerica(serie):
+    """Só os dígitos, sem zeros à esquerda ("12345.0" do Excel vira "12345"; "" se vazio)."""
+    return digitos_series(serie).str.lstrip("0")
+
+
+def valores_chaves(df, colunas, tipos, normalizador):
+    """Valores normalizados de cada coluna (numéricas só com os dígitos), uma lista por coluna."""
+    valores = []
+    for coluna, tipo in zip(colunas, tipos):
+        serie = df[coluna]
+        if tipo == TIPO_NUMERICO:
+            valores.append(normalizar_numerica(serie).tolist())
+        else:
+            valores.append(normalizador.normalize_series(serie).tolist())
+    return valores
+
+
+@dataclass
+class PreparoMultiChave:
+    """Lado da planilha 1 das chaves: valores por coluna, junção dos filtros e índices fuzzy."""
+
+    tipos: Tuple[str, ...]
+    valores: List[List[str]]  # um por chave, na ordem de `tipos`
+    filtro: Dict[tuple, np.ndarray] = field(default_factory=dict)  # valores dos filtros -> linhas
+    indices: Dict[int, IndiceCandidatos] = field(default_factory=dict)  # posição da chave -> índice
+
+
+def preparar_multichave(df1, chaves, normalizador):
+    tipos = tuple(chave.tipo for chave in chaves)
+    valores = valores_chaves(df1, [chave.coluna1 for chave in chaves], tipos, normalizador)
+    posicoes_filtro = [i for i, tipo in enumerate(tipos) if tipo in TIPOS_FILTRO]
+    filtro = {}
+    if posicoes_filtro:
+        linhas_por_chave = {}
+        for linha, chave_filtro in enumerate(zip(*(valores[i] for i in posicoes_filtro))):
+            # Filtro vazio (célula em branco/NaN) é dado faltando, não um valor: não casa com nada
+            if "" not in chave_filtro:
+                linhas_por_chave.setdefault(chave_filtro, []).append(linha)
+        filtro = {k: np.asarray(v, dtype=np.int64) for k, v in linhas_por_chave.items()}
+    indices = {
+        i: IndiceCandidatos(valores[i], ordenar_tokens=tipo == TIPO_TOKEN_SORT)
+        for i, tipo in enumerate(tipos)
+        if tipo in _TIPOS_INDEXAVEIS
+    }
+    return PreparoMultiChave(tipos, valores, filtro, indices)
+
+
+class ComparadorMultiChave:
+    """
+    Mesma interface do `ComparadorBloco`, para itens (composto, valor da chave 1, ...) da planilha 2.
+
+    O match exato ("ESTÁ NA PLANILHA 1") continua sendo o do composto inteiro; os similares
+    vêm da média ponderada das chaves, com os filtros exatos/numéricos aplicados antes.
+    """
+
+    def __init__(
+        self,
+        chaves,
+        preparo,
+        indice_exato,
+        escolhas,
+        similaridade_min,
+        limite=None,
+        formatar=True,
+        workers=WORKERS_PADRAO,
+        max_pares=MAX_CELULAS,
+    ):
+        self.preparo = preparo
+        self.indice_exato = indice_exato
+        self.escolhas = escolhas  # compostos normalizados da planilha 1 (texto dos similares)
+        self.similaridade_min = similaridade_min
+        self.limite = limite
+        self.formatar = formatar
+        self.workers = workers
+        self.max_pares = max_pares
+        self.total = len(escolhas)
+        self.cancelado = None  # como no ComparadorBloco: interrompe entre as chamadas ao cpdist
+
+        self.posicoes_filtro = [i for i, chave in enumerate(chaves) if chave.filtro]
+        fuzzy = [i for i, chave in enumerate(chaves) if not chave.filtro]
+        # Da chave mais pesada para a mais leve: o corte antecipado descarta mais pares cedo
+        self.posicoes_fuzzy = sorted(fuzzy, key=lambda i: -chaves[i].peso)
+        self.pesos = {i: float(chaves[i].peso) for i in fuzzy}
+        self.peso_total = sum(self.pesos.values())
+        self.valores = [np.asarray(v, dtype=object) for v in preparo.valores]
+
+        # Score mínimo de cada chave fuzzy para o par ainda alcançar a similaridade com 100% nas outras
+        alvo = similaridade_min * self.peso_total
+        self.minimos = {i: (alvo - (self.peso_total - p) * 100.0) / p for i, p in self.pesos.items()}
+        indexaveis = [i for i in self.posicoes_fuzzy if i in preparo.indices and self.minimos[i] > 0]
+        self.posicao_indice = max(indexaveis, key=lambda i: self.minimos[i]) if indexaveis else None
+
+    def usar_um_nucleo(self):
+        self.workers = 1
+
+    def limitar_celulas(self, max_celulas):
+        self.max_pares = min(self.max_pares, max_celulas)
+
+    def _candidatos(self, item):
+        """Linhas da planilha 1 que passam pelos filtros e pelo índice de q-gramas (ordenadas)."""
+        candidatos = None
+        if self.posicoes_filtro:
+            chave_filtro = tuple(item[1 + i] for i in self.posicoes_filtro)
+            # Filtro vazio não casa com nada (ver `preparar_multichave`)
+            candidatos = None if "" in chave_filtro else self.preparo.filtro.get(chave_filtro)
+            if candidatos is None:
+                return np.empty(0, dtype=np.int64)
+        i = self.posicao_indice
+        if i is not None and (candidatos is None or len(candidatos) > _MIN_CANDIDATOS_INDICE):
+            do_indice = self.preparo.indices[i].candidatos(item[1 + i], self.minimos[i])
+            candidatos = do_indice if candidatos is None else np.intersect1d(candidatos, do_indice, assume_unique=True)
+        if candidatos is None:
+            return np.arange(self.total, dtype=np.int64)
+        return candidatos
+
+    def _pontuar_pares(self, itens, consultas, linhas, pisos=None):
+        """
+        Scores (média ponderada) dos pares (consultas[k], linhas[k]); devolve só os pares
+        com score >= similaridade_min (ou >= pisos[k], se informado), na mesma ordem.
+        """
+        if not self.posicoes_fuzzy:
+            return consultas, linhas, np.full(len(linhas), 100.0)
+        if pisos is None:
+            pisos = np.full(len(linhas), float(self.similaridade_min))
+        acumulado = np.zeros(len(linhas))
+        restante = self.peso_total
+        alvos = pisos * self.peso_total - _FOLGA
+        for i in self.posicoes_fuzzy:
+            if self.cancelado is not None and self.cancelado():
+                return consultas[:0], linhas[:0], acumulado[:0]
+            peso = self.pesos[i]
+            # O cutoff do cpdist é um só para o lote: o do par com o piso mais baixo
+            minimo = self.minimos[i] + (pisos.min() - self.similaridade_min) * self.peso_total / peso
+            valores2 = np.asarray([item[1 + i] for item in itens], dtype=object)
+            scores = process.cpdist(
+                valores2[consultas],
+                self.valores[i][linhas],
+                scorer=SCORERS[self.preparo.tipos[i]],
+                score_cutoff=max(0.0, minimo - _FOLGA),
+                dtype=np.float64,
+                workers=self.workers,
+            )
+            acumulado += peso * scores
+            restante -= peso
+            # Corte antecipado: nem 100% nas chaves que faltam leva o par ao piso dele
+            ok = acumulado + restante * 100.0 >= alvos
+            consultas, linhas, acumulado = consultas[ok], linhas[ok], acumulado[ok]
+            pisos, alvos = pisos[ok], alvos[ok]
+            if not len(linhas):
+                break
+        scores = acumulado / self.peso_total
+        ok = scores >= pisos
+        return consultas[ok], linhas[ok], scores[ok]
+
+    def _acertos(self, itens):
+        """
+        [(linha, score), ...] de cada item, como o `PontuadorLote.pontuar`.
+
+        Os pares vão ao `_pontuar_pares` em lotes de até `max_pares` (os candidatos de um
+        item podem ser divididos entre lotes). Com `limite`, cada item guarda no máximo K
+        pares num heap mínimo e, com o heap cheio, o pior score dele vira o piso dos pares
+        seguintes do item, como no `PontuadorLote._pontuar_top_k`.
+        """
+        heaps = [[] for _ in itens]  # itens (score, -linha): empate favorece a linha anterior
+        acertos = [[] for _ in itens]
+        pisos = np.full(len(itens), float(self.similaridade_min))
+        consultas, linhas = [], []
+        pares = 0
+
+        def pontuar():
+            q = np.concatenate(consultas)
+            q, c, s = self._pontuar_pares(itens, q, np.concatenate(linhas), pisos[q] if self.limite else None)
+            for k, linha, score in zip(q.tolist(), c.tolist(), s.tolist()):
+                if not self.limite:
+                    acertos[k].append((linha, score))
+                    continue
+                heap = heaps[k]
+                if len(heap) < self.limite:
+                    heapq.heappush(heap, (score, -linha))
+                elif (score, -linha) > heap[0]:
+                    heapq.heapreplace(heap, (score, -linha))
+                if len(heap) == self.limite:
+                    pisos[k] = heap[0][0]
+            consultas.clear()
+            linhas.clear()
+
+        for k, item in enumerate(itens):
+            if self.cancelado is not None and self.cancelado():
+                break  # incompleto: o bloco será descartado
+            candidatos = self._candidatos(item)
+            inicio = 0
+            while inicio < len(candidatos):
+                fim = inicio + self.max_pares - pares
+                consultas.append(np.full(len(candidatos[inicio:fim]), k, dtype=np.int64))
+                linhas.append(candidatos[inicio:fim])
+                pares += len(linhas[-1])
+                if pares >= self.max_pares:
+                    pontuar()
+                    pares = 0
+                inicio = fim
+        else:
+            if linhas:
+                pontuar()
+
+        if self.limite:
+            # K melhores: maior score primeiro, empate para a linha anterior
+            return [[(-neg_linha, score) for score, neg_linha in sorted(heap, reverse=True)] for heap in heaps]
+        return acertos
+
+    def comparar(self, itens, casados_cpf):
+        """Registros [item, encontrado_exato, similares] na ordem de entrada (ver `comparar_bloco`)."""
+        vazio = "" if self.formatar else []
+        registros = []
+        pendentes = []
+        for item, casou_cpf in zip(itens, casados_cpf):
+            encontrado_exato = bool(casou_cpf) or item[0] in self.indice_exato
+            registros.append([item, encontrado_exato, vazio])
+            if not encontrado_exato:
+                pendentes.append(len(registros) - 1)
+
+        if pendentes:
+            acertos_por_item = self._acertos([registros[k][0] for k in pendentes])
+            for k, acertos in zip(pendentes, acertos_por_item):
+                registros[k][2] = formatar_similares(acertos, self.escolhas) if self.formatar else acertos
+        return registros
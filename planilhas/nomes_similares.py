@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import time
+
+import numpy as np
 import pandas as pd
-from rapidfuzz import fuzz
 
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QCursor, QFont
 from PyQt5.QtWidgets import (
     QApplication,
+    QCheckBox,
     QFileDialog,
     QHBoxLayout,
     QLabel,
@@ -14,8 +17,7 @@ from PyQt5.QtWidgets import (
     QPushButton,
     QProgressBar,
     QSpinBox,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QVBoxLayout,
     QWidget,
     QComboBox,
@@ -23,18 +25,95 @@ from PyQt5.QtWidgets import (
     QToolTip,
 )
 
+from planilhas.motor_nomes_similares import (
+    ORDENACOES_PARES,
+    TabelaGrupos,
+    TabelaPares,
+    agrupar_similares,
+    contar_nomes,
+    lotes_pares,
+)
+
+# Segundos entre dois envios de pares encontrados para a tabela (durante a análise)
+INTERVALO_ENVIO_PARES = 0.5
+
+
+class ModeloResultados(QAbstractTableModel):
+    """
+    Resultados sobre uma `TabelaPares` ou `TabelaGrupos`: a view só pede o texto das linhas
+    visíveis, e ordenar troca a permutação de linhas (calculada pela tabela com NumPy) em vez
+    de recriar um item por célula. Continua leve com um milhão de pares. Sem ordenação, as
+    linhas ficam na ordem de chegada (é assim que os pares entram durante a análise).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tabela = None
+        self._ordem = None  # permutação das linhas; None = ordem de chegada
+        self._colunas = TabelaPares.colunas
+
+    def definir_tabela(self, tabela):
+        self.beginResetModel()
+        self.tabela = tabela
+        self._colunas = tabela.colunas if tabela is not None else TabelaPares.colunas
+        self._ordem = None
+        self.endResetModel()
+
+    def ordenar(self, criterio):
+        if self.tabela is None:
+            return
+        self.beginResetModel()
+        self._ordem = self.tabela.ordem(criterio)
+        self.endResetModel()
+
+    def acrescentar(self, i, j, scores):
+        """Pares que chegaram durante a análise: entram no fim da tabela (em ordem de chegada)."""
+        inicio = len(self.tabela)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(i) - 1)
+        self.tabela.adicionar(i, j, scores)
+        self._ordem = None
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.tabela is None:
+            return 0
+        return len(self.tabela)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._colunas)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        linha = index.row() if self._ordem is None else int(self._ordem[index.row()])
+        return str(self.tabela.linha(linha)[index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._colunas[section]
+        return str(section + 1)
+
 
 class NomesSimilaresWorker(QThread):
     """Thread para comparar nomes na planilha e encontrar similares (incluindo erros de digitação)."""
 
     progress = pyqtSignal(int)
-    finished = pyqtSignal(list)  # lista de (nome1, nome2, similaridade_pct)
+    # TabelaPares vazia (nomes distintos e ocorrências): a interface a preenche com os `pares`
+    iniciada = pyqtSignal(object)
+    # (i, j, similaridades) em arrays: pares achados desde o último envio (no máximo um a cada
+    # INTERVALO_ENVIO_PARES segundos, para não encher a fila de eventos da interface)
+    pares = pyqtSignal(object, object, object)
+    # payload: dict com 'cancelado' bool e, com `agrupar`, 'grupos' (TabelaGrupos)
+    finished = pyqtSignal(object)
     error = pyqtSignal(str)
 
-    def __init__(self, nomes, limite_similaridade):
+    def __init__(self, nomes, limite_similaridade, agrupar=False):
         super().__init__()
-        self.nomes = nomes  # lista de strings (nomes únicos ou com índice para exibição)
+        self.nomes = nomes  # lista de strings (repetidos viram um nome só, com a quantidade de ocorrências)
         self.limite_similaridade = limite_similaridade
+        self.agrupar = agrupar  # um resultado por grupo de variações em vez de um por par
         self._cancelado = False
 
     def cancel(self):
@@ -42,43 +121,37 @@ class NomesSimilaresWorker(QThread):
 
     def run(self):
         try:
-            # rapidfuzz.ratio: considera ordem dos nomes (erros de digitação sim; troca de ordem não)
-            n = len(self.nomes)
-            total_pares = n * (n - 1) // 2 if n > 1 else 0
-            resultados = []
-            pares_processados = 0
-            for i in range(n):
-                if self._cancelado:
-                    break
-                nome_a = self.nomes[i]
-                if nome_a is None or (isinstance(nome_a, float) and pd.isna(nome_a)):
-                    nome_a = ""
-                nome_a = str(nome_a).strip()
-                if not nome_a:
-                    continue
-                for j in range(i + 1, n):
-                    if self._cancelado:
-                        break
-                    nome_b = self.nomes[j]
-                    if nome_b is None or (isinstance(nome_b, float) and pd.isna(nome_b)):
-                        nome_b = ""
-                    nome_b = str(nome_b).strip()
-                    if not nome_b:
-                        continue
-                    if nome_a == nome_b:
-                        continue
-                    # Apenas ratio: ordem dos nomes é considerada (ex: "Joao Silva Souza" vs "Joao Souza Silva" fica menos similar)
-                    similaridade = fuzz.ratio(nome_a, nome_b)
-                    if similaridade >= self.limite_similaridade:
-                        resultados.append((nome_a, nome_b, round(similaridade, 1)))
-                    pares_processados += 1
-                    if total_pares > 0 and pares_processados % max(1, total_pares // 100) == 0:
-                        self.progress.emit(int(100 * pares_processados / total_pares))
+            # rapidfuzz.ratio: considera ordem dos nomes (erros de digitação sim; troca de ordem não).
+            # Pontuados em blocos pelo cdist (todos os núcleos), só dentro da janela de tamanho
+            # (ver motor_nomes_similares.py)
+            args = (self.limite_similaridade, lambda: self._cancelado, self.progress.emit)
+            if self.agrupar:
+                # Os grupos só fecham com todos os pares: chegam no fim (ou no cancelamento, parciais)
+                grupos = TabelaGrupos(agrupar_similares(self.nomes, *args))
+                self.progress.emit(100)
+                self.finished.emit({"cancelado": self._cancelado, "grupos": grupos})
+                return
+            unicos, contagens = contar_nomes(self.nomes)
+            self.iniciada.emit(TabelaPares(unicos, contagens))
+            pendentes = []
+            ultimo_envio = time.monotonic()
+            for lote in lotes_pares(unicos, *args):
+                if len(lote[0]):
+                    pendentes.append(lote)
+                if pendentes and time.monotonic() - ultimo_envio >= INTERVALO_ENVIO_PARES:
+                    self._enviar(pendentes)
+                    pendentes = []
+                    ultimo_envio = time.monotonic()
+            self._enviar(pendentes)
             self.progress.emit(100)
-            self.finished.emit(resultados)
+            self.finished.emit({"cancelado": self._cancelado})
         except Exception as e:
             self.error.emit(str(e))
 
+    def _enviar(self, lotes):
+        if lotes:
+            self.pares.emit(*(np.concatenate(coluna) for coluna in zip(*lotes)))
+
 
 class NomesSimilaresWidget(QWidget):
     """Sub-aba: selecionar uma planilha e detectar nomes similares (incluindo erros de digitação)."""
@@ -88,7 +161,8 @@ class NomesSimilaresWidget(QWidget):
         self.df = None
         self.caminho_planilha = ""
         self._worker = None
-        self._ultimos_resultados = []  # lista de (nome1, nome2, similaridade) para reordenar
+        self._agrupado = False  # análise atual/última com "Agrupar variações" (tabela de grupos)
+        self._resumo_nomes = (0, 0)  # (nomes na coluna, nomes distintos) da última análise
         self.init_ui()
         self.aplicar_tema(True)
 
@@ -131,6 +205,12 @@ class NomesSimilaresWidget(QWidget):
         self.spin_similaridade.setValue(85)
         self.spin_similaridade.setSuffix("%")
         sim_layout.addWidget(self.spin_similaridade)
+        self.chk_agrupar = QCheckBox("Agrupar variações")
+        self.chk_agrupar.setToolTip(
+            "Uma linha por grupo de nomes parecidos (representante e variações) em vez de uma por par.\n"
+            "Se A parece com B e B com C, os três ficam no mesmo grupo."
+        )
+        sim_layout.addWidget(self.chk_agrupar)
         sim_layout.addStretch()
         layout.addLayout(sim_layout)
 
@@ -156,32 +236,26 @@ class NomesSimilaresWidget(QWidget):
 
         # --- Ordenação e tabela de resultados ---
         ord_layout = QHBoxLayout()
-        ord_layout.addWidget(QLabel("Nomes similares encontrados:"))
+        self.lbl_encontrados = QLabel("Nomes similares encontrados:")
+        ord_layout.addWidget(self.lbl_encontrados)
         ord_layout.addStretch()
         ord_layout.addWidget(QLabel("Ordenar por:"))
         self.cmb_ordenar = QComboBox()
-        self.cmb_ordenar.addItems(
-            [
-                "Similaridade (maior primeiro)",
-                "Similaridade (menor primeiro)",
-                "Nome 1 (A-Z)",
-                "Nome 1 (Z-A)",
-                "Nome 2 (A-Z)",
-                "Nome 2 (Z-A)",
-            ]
-        )
+        self.cmb_ordenar.addItems(ORDENACOES_PARES)
         self.cmb_ordenar.setMinimumWidth(220)
-        self.cmb_ordenar.currentIndexChanged.connect(self._reordenar_e_preencher_tabela)
+        self.cmb_ordenar.currentIndexChanged.connect(self._ordenar_resultados)
         ord_layout.addWidget(self.cmb_ordenar)
         layout.addLayout(ord_layout)
-        self.tabela_resultados = QTableWidget()
-        self.tabela_resultados.setColumnCount(3)
-        self.tabela_resultados.setHorizontalHeaderLabels(["Nome 1", "Nome 2", "Similaridade (%)"])
+        self.modelo_resultados = ModeloResultados(self)
+        self.tabela_resultados = QTableView()
+        self.tabela_resultados.setModel(self.modelo_resultados)
         self.tabela_resultados.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.tabela_resultados.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        # Altura fixa: a view não precisa medir as linhas (nem pedir o texto delas) para rolar
+        self.tabela_resultados.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.tabela_resultados.setMinimumHeight(200)
         layout.addWidget(self.tabela_resultados)
-        self.tabela_resultados.cellClicked.connect(self._copiar_nome_clicado)
+        self.tabela_resultados.clicked.connect(self._copiar_nome_clicado)
 
         # Botão para exportar o grid para planilha
         export_layout = QHBoxLayout()
@@ -233,8 +307,7 @@ class NomesSimilaresWidget(QWidget):
             self.cmb_coluna.addItem(str(col))
         self.cmb_coluna.setEnabled(True)
         self.btn_analisar.setEnabled(True)
-        self._ultimos_resultados = []
-        self.tabela_resultados.setRowCount(0)
+        self.modelo_resultados.definir_tabela(None)
         self.btn_exportar.setEnabled(False)
 
     def analisar_nomes(self):
@@ -246,17 +319,26 @@ class NomesSimilaresWidget(QWidget):
             QMessageBox.warning(self, "Erro", "Coluna inválida.")
             return
         nomes = self.df[col].dropna().astype(str).str.strip()
-        nomes = nomes[nomes != ""].tolist()
-        if len(nomes) < 2:
-            QMessageBox.warning(self, "Aviso", "É necessário ao menos 2 nomes na coluna para comparar.")
+        nomes = nomes[nomes != ""]
+        # Repetidos são comparados uma vez só (ver contar_nomes): bastam os distintos
+        if nomes.nunique() < 2:
+            QMessageBox.warning(self, "Aviso", "É necessário ao menos 2 nomes diferentes na coluna para comparar.")
             return
+        self._resumo_nomes = (len(nomes), nomes.nunique())
+        nomes = nomes.tolist()
         self.btn_analisar.setEnabled(False)
         self.btn_cancelar.setEnabled(True)
         self.progress.setValue(0)
-        self._ultimos_resultados = []
-        self.tabela_resultados.setRowCount(0)
-        self._worker = NomesSimilaresWorker(nomes, self.spin_similaridade.value())
+        self.btn_exportar.setEnabled(False)
+        # Os pares entram na ordem em que são achados; a ordenação escolhida vale no fim
+        self.cmb_ordenar.setEnabled(False)
+        self.lbl_encontrados.setText("Nomes similares encontrados:")
+        self._agrupado = self.chk_agrupar.isChecked()
+        self.modelo_resultados.definir_tabela(None)
+        self._worker = NomesSimilaresWorker(nomes, self.spin_similaridade.value(), self.chk_agrupar.isChecked())
         self._worker.progress.connect(self.progress.setValue)
+        self._worker.iniciada.connect(self.modelo_resultados.definir_tabela)
+        self._worker.pares.connect(self._pares_recebidos)
         self._worker.finished.connect(self._analise_finalizada)
         self._worker.error.connect(self._erro_analise)
         self._worker.start()
@@ -265,53 +347,42 @@ class NomesSimilaresWidget(QWidget):
         if self._worker is not None:
             self._worker.cancel()
 
-    def _ordenacao_chave(self, item):
-        """Retorna chave para ordenação conforme opção selecionada em cmb_ordenar."""
-        nome1, nome2, pct = item
-        idx = self.cmb_ordenar.currentIndex()
-        if idx == 0:
-            return (-pct, nome1, nome2)  # Similaridade maior primeiro
-        if idx == 1:
-            return (pct, nome1, nome2)  # Similaridade menor primeiro
-        if idx == 2:
-            return (nome1.lower(), nome2.lower(), pct)
-        if idx == 3:
-            return (nome1.lower()[::-1], nome2.lower()[::-1], pct)  # Z-A = inverter para sort
-        if idx == 4:
-            return (nome2.lower(), nome1.lower(), pct)
-        # idx == 5: Nome 2 (Z-A)
-        return (nome2.lower()[::-1], nome1.lower()[::-1], pct)
-
-    def _reordenar_e_preencher_tabela(self):
-        """Ordena _ultimos_resultados conforme cmb_ordenar e preenche a tabela."""
-        if not self._ultimos_resultados:
-            return
-        # Ordenar: para Z-A usamos reverse na lista ordenada por A-Z
-        idx = self.cmb_ordenar.currentIndex()
-        if idx == 3:  # Nome 1 (Z-A)
-            ordenados = sorted(
-                self._ultimos_resultados, key=lambda x: (x[0].lower(), x[1].lower(), x[2]), reverse=True
-            )
-        elif idx == 5:  # Nome 2 (Z-A)
-            ordenados = sorted(
-                self._ultimos_resultados, key=lambda x: (x[1].lower(), x[0].lower(), x[2]), reverse=True
-            )
-        else:
-            ordenados = sorted(self._ultimos_resultados, key=self._ordenacao_chave)
-        self.tabela_resultados.setRowCount(len(ordenados))
-        for row, (nome1, nome2, pct) in enumerate(ordenados):
-            self.tabela_resultados.setItem(row, 0, QTableWidgetItem(nome1))
-            self.tabela_resultados.setItem(row, 1, QTableWidgetItem(nome2))
-            self.tabela_resultados.setItem(row, 2, QTableWidgetItem(str(pct)))
-
-    def _analise_finalizada(self, resultados):
+    def _pares_recebidos(self, i, j, scores):
+        self.modelo_resultados.acrescentar(i, j, scores)
+        self.lbl_encontrados.setText(f"Nomes similares encontrados: {len(self.modelo_resultados.tabela)} até agora")
+
+    def _ordenar_resultados(self):
+        """Aplica o critério de cmb_ordenar (os grupos têm ordem própria: os maiores primeiro)."""
+        if not self._agrupado:
+            self.modelo_resultados.ordenar(self.cmb_ordenar.currentIndex())
+
+    def _analise_finalizada(self, payload):
         self.btn_analisar.setEnabled(True)
         self.btn_cancelar.setEnabled(False)
-        self._ultimos_resultados = list(resultados)
-        self._reordenar_e_preencher_tabela()
-        self.btn_exportar.setEnabled(bool(resultados))
-        if resultados:
-            QMessageBox.information(self, "Concluído", f"Foram encontrados {len(resultados)} par(es) de nomes similares.")
+        if self._agrupado:
+            self.modelo_resultados.definir_tabela(payload["grupos"])
+            self.modelo_resultados.ordenar(None)
+        else:
+            self._ordenar_resultados()
+        self.cmb_ordenar.setEnabled(not self._agrupado)
+        tabela = self.modelo_resultados.tabela
+        encontrados = len(tabela) if tabela is not None else 0
+        encontrados = f"{encontrados} grupo(s)" if self._agrupado else f"{encontrados} par(es)"
+        self.lbl_encontrados.setText(f"Nomes similares encontrados: {encontrados}")
+        self.btn_exportar.setEnabled(bool(tabela is not None and len(tabela)))
+        if payload.get("cancelado"):
+            mensagem = "A análise foi cancelada pelo usuário."
+            if tabela is not None and len(tabela):
+                mensagem += f"\n{encontrados} encontrado(s) até ali ficaram na tabela e podem ser exportados."
+            QMessageBox.information(self, "Cancelado", mensagem)
+        elif tabela is not None and len(tabela):
+            total, distintos = self._resumo_nomes
+            QMessageBox.information(
+                self,
+                "Concluído",
+                f"Foram encontrados {encontrados} de nomes similares.\n"
+                f"{total} nome(s) na coluna, {distintos} diferente(s).",
+            )
         else:
             QMessageBox.information(
                 self,
@@ -322,16 +393,18 @@ class NomesSimilaresWidget(QWidget):
     def _erro_analise(self, msg):
         self.btn_analisar.setEnabled(True)
         self.btn_cancelar.setEnabled(False)
+        # Os pares achados antes do erro continuam na tabela e podem ser exportados
+        self._ordenar_resultados()
+        self.cmb_ordenar.setEnabled(not self._agrupado)
+        tabela = self.modelo_resultados.tabela
+        self.btn_exportar.setEnabled(bool(tabela is not None and len(tabela)))
         QMessageBox.critical(self, "Erro", f"Erro ao analisar nomes:\n{msg}")
 
-    def _copiar_nome_clicado(self, row, column):
+    def _copiar_nome_clicado(self, index):
         """Copia o nome clicado (colunas Nome 1 ou Nome 2) para a área de transferência e mostra popup."""
-        if column not in (0, 1):
-            return
-        item = self.tabela_resultados.item(row, column)
-        if not item:
+        if index.column() not in (0, 1):
             return
-        texto = item.text()
+        texto = index.data()
         if not texto:
             return
         QApplication.clipboard().setText(texto)
@@ -339,8 +412,9 @@ class NomesSimilaresWidget(QWidget):
         QToolTip.showText(QCursor.pos(), "Copiado!", self.tabela_resultados)
 
     def exportar_para_excel(self):
-        """Exporta o grid atual de resultados para uma planilha Excel."""
-        if not self._ultimos_resultados:
+        """Exporta os resultados da última análise para uma planilha Excel."""
+        tabela = self.modelo_resultados.tabela
+        if tabela is None or not len(tabela):
             QMessageBox.information(self, "Exportar", "Não há dados para exportar.")
             return
         caminho, _ = QFileDialog.getSaveFileName(self, "Salvar planilha", "", "Excel (*.xlsx)")
@@ -349,7 +423,7 @@ class NomesSimilaresWidget(QWidget):
         if not caminho.lower().endswith(".xlsx"):
             caminho += ".xlsx"
         try:
-            df = pd.DataFrame(self._ultimos_resultados, columns=["Nome 1", "Nome 2", "Similaridade (%)"])
+            df = tabela.para_dataframe()
             df.to_excel(caminho, index=False)
             QMessageBox.information(self, "Sucesso", f"Planilha salva em:\n{caminho}")
         except Exception as e:
@@ -360,8 +434,8 @@ class NomesSimilaresWidget(QWidget):
             self.setStyleSheet(
                 """
                 QWidget {background-color: #2c3e50; color: white;}
-                QTableWidget {background-color: #34495e; color: white;}
-                QTableWidget::item {background-color: #34495e; color: white;}
+                QTableView {background-color: #34495e; color: white;}
+                QTableView::item {background-color: #34495e; color: white;}
                 QHeaderView::section {background-color: #2c3e50; color: white; border: 1px solid #7f8c8d; padding: 4px;}
                 QLineEdit {background-color: #34495e; color: white;}
                 QPushButton {border-radius: 8px; padding: 8px;}
@@ -375,8 +449,8 @@ class NomesSimilaresWidget(QWidget):
             self.setStyleSheet(
                 """
                 QWidget {background-color: #ecf0f1; color: black;}
-                QTableWidget {background-color: #bdc3c7; color: black;}
-                QTableWidget::item {background-color: #bdc3c7; color: black;}
+                QTableView {background-color: #bdc3c7; color: black;}
+                QTableView::item {background-color: #bdc3c7; color: black;}
                 QHeaderView::section {background-color: #95a5a6; color: black; border: 1px solid #7f8c8d; padding: 4px;}
                 QLineEdit {background-color: #bdc3c7; color: black;}
                 QPushButton {border-radius: 8px; padding: 8px;}
@@ -0,0 +1,166 @@
+"""
+Normalização de texto usada na comparação de planilhas.
+
+Um `NormalizadorTexto` por modo de normalização (os mesmos textos do combobox
+"Normalização:"), com expressões regulares pré-compiladas, remoção de acentos
+por tabela de tradução, memo LRU para valores repetidos e um caminho vetorizado
+(`normalize_series`) para normalizar colunas inteiras do pandas.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+
+import pandas as pd
+
+MODO_PADRAO = "Padrão (acentos+maiusc+espaços)"
+MODO_IGNORAR_PONTUACAO = "Ignorar pontuação"
+MODO_REMOVER_STOPWORDS = "Remover stopwords (LTDA, ME, SA)"
+MODO_SEM_NORMALIZACAO = "Sem normalização"
+MODOS_NORMALIZACAO = (MODO_PADRAO, MODO_IGNORAR_PONTUACAO, MODO_REMOVER_STOPWORDS, MODO_SEM_NORMALIZACAO)
+
+STOPWORDS = frozenset({"LTDA", "ME", "S/A", "SA", "EIRELI", "EPP"})
+
+# Tamanho do memo LRU por normalizador
+TAMANHO_CACHE = 200_000
+
+_RE_ESPACOS = re.compile(r"\s+")
+_RE_PONTUACAO_COMUM = re.compile(r"[,;:.!?'\-]")
+# Já sem acentos: procura por "SUCESSAO" (o texto de exibição usa SUCESS[ÃA]O)
+_RE_SUCESSAO = re.compile(r"\(\s*SUCESSAO\s+DE\s*\)", re.IGNORECASE)
+_RE_SUCESSAO_EXIBICAO = re.compile(r"\(\s*SUCESS[ÃA]O\s+DE\s*\)", re.IGNORECASE)
+_RE_STOPWORDS = re.compile(
+    r"(?<!\S)(?:" + "|".join(re.escape(p) for p in sorted(STOPWORDS, key=len, reverse=True)) + r")(?!\S)",
+    re.IGNORECASE,
+)
+
+
+class _TabelaCategorias(dict):
+    """
+    Tabela para `str.translate` que troca caracteres de certas categorias Unicode.
+    Preenchida sob demanda (cada code point é classificado uma única vez).
+    """
+
+    def __init__(self, prefixos, substituto):
+        super().__init__()
+        self._prefixos = prefixos
+        self._substituto = substituto
+
+    def __missing__(self, codigo):
+        valor = self._substituto if unicodedata.category(chr(codigo)).startswith(self._prefixos) else codigo
+        self[codigo] = valor
+        return valor
+
+
+# Marcas combinantes (acentos após NFD) são removidas
+_TABELA_SEM_ACENTOS = _TabelaCategorias(("Mn",), None)
+# Pontuação (P*) e símbolos (S*) viram espaço
+_TABELA_PONTUACAO = _TabelaCategorias(("P", "S"), " ")
+
+
+def remover_sucessao(texto):
+    """Remove ocorrências de '( SUCESSÃO DE )' ou '( SUCESSAO DE )' do texto original (case-insensitive)."""
+    if texto is None:
+        return texto
+    s = _RE_SUCESSAO_EXIBICAO.sub(" ", str(texto))
+    return _RE_ESPACOS.sub(" ", s).strip()
+
+
+def remover_sucessao_series(serie):
+    """Versão vetorizada de `remover_sucessao` para uma coluna de strings."""
+    serie = serie.str.replace(_RE_SUCESSAO_EXIBICAO, " ", regex=True)
+    return serie.str.replace(_RE_ESPACOS, " ", regex=True).str.strip()
+
+
+class NormalizadorTexto:
+    """Normaliza textos conforme um modo de normalização (ver MODOS_NORMALIZACAO)."""
+
+    def __init__(self, modo=MODO_PADRAO, tamanho_cache=TAMANHO_CACHE):
+        self.modo = modo
+        self._normalizar_cache = lru_cache(maxsize=tamanho_cache)(self._normalizar_str)
+
+    def normalizar(self, texto):
+        """
+        Normaliza texto removendo acentos, espaços extras e convertendo para maiúsculas,
+        com variações baseadas no modo.
+        """
+        if isinstance(texto, str):
+            return self._normalizar_cache(texto)
+        if texto is None or pd.isna(texto):
+            return ""
+        return self._normalizar_cache(str(texto))
+
+    __call__ = normalizar
+
+    def _normalizar_str(self, texto):
+        texto = _RE_ESPACOS.sub(" ", texto.strip())
+        if self.modo == MODO_SEM_NORMALIZACAO:
+            return texto
+
+        texto_base = texto
+        if not texto.isascii():
+            texto_base = unicodedata.normalize("NFD", texto).translate(_TABELA_SEM_ACENTOS)
+        if self.modo == MODO_IGNORAR_PONTUACAO:
+            texto_base = texto_base.translate(_TABELA_PONTUACAO)
+        else:
+            # Remove apenas alguns sinais comuns
+            texto_base = _RE_PONTUACAO_COMUM.sub(" ", texto_base)
+
+        if self.modo == MODO_REMOVER_STOPWORDS:
+            texto_base = " ".join(p for p in texto_base.split() if p.upper() not in STOPWORDS)
+
+        texto_base = _RE_SUCESSAO.sub(" ", texto_base)
+        return _RE_ESPACOS.sub(" ", texto_base).strip().upper()
+
+    def normalize_series(self, serie):
+        """
+        Normaliza uma coluna inteira com operações vetorizadas do pandas (NaN/None viram "").
+        Os valores são fatorados antes, então cada texto distinto é processado uma única vez.
+        """
+        texto = serie.map(str).where(~serie.isna(), "")
+        codigos, unicos = pd.factorize(texto)
+        unicos = self._normalizar_unicos(pd.Series(unicos, dtype=object))
+        return pd.Series(unicos.to_numpy(dtype=object)[codigos], index=serie.index, dtype=object)
+
+    def _normalizar_unicos(self, serie):
+        serie = serie.str.strip().str.replace(_RE_ESPACOS, " ", regex=True)
+        if self.modo == MODO_SEM_NORMALIZACAO:
+            return serie
+
+        serie = serie.str.normalize("NFD").str.translate(_TABELA_SEM_ACENTOS)
+        if self.modo == MODO_IGNORAR_PONTUACAO:
+            serie = serie.str.translate(_TABELA_PONTUACAO)
+        else:
+            serie = serie.str.replace(_RE_PONTUACAO_COMUM, " ", regex=True)
+
+        if self.modo == MODO_REMOVER_STOPWORDS:
+            serie = serie.str.replace(_RE_STOPWORDS, " ", regex=True)
+
+        serie = serie.str.replace(_RE_SUCESSAO, " ", regex=True)
+        return serie.str.replace(_RE_ESPACOS, " ", regex=True).str.strip().str.upper()
+
+    def limpar_cache(self):
+        self._normalizar_cache.cache_clear()
+
+
+_NORMALIZADORES = {}
+
+
+def obter_normalizador(modo=MODO_PADRAO):
+    """Retorna a instância compartilhada do normalizador para o modo informado."""
+    normalizador = _NORMALIZADORES.get(modo)
+    if normalizador is None:
+        normalizador = _NORMALIZADORES[modo] = NormalizadorTexto(modo)
+    return normalizador
+
+
+def compor_series(df, colunas):
+    """Junta as colunas selecionadas com " | " (mesmo texto de `" | ".join(str(row[col]) ...)`)."""
+    partes = [df[col].map(str) if col in df.columns else pd.Series("", index=df.index) for col in colunas]
+    if not partes:
+        return pd.Series("", index=df.index)
+    if len(partes) == 1:
+        return partes[0]
+    return partes[0].str.cat(partes[1:], sep=" | ")
@@ -0,0 +1,230 @@
+"""
+Pontuação fuzzy em lote com as APIs matriciais do rapidfuzz.
+
+Em vez de um laço Python chamando o scorer par a par, um bloco de valores da
+planilha 2 é pontuado de uma vez contra a planilha 1 com `process.cdist`, que
+roda em C++ e distribui o trabalho entre os núcleos (`workers`).
+"""
+
+from __future__ import annotations
+
+import heapq
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Limite de células (consultas x escolhas) por chamada ao cdist: ~32 MB em float64
+MAX_CELULAS = 4_000_000
+
+# Linhas da planilha 2 pontuadas por bloco
+TAMANHO_BLOCO = 256
+
+# -1 = usar todos os núcleos disponíveis
+WORKERS_PADRAO = -1
+
+# Folga no score_cutoff repassado ao rapidfuzz: o filtro final é feito aqui com `>=`,
+# exatamente como na comparação par a par, então nenhum par no limite é perdido.
+_FOLGA_CUTOFF = 1e-6
+
+
+class PontuadorLote:
+    """Pontua blocos de consultas contra uma lista fixa de escolhas (planilha 1)."""
+
+    def __init__(self, escolhas, scorer=fuzz.token_sort_ratio, workers=WORKERS_PADRAO, max_celulas=MAX_CELULAS):
+        self.escolhas = list(escolhas)
+        self.scorer = scorer
+        self.workers = workers
+        self.max_celulas = max_celulas
+
+    def pontuar(self, consultas, score_cutoff, candidatos=None, limite=None, cancelado=None):
+        """
+        Retorna, para cada consulta, a lista [(índice_escolha, score), ...] com score >= score_cutoff,
+        em ordem crescente de índice (a mesma ordem da varredura par a par).
+
+        `candidatos` (opcional): um array de índices por consulta, vindo do IndiceCandidatos.
+        O bloco é pontuado contra a união dos candidatos; como o índice nunca descarta um par
+        acima do limite, o resultado é idêntico ao de pontuar contra todas as escolhas.
+
+        `limite` (opcional): mantém só os K melhores por consulta (ver `_pontuar_top_k`),
+        ordenados do maior score para o menor.
+
+        `cancelado` (opcional): consultado antes de cada matriz do cdist; ao retornar True a
+        pontuação para ali e o resultado fica incompleto (quem cancelou o descarta).
+        """
+        resultados = [[] for _ in consultas]
+        if not consultas or not self.escolhas:
+            return resultados
+        if limite:
+            return self._pontuar_top_k(consultas, score_cutoff, candidatos, limite, cancelado)
+
+        for indices, matriz in self._matrizes(consultas, candidatos, lambda: score_cutoff, cancelado):
+            linhas, cols = np.nonzero(matriz >= score_cutoff)
+            for linha, idx, score in zip(linhas.tolist(), indices[cols].tolist(), matriz[linhas, cols].tolist()):
+                resultados[linha].append((idx, score))
+        return resultados
+
+    def _pontuar_top_k(self, consultas, score_cutoff, candidatos, limite, cancelado=None):
+        """
+        Top-K por consulta com um heap mínimo limitado a K itens: nenhuma consulta guarda
+        mais de K candidatos em momento algum. Quando todos os heaps estão cheios, o pior
+        score entre eles vira o score_cutoff das próximas matrizes (corte antecipado).
+        """
+        heaps = [[] for _ in consultas]  # itens (score, -índice): empate favorece a linha anterior
+
+        def cutoff_atual():
+            if all(len(h) == limite for h in heaps):
+                return max(score_cutoff, min(h[0][0] for h in heaps))
+            return score_cutoff
+
+        for indices, matriz in self._matrizes(consultas, candidatos, cutoff_atual, cancelado):
+            linhas, cols = np.nonzero(matriz >= score_cutoff)
+            for linha, col in zip(linhas.tolist(), cols.tolist()):
+                item = (float(matriz[linha, col]), -int(indices[col]))
+                heap = heaps[linha]
+                if len(heap) < limite:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        return [[(-neg_idx, score) for score, neg_idx in sorted(heap, reverse=True)] for heap in heaps]
+
+    def _matrizes(self, consultas, candidatos, cutoff, cancelado=None):
+        """
+        Gera (índices das escolhas, matriz de scores) por fatia de colunas, limitando a memória
+        a `max_celulas`. `cutoff` é consultado antes de cada fatia (permite subir o corte);
+        `cancelado`, se informado, também (e interrompe a geração).
+        """
+        if candidatos is None:
+            colunas = None
+            total_colunas = len(self.escolhas)
+        else:
+            # União por máscara (sem ordenar os candidatos de todas as consultas juntos)
+            marcadas = np.zeros(len(self.escolhas), dtype=bool)
+            for indices in candidatos:
+                marcadas[indices] = True
+            colunas = np.flatnonzero(marcadas)
+            total_colunas = len(colunas)
+
+        passo = max(1, self.max_celulas // len(consultas))
+        for inicio in range(0, total_colunas, passo):
+            if cancelado is not None and cancelado():
+                return
+            fim = min(inicio + passo, total_colunas)
+            if colunas is None:
+                indices = np.arange(inicio, fim)
+                escolhas = self.escolhas[inicio:fim]
+            else:
+                indices = colunas[inicio:fim]
+                escolhas = [self.escolhas[i] for i in indices]
+            matriz = process.cdist(
+                consultas,
+                escolhas,
+                scorer=self.scorer,
+                score_cutoff=max(0.0, cutoff() - _FOLGA_CUTOFF),
+                dtype=np.float64,
+                workers=self.workers,
+            )
+            yield indices, matriz
+
+
+def formatar_similares(acertos, compostos_norm):
+    """Texto da coluna de similares: "NOME (92,5%), OUTRO (90,0%)"."""
+    partes = []
+    for idx, score in acertos:
+        score_formatado = f"{score:.1f}".replace(".", ",")
+        partes.append(f"{compostos_norm[idx]} ({score_formatado}%)")
+    return ", ".join(partes)
+
+
+class ComparadorBloco:
+    """
+    Parâmetros de `comparar_bloco` de uma comparação. Vai inteiro (uma vez) para cada
+    processo do pool; `comparar` é a única coisa chamada por bloco.
+
+    `cancelado` (callable ou None) é repassado ao pontuador: um bloco grande para no meio
+    do cdist em vez de terminar antes de o cancelamento ser atendido.
+    """
+
+    def __init__(self, indice_exato, indice, pontuador, similaridade_min, limite=None, formatar=True, fonetica=None):
+        self.indice_exato = indice_exato
+        self.indice = indice
+        self.pontuador = pontuador
+        self.similaridade_min = similaridade_min
+        self.limite = limite
+        self.formatar = formatar
+        self.fonetica = fonetica
+        self.cancelado = None
+
+    def usar_um_nucleo(self):
+        """Nos processos do pool o paralelismo já vem do próprio pool."""
+        self.pontuador.workers = 1
+
+    def limitar_celulas(self, max_celulas):
+        """Matrizes menores: o cancelamento é consultado entre elas (ver `execucao_paralela`)."""
+        self.pontuador.max_celulas = min(self.pontuador.max_celulas, max_celulas)
+
+    def comparar(self, valores_normalizados, casados_cpf):
+        return comparar_bloco(
+            valores_normalizados,
+            casados_cpf,
+            self.indice_exato,
+            self.indice,
+            self.pontuador,
+            self.similaridade_min,
+            self.limite,
+            self.formatar,
+            self.fonetica,
+            self.cancelado,
+        )
+
+
+def comparar_bloco(
+    valores_normalizados,
+    casados_cpf,
+    indice_exato,
+    indice,
+    pontuador,
+    similaridade_min,
+    limite=None,
+    formatar=True,
+    fonetica=None,
+    cancelado=None,
+):
+    """
+    Compara um bloco de valores (já normalizados) da planilha 2 com a planilha 1.
+
+    Linhas casadas por CPF ou com match exato (hash) não passam pela pontuação fuzzy;
+    as demais são pontuadas juntas numa única chamada ao `pontuador` (com `limite`,
+    só os K melhores similares de cada linha).
+    Retorna [[valor_exibicao, encontrado_exato, similares], ...] na ordem de entrada.
+    Com `formatar=False`, `similares` é a lista [(índice, score), ...] em vez do texto.
+    Com `fonetica` (`IndiceFonetico`), as linhas com o mesmo código fonético da consulta
+    também entram nos candidatos; a pontuação continua sendo a do texto.
+    Com `cancelado` retornando True no meio da pontuação, os similares ficam incompletos:
+    o bloco deve ser descartado.
+    """
+    vazio = "" if formatar else []
+    registros = []
+    pendentes = []  # posições em `registros` que vão para a pontuação fuzzy
+    for valor_normalizado, casou_cpf in zip(valores_normalizados, casados_cpf):
+        if casou_cpf:
+            registros.append([valor_normalizado, True, vazio])
+            continue
+        encontrado_exato = valor_normalizado in indice_exato
+        registros.append([valor_normalizado, encontrado_exato, vazio])
+        if not encontrado_exato:
+            pendentes.append(len(registros) - 1)
+
+    if pendentes:
+        consultas = [registros[k][0] for k in pendentes]
+        candidatos = []
+        for consulta in consultas:
+            # Com compostos longos, os candidatos de um bloco inteiro podem levar segundos
+            if cancelado is not None and cancelado():
+                return registros
+            candidatos.append(indice.candidatos(consulta, similaridade_min))
+            if fonetica is not None:
+                candidatos[-1] = np.union1d(candidatos[-1], fonetica.candidatos(consulta))
+        acertos_por_consulta = pontuador.pontuar(consultas, similaridade_min, candidatos, limite, cancelado)
+        for k, acertos in zip(pendentes, acertos_por_consulta):
+            registros[k][2] = formatar_similares(acertos, pontuador.escolhas) if formatar else acertos
+    return registros
@@ -0,0 +1,76 @@
+"""
+Progresso com frequência limitada, velocidade (linhas/s) e tempo restante estimado.
+
+A comparação avisa o progresso a cada lote. Repassar cada aviso como sinal Qt
+enche a fila de eventos da interface com milhares de atualizações que ninguém
+chega a ver. O `MedidorProgresso` só repassa um aviso quando o percentual mudou e
+já passou um intervalo mínimo desde o último envio, ou quando passou o intervalo
+máximo (para a velocidade e o tempo restante continuarem atualizando).
+"""
+
+from __future__ import annotations
+
+import time
+
+# Segundos entre dois envios: no mínimo (mesmo com o percentual mudando) e no máximo
+INTERVALO_MINIMO = 0.1
+INTERVALO_MAXIMO = 1.0
+
+
+class MedidorProgresso:
+    """
+    Chamado como `medidor(concluidas, total)`; repassa `emitir(percentual, linhas_por_segundo,
+    segundos_restantes)` respeitando os intervalos. O aviso final (concluidas == total) sempre passa.
+
+    `inicio`: linhas restauradas de um checkpoint. Elas contam no percentual, mas não na
+    velocidade: o relógio começa quando elas terminam de ser regravadas, e a velocidade e o
+    tempo restante só consideram as linhas comparadas a partir daí.
+    """
+
+    def __init__(self, emitir, intervalo_minimo=INTERVALO_MINIMO, intervalo_maximo=INTERVALO_MAXIMO, inicio=0):
+        self.emitir = emitir
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_maximo = intervalo_maximo
+        self.linhas_inicio = inicio
+        self._inicio = time.monotonic() if not inicio else None
+        self._ultimo_envio = None
+        self._ultimo_percentual = None
+
+    def __call__(self, concluidas, total):
+        agora = time.monotonic()
+        if self._inicio is None and concluidas >= self.linhas_inicio:
+            self._inicio = agora
+        percentual = int(concluidas / total * 100) if total else 100
+        if self._ultimo_envio is not None and concluidas < total:
+            decorrido = agora - self._ultimo_envio
+            if decorrido < self.intervalo_minimo:
+                return
+            if percentual == self._ultimo_percentual and decorrido < self.intervalo_maximo:
+                return
+        self._ultimo_envio = agora
+        self._ultimo_percentual = percentual
+
+        tempo = agora - self._inicio if self._inicio is not None else 0.0
+        linhas_por_segundo = (concluidas - self.linhas_inicio) / tempo if tempo > 0 else 0.0
+        restante = (total - concluidas) / linhas_por_segundo if linhas_por_segundo > 0 else None
+        self.emitir(percentual, linhas_por_segundo, restante)
+
+
+def formatar_duracao(segundos):
+    """"45 s", "3 min 05 s", "1 h 02 min"."""
+    segundos = int(round(segundos))
+    if segundos < 60:
+        return f"{segundos} s"
+    minutos, segundos = divmod(segundos, 60)
+    if minutos < 60:
+        return f"{minutos} min {segundos:02d} s"
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas} h {minutos:02d} min"
+
+
+def texto_velocidade(linhas_por_segundo, segundos_restantes):
+    """Texto ao lado da barra de progresso: "12.345 linhas/s · faltam ~3 min 05 s"."""
+    texto = f"{linhas_por_segundo:,.0f} linhas/s".replace(",", ".")
+    if segundos_restantes is not None and segundos_restantes >= 1:
+        texto += f" · faltam ~{formatar_duracao(segundos_restantes)}"
+    return texto
@@ -0,0 +1,170 @@
+"""
+Gravação em streaming do resultado da comparação.
+
+O worker grava as linhas à medida que são calculadas, com memória constante:
+xlsx pelo xlsxwriter em modo `constant_memory`, CSV linha a linha ou Parquet
+em row groups. Nem o worker nem a UI guardam o resultado completo.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+from abc import ABC, abstractmethod
+
+try:
+    import xlsxwriter  # type: ignore
+except Exception:
+    xlsxwriter = None
+
+FORMATOS_SAIDA = {
+    ".xlsx": "Excel (*.xlsx)",
+    ".csv": "CSV (*.csv)",
+    ".parquet": "Parquet (*.parquet)",
+}
+
+# Limites do Excel: linhas por aba (incluindo o cabeçalho) e caracteres por célula
+LIMITE_LINHAS_XLSX = 1_048_576
+LIMITE_CELULA_XLSX = 32_767
+
+# Linhas acumuladas por row group no Parquet
+LINHAS_POR_GRUPO_PARQUET = 50_000
+
+
+def extensao_saida(caminho):
+    """Extensão suportada do caminho (".xlsx" quando não reconhecida)."""
+    extensao = os.path.splitext(caminho)[1].lower()
+    return extensao if extensao in FORMATOS_SAIDA else ".xlsx"
+
+
+class EscritorResultados(ABC):
+    """Base dos escritores: `escrever(linhas)` recebe tuplas na ordem de `colunas`."""
+
+    def __init__(self, caminho, colunas):
+        self.caminho = caminho
+        self.colunas = list(colunas)
+        self.linhas_escritas = 0
+
+    @abstractmethod
+    def escrever(self, linhas):
+        """Acrescenta as `linhas` ao arquivo."""
+
+    @abstractmethod
+    def fechar(self):
+        """Grava o que falta e fecha o arquivo."""
+
+    def descartar(self):
+        """Fecha e remove o arquivo parcial (ex.: comparação cancelada)."""
+        try:
+            self.fechar()
+        finally:
+            if os.path.exists(self.caminho):
+                os.remove(self.caminho)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        self.fechar()
+        return False
+
+
+class EscritorXlsx(EscritorResultados):
+    def __init__(self, caminho, colunas):
+        if xlsxwriter is None:
+            raise RuntimeError("Dependência 'xlsxwriter' não instalada. Execute: pip install xlsxwriter")
+        super().__init__(caminho, colunas)
+        # O xlsxwriter só abre o arquivo no close(): testa antes se ele está bloqueado (ex.: aberto no Excel)
+        with open(caminho, "ab"):
+            pass
+        self._workbook = xlsxwriter.Workbook(caminho, {"constant_memory": True, "strings_to_numbers": False})
+        self._formato_cabecalho = self._workbook.add_format({"bold": True})
+        self._aba = None
+        self._linha_aba = 0
+        self._nova_aba()
+
+    def _nova_aba(self):
+        # Ao passar do limite de linhas do Excel, continua numa nova aba
+        numero = len(self._workbook.worksheets()) + 1
+        self._aba = self._workbook.add_worksheet("Resultado" if numero == 1 else f"Resultado {numero}")
+        for col, nome in enumerate(self.colunas):
+            self._aba.write_string(0, col, nome, self._formato_cabecalho)
+        self._linha_aba = 1
+
+    def escrever(self, linhas):
+        for linha in linhas:
+            if self._linha_aba >= LIMITE_LINHAS_XLSX:
+                self._nova_aba()
+            for col, valor in enumerate(linha):
+                texto = "" if valor is None else str(valor)
+                if len(texto) > LIMITE_CELULA_XLSX:
+                    texto = texto[: LIMITE_CELULA_XLSX - 3] + "..."
+                self._aba.write_string(self._linha_aba, col, texto)
+            self._linha_aba += 1
+            self.linhas_escritas += 1
+
+    def fechar(self):
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+
+class EscritorCsv(EscritorResultados):
+    def __init__(self, caminho, colunas):
+        super().__init__(caminho, colunas)
+        # utf-8-sig + ";" para o Excel em português abrir o arquivo direto
+        self._arquivo = open(caminho, "w", encoding="utf-8-sig", newline="")
+        self._csv = csv.writer(self._arquivo, delimiter=";")
+        self._csv.writerow(self.colunas)
+
+    def escrever(self, linhas):
+        self._csv.writerows(linhas)
+        self.linhas_escritas += len(linhas)
+
+    def fechar(self):
+        if not self._arquivo.closed:
+            self._arquivo.close()
+
+
+class EscritorParquet(EscritorResultados):
+    def __init__(self, caminho, colunas):
+        try:
+            import pyarrow as pa  # type: ignore
+            import pyarrow.parquet as pq  # type: ignore
+        except Exception:
+            raise RuntimeError("Dependência 'pyarrow' não instalada. Execute: pip install pyarrow")
+        super().__init__(caminho, colunas)
+        self._pa = pa
+        self._schema = pa.schema([(nome, pa.string()) for nome in self.colunas])
+        self._writer = pq.ParquetWriter(caminho, self._schema)
+        self._buffer = []
+
+    def escrever(self, linhas):
+        self._buffer.extend(linhas)
+        self.linhas_escritas += len(linhas)
+        if len(self._buffer) >= LINHAS_POR_GRUPO_PARQUET:
+            self._descarregar()
+
+    def _descarregar(self):
+        if not self._buffer:
+            return
+        colunas = list(zip(*self._buffer))
+        tabela = self._pa.Table.from_arrays(
+            [self._pa.array(valores, type=self._pa.string()) for valores in colunas], schema=self._schema
+        )
+        self._writer.write_table(tabela)
+        self._buffer = []
+
+    def fechar(self):
+        if self._writer is not None:
+            self._descarregar()
+            self._writer.close()
+            self._writer = None
+
+
+_ESCRITORES = {".xlsx": EscritorXlsx, ".csv": EscritorCsv, ".parquet": EscritorParquet}
+
+
+def abrir_escritor(caminho, colunas):
+    """Escritor adequado à extensão do caminho (.xlsx, .csv ou .parquet)."""
+    return _ESCRITORES[extensao_saida(caminho)](caminho, colunas)
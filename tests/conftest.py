@@ -0,0 +1,19 @@
+"""Fixtures com o corpus sintético de nomes (com repetições e erros de digitação) de `tests.util`."""
+
+from __future__ import annotations
+
+import pytest
+
+from tests.util import gerar_nomes
+
+
+@pytest.fixture(scope="session")
+def base():
+    """Planilha 1: 300 nomes (alguns repetidos, para haver empates de score)."""
+    return gerar_nomes(300, semente=1)
+
+
+@pytest.fixture(scope="session")
+def consultas():
+    """Planilha 2: 40 nomes do mesmo universo, mais casos de borda."""
+    return gerar_nomes(40, semente=2) + ["", "A", "JOAO", "SILVA JOAO"]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import pickle
+
+import pandas as pd
+import pytest
+
+from planilhas.armazem_scores import ArmazemScores
+from planilhas.motor_comparacao import ConfigComparacao, MotorComparacao, preparar_planilha1, reexportar
+from tests.util import gerar_nomes
+
+PISO = 60
+# (similaridade, limite) reaplicados sobre o armazém montado a partir do piso
+FILTROS = [(60, None), (75, None), (85, 3), (90, 1), (100, None)]
+
+
+def configuracao(similaridade_min, limite=None, piso=None):
+    return ConfigComparacao(
+        ["Nome"], ["Nome"], similaridade_min=similaridade_min, limite_similares=limite, piso_scores=piso
+    )
+
+
+def registros(lotes):
+    return [registro for lote, _ in lotes for registro in lote]
+
+
+@pytest.fixture(scope="module")
+def planilhas(base):
+    # 600 linhas (mais de um bloco do comparador), com repetições
+    return pd.DataFrame({"Nome": base}), pd.DataFrame({"Nome": gerar_nomes(600, semente=3)})
+
+
+@pytest.fixture(scope="module")
+def armazem(planilhas, tmp_path_factory):
+    df1, df2 = planilhas
+    config = configuracao(PISO, piso=PISO)
+    caminho = tmp_path_factory.mktemp("armazem") / "resultado.csv"
+    resultado = MotorComparacao(preparar_planilha1(df1, config), config).comparar(df2, str(caminho))
+    assert resultado.armazem is not None and len(resultado.armazem) == len(df2)
+    return resultado.armazem
+
+
+def recomparar(planilhas, similaridade_min, limite):
+    df1, df2 = planilhas
+    config = configuracao(similaridade_min, limite)
+    return registros(MotorComparacao(preparar_planilha1(df1, config), config).lotes(df2))
+
+
+@pytest.mark.parametrize("similaridade_min, limite", FILTROS)
+def test_refiltrar_igual_a_recomparar(planilhas, armazem, similaridade_min, limite):
+    assert registros(armazem.lotes(similaridade_min, limite)) == recomparar(planilhas, similaridade_min, limite)
+
+
+def test_salvar_e_carregar_preservam_o_resultado(armazem, tmp_path):
+    caminho = tmp_path / "scores.pkl"
+    armazem.salvar(str(caminho))
+    carregado = ArmazemScores.carregar(str(caminho))
+    assert (carregado.piso, carregado.pares, len(carregado)) == (armazem.piso, armazem.pares, len(armazem))
+    assert carregado.config == armazem.config
+    for similaridade_min, limite in FILTROS:
+        esperado = registros(armazem.lotes(similaridade_min, limite))
+        assert registros(carregado.lotes(similaridade_min, limite)) == esperado
+
+
+def test_reexportar_grava_o_mesmo_arquivo_que_comparar(planilhas, armazem, tmp_path):
+    df1, df2 = planilhas
+    config = configuracao(85, 3)
+    MotorComparacao(preparar_planilha1(df1, config), config).comparar(df2, str(tmp_path / "comparado.csv"))
+    reexportar(armazem, config, str(tmp_path / "reexportado.csv"))
+    assert (tmp_path / "reexportado.csv").read_bytes() == (tmp_path / "comparado.csv").read_bytes()
+
+
+def test_comparar_com_piso_nao_muda_a_saida(planilhas, tmp_path):
+    df1, df2 = planilhas
+    for nome, piso in [("sem_piso.csv", None), ("com_piso.csv", PISO)]:
+        config = configuracao(85, 3, piso)
+        MotorComparacao(preparar_planilha1(df1, config), config).comparar(df2, str(tmp_path / nome))
+    assert (tmp_path / "com_piso.csv").read_bytes() == (tmp_path / "sem_piso.csv").read_bytes()
+
+
+def test_similaridade_abaixo_do_piso(armazem):
+    with pytest.raises(ValueError):
+        armazem.acertos(0, PISO - 1)
+    with pytest.raises(ValueError):
+        next(armazem.lotes(PISO - 1))
+
+
+def test_arquivo_incompativel(tmp_path):
+    caminho = tmp_path / "outro.pkl"
+    caminho.write_bytes(pickle.dumps((0, None)))
+    with pytest.raises(ValueError):
+        ArmazemScores.carregar(str(caminho))
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+import pytest
+
+from planilhas.checkpoint import Checkpoint, assinatura_comparacao
+from planilhas.motor_comparacao import ConfigComparacao, MotorComparacao, preparar_planilha1
+from planilhas.multichave import TIPO_EXATO, ChaveColuna
+from tests.util import gerar_nomes
+
+CONFIGS = [
+    dict(colunas=["Nome"]),
+    dict(colunas=["Nome"], piso_scores=70),
+    dict(colunas=["Nome"], fonetica=True),
+    dict(colunas=["Nome", "UF"], chaves=[ChaveColuna("Nome", "Nome"), ChaveColuna("UF", "UF", TIPO_EXATO)]),
+]
+
+
+def planilha(quantidade, semente):
+    nomes = gerar_nomes(quantidade, semente)
+    return pd.DataFrame({"Nome": nomes, "UF": ["SP" if len(nome) % 2 else "RJ" for nome in nomes]})
+
+
+@pytest.fixture(scope="module")
+def planilhas():
+    # 1000 linhas: alguns blocos do comparador antes e depois do ponto de cancelamento
+    return planilha(300, 1), planilha(1000, 4)
+
+
+def configuracao(colunas, **opcoes):
+    return ConfigComparacao(colunas, colunas, similaridade_min=85, limite_similares=3, **opcoes)
+
+
+@pytest.mark.parametrize("opcoes", CONFIGS)
+def test_retomar_depois_de_cancelar_da_a_mesma_saida(planilhas, tmp_path, opcoes):
+    df1, df2 = planilhas
+    config = configuracao(**opcoes)
+    preparo = preparar_planilha1(df1, config)
+    referencia = MotorComparacao(preparo, config).comparar(df2, str(tmp_path / "referencia.csv"))
+
+    pasta = str(tmp_path / "checkpoint")
+    lotes = []
+    cancelada = MotorComparacao(preparo, config).comparar(
+        df2,
+        str(tmp_path / "saida.csv"),
+        cancelado=lambda: len(lotes) >= 2,
+        progresso=lambda concluidas, total: lotes.append(concluidas),
+        checkpoint=Checkpoint(pasta, intervalo=0),
+    )
+    assert cancelada.cancelado and not os.path.exists(tmp_path / "saida.csv")
+
+    checkpoint = Checkpoint(pasta)
+    linhas_salvas = checkpoint.linhas
+    assert 0 < linhas_salvas < len(df2)
+    resultado = MotorComparacao(preparo, config).comparar(df2, str(tmp_path / "saida.csv"), checkpoint=checkpoint)
+    assert not resultado.cancelado
+    assert resultado.retomado_de == linhas_salvas
+    assert (tmp_path / "saida.csv").read_bytes() == (tmp_path / "referencia.csv").read_bytes()
+    assert (resultado.linhas, resultado.encontrados, resultado.com_similares) == (
+        referencia.linhas,
+        referencia.encontrados,
+        referencia.com_similares,
+    )
+    assert resultado.armazem is None
+    # Terminou: o checkpoint é apagado
+    assert not os.path.exists(pasta)
+
+
+def test_parte_faltando_descarta_o_checkpoint(tmp_path):
+    pasta = str(tmp_path / "checkpoint")
+    checkpoint = Checkpoint(pasta)
+    checkpoint.salvar([["A", False, ""]], 1)
+    checkpoint.salvar([["B", True, ""]], 2)
+    assert list(Checkpoint(pasta).partes()) == [([["A", False, ""]], 1), ([["B", True, ""]], 2)]
+
+    os.remove(os.path.join(pasta, "parte_00002.pkl"))
+    retomado = Checkpoint(pasta)
+    assert retomado.linhas == 0 and list(retomado.partes()) == []
+    assert not os.path.exists(pasta)
+
+
+def test_assinatura_muda_com_o_que_afeta_o_resultado():
+    config = configuracao(["Nome"])
+    assinatura = assinatura_comparacao("h1", "h2", config)
+    assert assinatura == assinatura_comparacao("h1", "h2", configuracao(["Nome"]))
+    assert assinatura != assinatura_comparacao("h1", "outro", config)
+    assert assinatura != assinatura_comparacao("h1", "h2", configuracao(["Nome"], fonetica=True))
+    # Processos não mudam o resultado: a mesma comparação com outro pool retoma o mesmo checkpoint
+    assert assinatura == assinatura_comparacao("h1", "h2", configuracao(["Nome"], processos=4))
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import pytest
+
+from planilhas.fonetica import IndiceFonetico, codigo_fonetico
+from planilhas.indice_candidatos import IndiceCandidatos
+from planilhas.pontuacao import PontuadorLote, comparar_bloco
+from tests.util import acertos_forca_bruta
+
+
+@pytest.mark.parametrize(
+    "grafia1, grafia2",
+    [("LUIZ SOUZA", "Luís Sousa"), ("THIAGO", "TIAGO"), ("RAPHAEL", "RAFAEL"), ("GILLES", "GILES")],
+)
+def test_grafias_do_mesmo_som_tem_o_mesmo_codigo(grafia1, grafia2):
+    assert codigo_fonetico(grafia1) == codigo_fonetico(grafia2) != ""
+
+
+def test_codigo_vazio_sem_letras():
+    assert codigo_fonetico("") == codigo_fonetico("- / -") == ""
+
+
+def test_candidatos_com_o_mesmo_codigo(base):
+    indice = IndiceFonetico(base + ["LUIZ SOUZA", "- / -"])
+    assert indice.candidatos("Luís Sousa").tolist() == [
+        linha for linha, codigo in enumerate(indice.codigos) if codigo == "LUIS SOUSA"
+    ]
+    assert indice.candidatos("- / -").tolist() == indice.candidatos("XYZW").tolist() == []
+
+
+@pytest.mark.parametrize("similaridade_min", [0, 70, 90, 100])
+@pytest.mark.parametrize("limite", [None, 1, 3])
+def test_comparar_bloco_fonetico_pontua_so_o_texto(base, consultas, similaridade_min, limite):
+    # Os códigos só acrescentam candidatos: scores e limite continuam sendo os do texto
+    consultas = consultas + ["LUIS SOUSA", "TIAGO LIMA"]
+    registros = comparar_bloco(
+        consultas,
+        [False] * len(consultas),
+        {},
+        IndiceCandidatos(base),
+        PontuadorLote(base, workers=1, max_celulas=500),
+        similaridade_min,
+        limite,
+        formatar=False,
+        fonetica=IndiceFonetico(base),
+    )
+    for consulta, (_, _, acertos) in zip(consultas, registros):
+        assert acertos == acertos_forca_bruta(base, consulta, similaridade_min, limite), consulta
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from rapidfuzz import fuzz
+
+from planilhas.indice_candidatos import IndiceCandidatos, construir_indice_exato, janela_tamanhos
+from tests.util import varredura_completa
+
+LIMITES = [0, 50, 70, 85, 90, 100, 101]
+
+
+@pytest.mark.parametrize("similaridade_min", LIMITES)
+def test_candidatos_contem_todos_os_pares_acima_do_limite(base, consultas, similaridade_min):
+    indice = IndiceCandidatos(base)
+    for consulta in consultas:
+        candidatos = indice.candidatos(consulta, similaridade_min)
+        assert set(varredura_completa(base, consulta, similaridade_min)) <= set(candidatos.tolist())
+        assert np.all(np.diff(candidatos) > 0)  # ordenados e sem repetição
+
+
+@pytest.mark.parametrize("similaridade_min", LIMITES)
+def test_candidatos_sem_ordenar_tokens_para_ratio(base, consultas, similaridade_min):
+    indice = IndiceCandidatos(base, ordenar_tokens=False)
+    for consulta in consultas:
+        candidatos = set(indice.candidatos(consulta, similaridade_min).tolist())
+        assert set(varredura_completa(base, consulta, similaridade_min, fuzz.ratio)) <= candidatos
+
+
+def test_candidatos_filtram_a_base():
+    base = ["MARIA SILVA", "JOSE SANTOS", "MARIA SILVA SANTOS", "X"]
+    indice = IndiceCandidatos(base)
+    assert indice.candidatos("MARIA SILVA", 90).tolist() == [0]
+    assert indice.candidatos("MARIA SILVA", 0).tolist() == [0, 1, 2, 3]
+    assert indice.candidatos("MARIA SILVA", 101).tolist() == []
+
+
+def test_indice_vazio():
+    assert IndiceCandidatos([]).candidatos("MARIA", 50).tolist() == []
+
+
+def test_janela_tamanhos_limita_o_ratio(base):
+    for a in base[:60]:
+        for b in base[:60]:
+            minimo, maximo = janela_tamanhos(len(a), 80)
+            if fuzz.ratio(a, b) >= 80:
+                assert minimo <= len(b) <= maximo
+
+
+def test_indice_exato():
+    assert construir_indice_exato(["A", "B", "A"]) == {"A": [0, 2], "B": [1]}
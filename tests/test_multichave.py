@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import random
+
+import pandas as pd
+import pytest
+from rapidfuzz import fuzz
+
+from planilhas.cpf import extrair_cpfs
+from planilhas.multichave import (
+    TIPO_EXATO,
+    TIPO_NUMERICO,
+    TIPO_RATIO,
+    TIPO_TOKEN_SET,
+    TIPO_TOKEN_SORT,
+    ChaveColuna,
+    ComparadorMultiChave,
+    normalizar_numerica,
+    preparar_multichave,
+    valores_chaves,
+)
+from planilhas.normalizacao import obter_normalizador
+
+
+def test_normalizar_numerica_e_cpf_usam_os_mesmos_digitos():
+    serie = pd.Series(["012.345.678-90", 12345678901.0, None, "0070.0", "", 7], dtype=object)
+    assert normalizar_numerica(serie).tolist() == ["1234567890", "12345678901", "", "70", "", "7"]
+    assert extrair_cpfs(serie).tolist() == ["01234567890", "12345678901", "", "00000000070", "", "00000000007"]
+
+
+def planilha(linhas, semente):
+    rng = random.Random(semente)
+    nomes = ["JOAO SILVA", "MARIA SOUZA", "JOSE SANTOS", "ANA LIMA", "PEDRO ALVES"]
+    cidades = ["SAO PAULO", "SANTOS", "CAMPINAS", "SAO CARLOS"]
+
+    def variar(texto):
+        i = rng.randrange(len(texto))
+        return texto[:i] + rng.choice("ABXYZ ") + texto[i + 1 :] if rng.random() < 0.5 else texto
+
+    return pd.DataFrame(
+        {
+            "Nome": [variar(rng.choice(nomes)) for _ in range(linhas)],
+            "Cidade": [variar(rng.choice(cidades)) for _ in range(linhas)],
+            "UF": [rng.choice(["SP", "sp", "RJ", " ", float("nan")]) for _ in range(linhas)],
+            "CEP": [rng.choice(["01001-000", "1001000", 1001000.0, "20040-020", "", None]) for _ in range(linhas)],
+        }
+    )
+
+
+CHAVES = [
+    [ChaveColuna("Nome", "Nome", TIPO_TOKEN_SORT, 2.0), ChaveColuna("Cidade", "Cidade", TIPO_RATIO, 1.0)],
+    [ChaveColuna("Nome", "Nome", TIPO_TOKEN_SET, 1.0), ChaveColuna("UF", "UF", TIPO_EXATO)],
+    [
+        ChaveColuna("Cidade", "Cidade", TIPO_RATIO, 1.0),
+        ChaveColuna("Nome", "Nome", TIPO_TOKEN_SORT, 3.0),
+        ChaveColuna("CEP", "CEP", TIPO_NUMERICO),
+    ],
+    [ChaveColuna("UF", "UF", TIPO_EXATO), ChaveColuna("CEP", "CEP", TIPO_NUMERICO)],
+]
+SCORERS = {TIPO_TOKEN_SORT: fuzz.token_sort_ratio, TIPO_RATIO: fuzz.ratio, TIPO_TOKEN_SET: fuzz.token_set_ratio}
+
+
+def acertos_forca_bruta(chaves, valores1, item, similaridade_min, limite):
+    fuzzy = [(i, c) for i, c in enumerate(chaves) if not c.filtro]
+    acertos = []
+    for linha in range(len(valores1[0])):
+        filtros = [(valores1[i][linha], item[1 + i]) for i, c in enumerate(chaves) if c.filtro]
+        if any(valor1 != valor2 or valor1 == "" for valor1, valor2 in filtros):
+            continue
+        if fuzzy:
+            soma = sum(c.peso * SCORERS[c.tipo](item[1 + i], valores1[i][linha]) for i, c in fuzzy)
+            score = soma / sum(c.peso for _, c in fuzzy)
+        else:
+            score = 100.0
+        if score >= similaridade_min:
+            acertos.append((linha, score))
+    if limite:
+        acertos = sorted(acertos, key=lambda par: (-par[1], par[0]))[:limite]
+    return acertos
+
+
+@pytest.mark.parametrize("chaves", CHAVES)
+@pytest.mark.parametrize("similaridade_min", [0, 60, 85, 100])
+@pytest.mark.parametrize("limite", [None, 2])
+@pytest.mark.parametrize("max_pares", [300, 7])
+def test_comparador_multichave_igual_a_forca_bruta(chaves, similaridade_min, limite, max_pares):
+    normalizador = obter_normalizador()
+    df1, df2 = planilha(120, 1), planilha(30, 2)
+    preparo = preparar_multichave(df1, chaves, normalizador)
+    tipos = [c.tipo for c in chaves]
+    valores2 = valores_chaves(df2, [c.coluna2 for c in chaves], tipos, normalizador)
+    itens = [(f"ITEM {k}", *valores) for k, valores in enumerate(zip(*valores2))]
+    escolhas = [f"LINHA {k}" for k in range(len(df1))]
+    # max_pares pequeno: os pares são pontuados em vários lotes (com 7, os de um item também)
+    comparador = ComparadorMultiChave(
+        chaves, preparo, {}, escolhas, similaridade_min, limite, formatar=False, workers=1, max_pares=max_pares
+    )
+    registros = comparador.comparar(itens, [False] * len(itens))
+    for item, (_, encontrado_exato, acertos) in zip(itens, registros):
+        esperado = acertos_forca_bruta(chaves, preparo.valores, item, similaridade_min, limite)
+        assert not encontrado_exato
+        assert [linha for linha, _ in acertos] == [linha for linha, _ in esperado]
+        assert [score for _, score in acertos] == pytest.approx([score for _, score in esperado])
+
+
+def test_filtro_vazio_nao_casa_com_filtro_vazio():
+    chaves = [ChaveColuna("Nome", "Nome", TIPO_RATIO), ChaveColuna("CEP", "CEP", TIPO_NUMERICO)]
+    df1 = pd.DataFrame({"Nome": ["JOAO SILVA", "JOAO SILVA", "JOAO SILVA"], "CEP": ["", None, "01001-000"]})
+    df2 = pd.DataFrame({"Nome": ["JOAO SILVA", "JOAO SILVA", "JOAO SILVA"], "CEP": [float("nan"), "  ", "1001000"]})
+    normalizador = obter_normalizador()
+    preparo = preparar_multichave(df1, chaves, normalizador)
+    valores2 = valores_chaves(df2, ["Nome", "CEP"], [c.tipo for c in chaves], normalizador)
+    itens = [(f"ITEM {k}", *valores) for k, valores in enumerate(zip(*valores2))]
+    comparador = ComparadorMultiChave(chaves, preparo, {}, ["A", "B", "C"], 90, formatar=False, workers=1)
+    registros = comparador.comparar(itens, [False] * len(itens))
+    assert [acertos for _, _, acertos in registros] == [[], [], [(2, 100.0)]]
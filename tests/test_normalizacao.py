@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import random
+import re
+import unicodedata
+
+import pandas as pd
+import pytest
+
+from planilhas.normalizacao import (
+    MODO_IGNORAR_PONTUACAO,
+    MODO_REMOVER_STOPWORDS,
+    MODO_SEM_NORMALIZACAO,
+    MODOS_NORMALIZACAO,
+    NormalizadorTexto,
+)
+
+
+def normalizar_texto_antigo(texto, modo):
+    """
+    Método antigo `ComparadorPlanilhasWidget.normalizar_texto`, sem a leitura do combobox.
+    O `[\\p{P}\\p{S}]` de "Ignorar pontuação" não é aceito pelo `re` (o modo falhava): aqui
+    vale o que ele queria dizer, pontuação e símbolos Unicode viram espaço.
+    """
+    if pd.isna(texto) or texto is None:
+        return ""
+    texto = str(texto).strip()
+    texto = re.sub(r"\s+", " ", texto)
+    texto_base = unicodedata.normalize("NFD", texto)
+    texto_base = "".join(c for c in texto_base if unicodedata.category(c) != "Mn")
+    if modo == MODO_SEM_NORMALIZACAO:
+        return texto
+    if modo == MODO_IGNORAR_PONTUACAO:
+        texto_base = "".join(" " if unicodedata.category(c)[0] in "PS" else c for c in texto_base)
+    else:
+        texto_base = re.sub(r"[,;:.!?'\-]", " ", texto_base)
+    if modo == MODO_REMOVER_STOPWORDS:
+        stop = {"LTDA", "ME", "S/A", "SA", "EIRELI", "EPP"}
+        palavras = [p for p in texto_base.split() if p.upper() not in stop]
+        texto_base = " ".join(palavras)
+    texto_base = re.sub(r"\(\s*SUCESSAO\s+DE\s*\)", " ", texto_base, flags=re.IGNORECASE)
+    texto_base = re.sub(r"\s+", " ", texto_base).strip()
+    return texto_base.upper()
+
+
+CASOS = [
+    "  José  da   Silva ",
+    "Conceição Gonçalves LTDA",
+    "ARAÚJO & FILHOS - ME",
+    "Brandão S/A",
+    "magalhães sa.",
+    "Padaria (SUCESSÃO DE) Pereira",
+    "Padaria ( sucessao  de ) Pereira",
+    "EPP-EIRELI;me",
+    "R$ 1.000,00 #1 @loja",
+    "Inês\tMaria\nLtda",
+    "São Paulo",
+    "",
+    "   ",
+    None,
+    float("nan"),
+    12.5,
+    7,
+]
+
+_ALFABETO = list("abcAZçÇãÁéÊíõüñ ,;:.!?'-/()&$#@%*+=\t")
+_ALFABETO += ["LTDA", " ME ", "S/A", " sa ", "(SUCESSÃO DE)", "\u00a0"]  # \u00a0: espaço não separável
+
+
+def casos_aleatorios(quantidade=500, semente=0):
+    rng = random.Random(semente)
+    return ["".join(rng.choice(_ALFABETO) for _ in range(rng.randint(0, 12))) for _ in range(quantidade)]
+
+
+@pytest.mark.parametrize("modo", MODOS_NORMALIZACAO)
+def test_normalizar_igual_ao_metodo_antigo(modo):
+    normalizador = NormalizadorTexto(modo)
+    for texto in CASOS + casos_aleatorios():
+        esperado = normalizar_texto_antigo(texto, modo)
+        assert normalizador.normalizar(texto) == esperado, texto
+        assert normalizador.normalizar(texto) == esperado, texto  # memo quente
+
+
+@pytest.mark.parametrize("modo", MODOS_NORMALIZACAO)
+def test_normalize_series_igual_ao_metodo_antigo(modo):
+    textos = CASOS + casos_aleatorios(semente=1)
+    serie = pd.Series(textos + textos, dtype=object)  # repetidos passam pelo factorize
+    esperado = [normalizar_texto_antigo(t, modo) for t in textos + textos]
+    assert NormalizadorTexto(modo).normalize_series(serie).tolist() == esperado
+
+
+def test_normalize_series_preserva_o_indice():
+    serie = pd.Series(["a", None], index=[10, 20], dtype=object)
+    resultado = NormalizadorTexto().normalize_series(serie)
+    assert resultado.index.tolist() == [10, 20]
+    assert resultado.tolist() == ["A", ""]
@@ -0,0 +1,36 @@
+"""A poda pela janela de tamanho (e o índice de q-gramas) não pode perder nenhum par acima do limite."""
+
+from __future__ import annotations
+
+import pytest
+
+from planilhas.indice_candidatos import IndiceCandidatos
+from planilhas.motor_nomes_similares import contar_nomes, pares_similares
+from planilhas.pontuacao import PontuadorLote
+from tests.util import acertos_forca_bruta, gerar_nomes, pares_forca_bruta
+
+LIMITES = [0, 50, 75, 85, 90, 100]
+
+
+@pytest.fixture(scope="module")
+def nomes():
+    # Tamanhos bem variados (de "ANA" a quatro sobrenomes), repetições, vazios e espaços nas pontas
+    return gerar_nomes(250, semente=5) + ["ANA", "ANA ", "", None, " JOAO", "JOAO", "A", "AB", "JOAO SILVA"]
+
+
+@pytest.mark.parametrize("limite", LIMITES)
+@pytest.mark.parametrize("tamanho_bloco, max_celulas", [(1024, 4_000_000), (7, 50)])
+def test_pares_similares_igual_a_forca_bruta(nomes, limite, tamanho_bloco, max_celulas):
+    obtido = pares_similares(nomes, limite, workers=1, tamanho_bloco=tamanho_bloco, max_celulas=max_celulas)
+    assert obtido == pares_forca_bruta(nomes, limite)
+
+
+@pytest.mark.parametrize("limite", LIMITES)
+def test_indice_e_pontuador_iguais_a_forca_bruta(nomes, limite):
+    base, _ = contar_nomes(nomes)
+    consultas = gerar_nomes(30, semente=6) + ["ANA", "A", "JOAO SILVA SANTOS LIMA COSTA"]
+    indice = IndiceCandidatos(base)
+    candidatos = [indice.candidatos(c, limite) for c in consultas]
+    obtido = PontuadorLote(base, workers=1).pontuar(consultas, limite, candidatos)
+    for consulta, acertos in zip(consultas, obtido):
+        assert acertos == acertos_forca_bruta(base, consulta, limite), consulta
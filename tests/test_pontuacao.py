@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import pytest
+
+from planilhas.indice_candidatos import IndiceCandidatos
+from planilhas.pontuacao import PontuadorLote
+from tests.util import acertos_forca_bruta
+
+
+@pytest.mark.parametrize("similaridade_min", [0, 70, 90, 100])
+@pytest.mark.parametrize("max_celulas", [1_000_000, 500])
+def test_pontuar_igual_a_varredura_par_a_par(base, consultas, similaridade_min, max_celulas):
+    pontuador = PontuadorLote(base, workers=1, max_celulas=max_celulas)
+    esperado = [acertos_forca_bruta(base, c, similaridade_min) for c in consultas]
+    assert pontuador.pontuar(consultas, similaridade_min) == esperado
+    indice = IndiceCandidatos(base)
+    candidatos = [indice.candidatos(c, similaridade_min) for c in consultas]
+    assert pontuador.pontuar(consultas, similaridade_min, candidatos) == esperado
+
+
+@pytest.mark.parametrize("similaridade_min", [0, 70, 90])
+@pytest.mark.parametrize("limite", [1, 3, 10])
+@pytest.mark.parametrize("max_celulas", [1_000_000, 500])
+def test_top_k_ordem_e_desempate(base, consultas, similaridade_min, limite, max_celulas):
+    # max_celulas pequeno: várias fatias de colunas, com o corte subindo entre elas
+    pontuador = PontuadorLote(base, workers=1, max_celulas=max_celulas)
+    esperado = [acertos_forca_bruta(base, c, similaridade_min, limite) for c in consultas]
+    assert pontuador.pontuar(consultas, similaridade_min, limite=limite) == esperado
+    indice = IndiceCandidatos(base)
+    candidatos = [indice.candidatos(c, similaridade_min) for c in consultas]
+    assert pontuador.pontuar(consultas, similaridade_min, candidatos, limite) == esperado
+
+
+def test_top_k_empate_favorece_a_linha_anterior():
+    pontuador = PontuadorLote(["ANA", "ANAS", "ANA", "ANA"], workers=1, max_celulas=1)
+    assert pontuador.pontuar(["ANA"], 50, limite=2) == [[(0, 100.0), (2, 100.0)]]
+    assert pontuador.pontuar(["ANA"], 50, limite=4) == [
+        [(0, 100.0), (2, 100.0), (3, 100.0), (1, pytest.approx(85.714, abs=1e-3))]
+    ]
+
+
+def test_pontuar_sem_escolhas_ou_consultas():
+    assert PontuadorLote([]).pontuar(["ANA"], 50) == [[]]
+    assert PontuadorLote(["ANA"]).pontuar([], 50) == []
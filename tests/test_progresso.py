@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import pytest
+
+from planilhas import progresso
+from planilhas.progresso import MedidorProgresso
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 100.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(progresso.time, "monotonic", relogio)
+    return relogio
+
+
+def test_velocidade_e_tempo_restante(relogio):
+    avisos = []
+    medidor = MedidorProgresso(lambda *aviso: avisos.append(aviso))
+    relogio.agora += 10
+    medidor(1_000, 4_000)
+    assert avisos == [(25, 100.0, 30.0)]
+
+
+def test_linhas_do_checkpoint_nao_entram_na_velocidade(relogio):
+    avisos = []
+    medidor = MedidorProgresso(lambda *aviso: avisos.append(aviso), inicio=3_000)
+    # Regravação do checkpoint: percentual avança, sem velocidade nem tempo restante
+    relogio.agora += 5
+    medidor(1_500, 4_000)
+    relogio.agora += 5
+    medidor(3_000, 4_000)
+    # Daqui em diante só contam as linhas comparadas nesta execução, no tempo desta execução
+    relogio.agora += 10
+    medidor(3_500, 4_000)
+    assert avisos == [(37, 0.0, None), (75, 0.0, None), (87, 50.0, 10.0)]
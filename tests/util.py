@@ -0,0 +1,50 @@
+"""Corpus sintético de nomes e varreduras par a par (força bruta) de referência para testes e benchmarks."""
+
+from __future__ import annotations
+
+import random
+
+from rapidfuzz import fuzz
+
+from planilhas.motor_nomes_similares import contar_nomes
+
+PRENOMES = ["JOAO", "MARIA", "JOSE", "ANA", "LUIZ", "LUIS", "THIAGO", "TIAGO", "RAFAEL", "RAPHAEL", "ALINE"]
+SOBRENOMES = ["SILVA", "SANTOS", "SOUZA", "SOUSA", "FERREIRA", "LIMA", "COSTA", "RIBEIRO", "MACHADO", "DIAS"]
+
+
+def gerar_nomes(quantidade, semente=0):
+    rng = random.Random(semente)
+    nomes = []
+    for _ in range(quantidade):
+        nome = " ".join([rng.choice(PRENOMES)] + [rng.choice(SOBRENOMES) for _ in range(rng.randint(1, 3))])
+        if rng.random() < 0.3:  # erro de digitação
+            i = rng.randrange(len(nome))
+            nome = nome[:i] + rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ ") + nome[i + 1 :]
+        nomes.append(nome)
+    return nomes
+
+
+def varredura_completa(base, consulta, similaridade_min, scorer=fuzz.token_sort_ratio):
+    """Linhas da `base` com score >= `similaridade_min` contra a consulta."""
+    return [i for i, texto in enumerate(base) if scorer(consulta, texto) >= similaridade_min]
+
+
+def acertos_forca_bruta(base, consulta, similaridade_min, limite=None):
+    """(linha, score) de token_sort_ratio acima do mínimo; com `limite`, os melhores (empate: menor linha)."""
+    acertos = [(i, fuzz.token_sort_ratio(consulta, texto)) for i, texto in enumerate(base)]
+    acertos = [(i, score) for i, score in acertos if score >= similaridade_min]
+    if limite:
+        return sorted(acertos, key=lambda par: (-par[1], par[0]))[:limite]
+    return acertos
+
+
+def pares_forca_bruta(nomes, limite):
+    """Saída esperada de `pares_similares`: todos os pares de nomes distintos com ratio >= `limite`."""
+    unicos, contagens = contar_nomes(nomes)
+    pares = []
+    for i in range(len(unicos)):
+        for j in range(i + 1, len(unicos)):
+            score = fuzz.ratio(unicos[i], unicos[j])
+            if score >= limite:
+                pares.append((unicos[i], unicos[j], round(score, 1), contagens[i], contagens[j]))
+    return pares